@@ -0,0 +1,299 @@
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Optional, Type
+import asyncio
+import inspect
+import sys
+from time import perf_counter
+
+import game
+import scene
+
+
+async def _resolve(value: Any) -> Any:
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+class AsyncScene(scene.Scene):
+    """
+    Scene whose update, enter, leave and transition actions may be coroutines. Only AsyncGame can run these, and
+    subclasses that override enter or leave should await super()'s so coroutine transition actions are awaited
+    """
+
+    @classmethod
+    async def enter(cls, game: game.Game, src: Optional[Type[scene.Scene]] = None) -> None:
+        for act in cls.enter_trans_acts[src]:
+            await _resolve(scene._run_action(game, cls, act, src, cls))
+        game.data.transition(game, src, cls)
+
+    @classmethod
+    async def update(cls, game: game.Game) -> None:
+        pass
+
+    @classmethod
+    async def leave(cls, game: game.Game, dest: Type[scene.Scene]) -> None:
+        for act in cls.leave_trans_acts[dest]:
+            await _resolve(scene._run_action(game, cls, act, cls, dest))
+
+
+class InputSource:
+    """
+    Lines of input queued for a game to read without blocking. Feed it from anywhere on the event loop, or use
+    StdinInput to read the terminal
+    """
+
+    def __init__(self):
+        self.lines: asyncio.Queue[str] = asyncio.Queue()
+
+    def feed(self, line: str) -> None:
+        self.lines.put_nowait(line)
+
+    def poll(self) -> Optional[str]:
+        """The next line if there is one, otherwise None"""
+        try:
+            return self.lines.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+    async def get(self) -> str:
+        """Wait for the next line. Only this coroutine waits, so other games and tasks keep running"""
+        return await self.lines.get()
+
+    def close(self) -> None:
+        pass
+
+
+class StdinInput(InputSource):
+    """Reads lines from stdin on a worker thread"""
+
+    def __init__(self):
+        super().__init__()
+        self.task = asyncio.get_running_loop().create_task(self._read())
+
+    async def _read(self) -> None:
+        while True:
+            line = await asyncio.to_thread(sys.stdin.readline)
+            if not line:
+                return
+            self.feed(line.rstrip("\n"))
+
+    def close(self) -> None:
+        self.task.cancel()
+
+
+class AsyncGame(game.Game):
+    """
+    Game driven by asyncio. Each tick awaits the scene's update, event dispatch and any transition, so scenes can wait
+    on timers, input and I/O. Layers, systems and update_every are scheduled like in Game, with every update, system,
+    enter and leave awaited in turn. The game owns the tasks it starts with spawn or after and cancels them when it
+    stops. Several games can run on one event loop with run_games
+    """
+
+    # Seconds between ticks when fixed_dt isn't set
+    tick_interval = 1 / 60
+
+    # Feed game.input from the terminal while running
+    read_stdin = False
+
+    def __init__(self, storetype: Type, start_scene: Type[scene.Scene]):
+        self.entered = False
+        self.running = False
+        self.tasks: set[asyncio.Task] = set()
+        self.failed: list[BaseException] = []
+        self.input: InputSource = InputSource()
+
+        # Layer enters and leaves from push_layer and remove_layer, awaited before the tick goes on
+        self.pending: list[Awaitable] = []
+        super().__init__(storetype, start_scene)
+
+    def start(self) -> None:
+        # The starting scene may enter asynchronously, so that waits for the first tick
+        pass
+
+    async def tick(self) -> None:
+        session = self.session
+        if session is not None:
+            session.begin_tick()
+            await self._tick()
+            session.end_tick()
+        else:
+            await self._tick()
+
+    async def _tick(self) -> None:
+        if not self.entered:
+            self.entered = True
+            await _resolve(self.scene.enter(self))
+
+        if self.failed:
+            raise self.failed.pop(0)
+
+        await self._settle()
+        sc = self.scene
+        if self.layers or sc.systems or sc.update_every != 1:
+            await self._scheduled_tick()
+            self.tick_count += 1
+            return
+
+        if self.scheduled_scenes:
+            self._sync_schedule(())
+
+        await _resolve(sc.update(self))
+        await self._settle()
+        await self._dispatch()
+
+        curr = self.scene
+        found = curr._find_transition(self)
+        if found is not None:
+            await self._transition(curr, *found)
+        self.tick_count += 1
+
+    async def _scheduled_tick(self) -> None:
+        active = (self.scene, *self.layers)
+        if active != self.scheduled_scenes:
+            self._sync_schedule(active)
+
+        scheduler = self.scheduler
+        ran = scheduler.due(self.tick_count)
+        for task in ran:
+            if scheduler.timed:
+                start = perf_counter()
+                await _resolve(task.fn(self))
+                task.stats.add(perf_counter() - start)
+            else:
+                await _resolve(task.fn(self))
+            await self._settle()
+        await self._dispatch()
+
+        # Scenes only check their transitions on the ticks they update
+        for task in ran:
+            sc, name = task.key
+            if name != "update":
+                continue
+            if sc is self.scene:
+                found = sc._find_transition(self)
+                if found is not None:
+                    await self._transition(sc, *found)
+            elif sc in self.layers:
+                await self._transition_async_layer(sc)
+
+    async def _dispatch(self) -> None:
+        events = self.events
+        if events.queue:
+            for event in events.drain():
+                events.deliver(event, self)
+                await self._on_event(self.scene, event)
+
+    async def _settle(self) -> None:
+        pending = self.pending
+        while pending:
+            await pending.pop(0)
+
+    def push_layer(self, layer: Type[scene.Scene]) -> None:
+        """Like Game.push_layer. An asynchronous enter is awaited before the tick goes on"""
+        self.layers.append(layer)
+        self._defer(layer.enter(self))
+
+    def remove_layer(self, layer: Type[scene.Scene]) -> None:
+        """Like Game.remove_layer. An asynchronous leave is awaited before the tick goes on"""
+        self._defer(layer.leave(self, None))
+        self.layers.remove(layer)
+
+    def _defer(self, value: Any) -> None:
+        if inspect.isawaitable(value):
+            self.pending.append(value)
+
+    async def _transition_async_layer(self, layer: Type[scene.Scene]) -> None:
+        found = layer._find_transition(self)
+        if found is None:
+            return
+        condition, dest = found
+        for act in condition.act:
+            await _resolve(scene._run_action(self, layer, act, layer, dest))
+        if dest is layer:
+            return
+        await _resolve(layer.leave(self, dest))
+        self.layers[self.layers.index(layer)] = dest
+        await _resolve(dest.enter(self, layer))
+
+    async def _on_event(self, curr: Type[scene.Scene], event: Any) -> None:
+        for handler in curr.event_handlers.get(type(event), ()):
+            await _resolve(handler(curr, self, event))
+        found = curr._find_event_transition(self, event)
+        if found is not None:
+            await self._transition(curr, *found)
+
+    async def _transition(self, curr: Type[scene.Scene], condition: scene.TransitionCondition, dest: Type[scene.Scene]) -> None:
+        for act in condition.act:
+            await _resolve(scene._run_action(self, curr, act, curr, dest))
+        if dest is curr:
+            return
+        await _resolve(curr.leave(self, dest))
+        self.scene = dest
+        await _resolve(dest.enter(self, curr))
+
+    def spawn(self, coro: Awaitable) -> asyncio.Task:
+        """
+        Run a coroutine alongside the game, e.g. to load a file without stalling ticks. An exception it raises is
+        raised from the next tick
+        """
+        task = asyncio.ensure_future(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.failed.append(task.exception())
+
+    def after(self, delay: float, fun: Callable[[AsyncGame], Any]) -> asyncio.Task:
+        """Call fun with the game after delay seconds, awaiting it if it's a coroutine function"""
+        async def timer():
+            await asyncio.sleep(delay)
+            await _resolve(fun(self))
+        return self.spawn(timer())
+
+    async def wait(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+    def stop(self) -> None:
+        """Stop running after the current tick"""
+        self.running = False
+
+    async def run_async(self, ticks: Optional[int] = None) -> None:
+        """
+        Tick and render until stop is called or ticks ticks have run, sleeping between ticks so the loop can run
+        other games and tasks
+        """
+        loop = asyncio.get_running_loop()
+        interval = self.fixed_dt if self.fixed_dt is not None else self.tick_interval
+        if self.read_stdin and not isinstance(self.input, StdinInput):
+            self.input = StdinInput()
+        self.running = True
+        done = 0
+        try:
+            while self.running and (ticks is None or done < ticks):
+                start = loop.time()
+                tick_start = self.clock()
+                await self.tick()
+                self.tick_stats.add(self.clock() - tick_start)
+                self._timed_render()
+                done += 1
+                await asyncio.sleep(max(0.0, interval - (loop.time() - start)))
+        finally:
+            self.running = False
+            for task in list(self.tasks):
+                task.cancel()
+            self.input.close()
+
+    def update(self) -> None:
+        raise TypeError(f"{type(self).__name__} is asynchronous, await tick() instead of calling update()")
+
+    def run(self) -> None:
+        asyncio.run(self.run_async())
+
+
+async def run_games(*games: AsyncGame, ticks: Optional[int] = None) -> None:
+    """Run several games on the current event loop until they've all stopped"""
+    await asyncio.gather(*(g.run_async(ticks) for g in games))
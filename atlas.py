@@ -0,0 +1,144 @@
+"""
+Packed sprite atlases: every frame of several animations in one file, loaded with mmap.
+
+File layout (little endian):
+    8 bytes     magic, b"PGEATLS1"
+    uint32      length of the JSON index
+    uint32      offset of the frame data, aligned to 16 bytes
+    JSON index  {"animations": {name: {"ext": ext, "frames": [[offset, length], ...]}}}, offsets relative to the data
+    frame data  the frame files' bytes, one after another
+
+Pack frame folders offline with:
+    python -m atlas OUTPUT FOLDER [FOLDER ...] [--ext gif]
+"""
+from __future__ import annotations
+from typing import Iterable
+import argparse
+import json
+import mmap
+import os
+import struct
+
+import entity
+
+
+MAGIC = b"PGEATLS1"
+PREFIX = struct.Struct("<8sII")
+ALIGN = 16
+
+
+def pack(output: str, folders: Iterable[str], file_ext: str = "gif") -> dict[str, int]:
+    """
+    Bundle frame folders laid out for AnimatedEntity into one atlas file. Each animation is named after its folder
+
+    :param output: Path of the atlas to write
+    :param folders: Frame folders to include
+    :param file_ext: Extension of the frame files
+    :return: Number of frames packed for each animation
+    """
+    animations = {}
+    blobs = []
+    offset = 0
+    for folder in folders:
+        frames = entity.FrameSet(folder, file_ext)
+        name = os.path.basename(os.path.normpath(folder))
+        if name in animations:
+            raise ValueError(f"Two folders are named {name}")
+
+        entries = []
+        for path in frames.paths:
+            with open(path, "rb") as f:
+                blob = f.read()
+            entries.append([offset, len(blob)])
+            blobs.append(blob)
+            offset += len(blob)
+        animations[name] = {"ext": file_ext, "frames": entries}
+
+    index = json.dumps({"animations": animations}, separators=(",", ":")).encode()
+    data_start = -(-(PREFIX.size + len(index)) // ALIGN) * ALIGN
+    with open(output, "wb") as f:
+        f.write(PREFIX.pack(MAGIC, len(index), data_start))
+        f.write(index)
+        f.write(b"\0" * (data_start - PREFIX.size - len(index)))
+        for blob in blobs:
+            f.write(blob)
+    return {name: len(anim["frames"]) for name, anim in animations.items()}
+
+
+class Atlas:
+    """
+    Memory-mapped atlas. Frames are handed out as memoryview slices of the map, so nothing is copied or read from disk
+    until the bytes are used. Atlases are shared by the process through Atlas.open
+    """
+    opened: dict[str, Atlas] = {}
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_len, self.data_start = PREFIX.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an atlas")
+        self.animations: dict[str, dict] = json.loads(self.map[PREFIX.size:PREFIX.size + index_len])["animations"]
+        self.view = memoryview(self.map)
+        self.frame_sets: dict[str, AtlasFrameSet] = {}
+
+    @classmethod
+    def open(cls, path: str) -> Atlas:
+        key = os.path.abspath(path)
+        try:
+            return cls.opened[key]
+        except KeyError:
+            cls.opened[key] = cls(path)
+        return cls.opened[key]
+
+    def names(self) -> list[str]:
+        return list(self.animations)
+
+    def frame_count(self, name: str) -> int:
+        return len(self.animations[name]["frames"])
+
+    def frame(self, name: str, index: int) -> memoryview:
+        offset, length = self.animations[name]["frames"][index]
+        start = self.data_start + offset
+        return self.view[start:start + length]
+
+    def frame_set(self, name: str) -> AtlasFrameSet:
+        """Frames of one animation, usable anywhere a folder's FrameSet is, e.g. AnimatedEntity"""
+        if name not in self.animations:
+            raise KeyError(f"No animation {name} in {self.path}")
+        try:
+            return self.frame_sets[name]
+        except KeyError:
+            self.frame_sets[name] = AtlasFrameSet(self, name)
+        return self.frame_sets[name]
+
+
+class AtlasFrameSet(entity.FrameSet):
+    """
+    FrameSet backed by an atlas. Its paths are only names for the frames ("<atlas>#<animation>/<n>"), since the
+    frames aren't files
+    """
+    is_file = False
+
+    def __init__(self, atlas: Atlas, name: str):
+        self.atlas = atlas
+        self.name = name
+        self.paths = [f"{atlas.path}#{name}/{i}" for i in range(atlas.frame_count(name))]
+
+    def data(self, index: int) -> memoryview:
+        return self.atlas.frame(self.name, index)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Pack animation frame folders into an atlas")
+    parser.add_argument("output")
+    parser.add_argument("folders", nargs="+")
+    parser.add_argument("--ext", default="gif")
+    args = parser.parse_args(argv)
+    for name, count in pack(args.output, args.folders, args.ext).items():
+        print(f"{name}: {count} frames")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+from __future__ import annotations
+from typing import Any, Callable, Iterable, Optional, Type, TYPE_CHECKING
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import product
+import importlib
+import random
+import sys
+
+import runner
+import scene
+
+if TYPE_CHECKING:
+    from game import Game
+
+
+def class_ref(cls: Type | str) -> str:
+    """
+    Name a class by module and qualified name so a worker process can import it, which also runs the scene
+    registration in that module
+
+    >>> class_ref(runner.SimClock)
+    'runner:SimClock'
+    """
+    if isinstance(cls, str):
+        return cls
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def resolve_ref(ref: str) -> Type:
+    module, _, qualname = ref.partition(":")
+    obj = importlib.import_module(module)
+    for name in qualname.split("."):
+        obj = getattr(obj, name)
+    return obj
+
+
+# Storage classes made by with_defaults, reused so a long sweep doesn't fill the DataStore class caches
+_overridden_storetypes: dict[tuple, Type] = {}
+
+
+def with_defaults(storetype: Type, params: dict[str, Any]) -> Type:
+    """
+    Make a copy of a data storage class with different default values, keeping each field's access
+
+    :param storetype: The data storage class
+    :param params: New default values by field name
+    :return: Subclass of the storage class with the new defaults
+    """
+    if not params:
+        return storetype
+    key = (storetype, tuple(sorted(params.items())))
+    try:
+        return _overridden_storetypes[key]
+    except KeyError:
+        pass
+    except TypeError:
+        # Unhashable values can't be cached
+        key = None
+
+    namespace = {'__annotations__': dict(storetype.__annotations__)}
+    for name, value in params.items():
+        if name not in storetype.__annotations__:
+            raise KeyError(f"{storetype.__name__} has no field {name}")
+        _, access = getattr(storetype, name)
+        namespace[name] = value, access
+    overridden = type(storetype.__name__, (storetype,), namespace)
+    if key is not None:
+        _overridden_storetypes[key] = overridden
+    return overridden
+
+
+@dataclass
+class BatchJob:
+    """
+    One independent game run. Classes may be given as classes or as "module:qualname" strings, and must be importable
+    by the workers. Callables (until, collect) must be module level functions so they can be pickled
+    """
+    game: Type[Game] | str
+    storetype: Type | str
+    start_scene: Type[scene.Scene] | str
+    params: dict[str, Any] = field(default_factory=dict)
+    ticks: Optional[int] = None
+    until: Optional[Callable[[Game], bool]] = None
+    dt: Optional[float] = None
+    seed: int = 0
+    collect: Optional[Callable[[Game], dict]] = None
+
+    def __post_init__(self):
+        self.game = class_ref(self.game)
+        self.storetype = class_ref(self.storetype)
+        self.start_scene = class_ref(self.start_scene)
+
+
+@dataclass
+class RunResult:
+    index: int
+    seed: int
+    params: dict[str, Any]
+    ticks: int
+    final_scene: str
+    transitions: int
+    wall_time: float
+    metrics: dict[str, Any]
+
+
+def seed_all(seed: int) -> None:
+    random.seed(seed)
+    if "numpy" in sys.modules:
+        sys.modules["numpy"].random.seed(seed % 2 ** 32)
+
+
+def run_job(index: int, job: BatchJob) -> RunResult:
+    game_cls = resolve_ref(job.game)
+    storetype = with_defaults(resolve_ref(job.storetype), job.params)
+    start_scene = resolve_ref(job.start_scene)
+
+    # Every forward reference must have been resolved by the imports above
+    scene.Scene.assert_no_classnames()
+
+    seed_all(job.seed)
+    game = game_cls(storetype, start_scene)
+    stats = runner.run_headless(game, ticks=job.ticks, until=job.until, dt=job.dt)
+    return RunResult(
+        index=index,
+        seed=job.seed,
+        params=job.params,
+        ticks=stats.ticks,
+        final_scene=stats.final_scene.__name__,
+        transitions=stats.transitions,
+        wall_time=stats.wall_time,
+        metrics=job.collect(game) if job.collect is not None else {},
+    )
+
+
+def _run_indexed(item: tuple[int, BatchJob]) -> RunResult:
+    return run_job(*item)
+
+
+def run_batch(jobs: Iterable[BatchJob], max_workers: Optional[int] = None, chunksize: int = 1) -> list[RunResult]:
+    """
+    Run independent games across a process pool
+
+    :param jobs: The runs to do
+    :param max_workers: Number of processes, defaults to one per core. 0 runs everything in this process
+    :param chunksize: Jobs sent to a worker at a time, raise it when runs are short
+    :return: Results in the same order as the jobs
+    """
+    indexed = list(enumerate(jobs))
+    if max_workers == 0:
+        return [_run_indexed(item) for item in indexed]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_run_indexed, indexed, chunksize=chunksize))
+
+
+def sweep(game: Type[Game] | str, storetype: Type | str, start_scene: Type[scene.Scene] | str,
+          grid: dict[str, Iterable[Any]], repeats: int = 1, base_seed: int = 0, **run_args) -> list[BatchJob]:
+    """
+    Make a job for every combination of parameter values, repeated with different seeds
+
+    :param grid: Values to try for each data store field
+    :param repeats: Runs per combination
+    :param base_seed: Seed of the first run, later runs count up from it
+    :param run_args: Passed on to every BatchJob, e.g. ticks or until
+    :return: List of jobs
+    """
+    names = list(grid)
+    jobs = []
+    for values in product(*(grid[name] for name in names)):
+        for _ in range(repeats):
+            jobs.append(BatchJob(game, storetype, start_scene, params=dict(zip(names, values)),
+                                 seed=base_seed + len(jobs), **run_args))
+    return jobs
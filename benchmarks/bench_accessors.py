@@ -0,0 +1,52 @@
+"""
+Microbenchmark comparing field access through the generic DataStore._Accessor and the compiled per-scene accessors
+
+Run from the repository root with: python -m benchmarks.bench_accessors
+"""
+from timeit import repeat
+
+import scene
+import data_store
+
+
+class BenchScene(scene.Scene): pass
+
+
+class BenchData:
+    counter: int = 0,       data_store.Access.transient(BenchScene)
+    config: float = 0.5,    data_store.Access.static(BenchScene)
+    name: str = "",         data_store.Access.game()
+
+
+def make_accessor(compiled: bool, track_writes: bool = False):
+    data_store.DataStore.compile_accessors = compiled
+    try:
+        return data_store.DataStore(BenchData, track_writes=track_writes)[BenchScene]
+    finally:
+        data_store.DataStore.compile_accessors = True
+
+
+def measure(stmt: str, accessor, number: int) -> float:
+    """Returns millions of operations per second for the best of several runs"""
+    best = min(repeat(stmt, globals={'acc': accessor}, number=number, repeat=5))
+    return number / best / 1e6
+
+
+def main(number: int = 200_000) -> None:
+    cases = {
+        "read": "acc.config",
+        "write": "acc.counter = 1",
+        "read+write": "acc.counter += 1",
+    }
+    print(f"{'case':<12}{'tracked':<9}{'generic Mops/s':>16}{'compiled Mops/s':>17}{'speedup':>9}")
+    for track_writes in (False, True):
+        generic = make_accessor(False, track_writes)
+        compiled = make_accessor(True, track_writes)
+        for case, stmt in cases.items():
+            slow = measure(stmt, generic, number)
+            fast = measure(stmt, compiled, number)
+            print(f"{case:<12}{str(track_writes):<9}{slow:>16.2f}{fast:>17.2f}{fast / slow:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Measures batch simulation throughput for different numbers of worker processes
+
+Run from the repository root with: python -m benchmarks.bench_batch
+"""
+import os
+import random
+from time import perf_counter
+
+import scene
+import game
+import data_store
+import batch
+
+
+class Battle(scene.Scene):
+    @classmethod
+    def update(cls, game) -> None:
+        data = game.data[cls]
+        for _ in range(data.enemies):
+            if random.random() < data.enemy_hit_prob:
+                data.health -= random.randint(*data.enemy_dmg_range)
+        if random.random() < 0.3:
+            data.enemies -= 1
+
+    @scene.transition_condition("BattleOver")
+    def finished(cls, game):
+        return game.data[cls].health <= 0 or game.data[cls].enemies == 0
+
+
+class BattleOver(scene.Scene):
+    @scene.transition_condition(Battle)
+    def again(cls, game):
+        return True
+
+
+class BattleData:
+    health: int = 100,                  data_store.Access.transient(Battle)
+    enemies: int = 5,                   data_store.Access.transient(Battle)
+    enemy_dmg_range: tuple = (5, 10),   data_store.Access.static(Battle)
+    enemy_hit_prob: float = 0.5,        data_store.Access.static(Battle)
+
+
+class BattleGame(game.Game):
+    def run(self) -> None:
+        pass
+
+
+def main(runs: int = 64, ticks: int = 5000) -> None:
+    jobs = batch.sweep(BattleGame, BattleData, Battle, {"enemy_hit_prob": [0.1, 0.3, 0.5, 0.7]},
+                       repeats=runs // 4, ticks=ticks)
+    print(f"{'workers':>8}{'runs/s':>10}{'ticks/s':>12}{'speedup':>9}")
+    baseline = None
+    for workers in sorted({0, 1, 2, 4, os.cpu_count() or 1}):
+        start = perf_counter()
+        batch.run_batch(jobs, max_workers=workers, chunksize=4)
+        elapsed = perf_counter() - start
+        baseline = baseline or elapsed
+        label = "inline" if workers == 0 else str(workers)
+        print(f"{label:>8}{len(jobs) / elapsed:>10.1f}{len(jobs) * ticks / elapsed:>12.0f}{baseline / elapsed:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
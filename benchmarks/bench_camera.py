@@ -0,0 +1,100 @@
+"""
+Measures frame time against level size for a camera scrolling across a chunked tilemap, with entity updates and
+drawing culled to the camera, compared with updating and redrawing everything. Turtles are fakes that count calls,
+so this runs without a display
+
+Run from the repository root with: python -m benchmarks.bench_camera
+"""
+import random
+import tempfile
+from time import perf_counter
+
+import numpy as np
+
+import camera
+import collision
+import tilemap
+import turtle_entity
+import turtle_renderer
+
+TILE = 16
+ENTITIES_PER_SCREEN = 50
+FRAMES = 200
+SPEED = 4
+
+
+class CountingTurtle:
+    calls = 0
+
+    def __getattr__(self, name):
+        def call(*args):
+            CountingTurtle.calls += 1
+        return call
+
+
+class Entity(turtle_entity.TurtleEntity):
+    @classmethod
+    def create_default_turtle(cls):
+        return CountingTurtle()
+
+
+def make_level(screens: int, rng: random.Random):
+    cam = camera.Camera(640, 480, x=320, y=240, margin=64, bounds=(0, 0, 640 * screens, 480))
+    tiles = np.random.default_rng(screens).integers(0, 4, (480 // TILE, 640 * screens // TILE), dtype=np.uint16)
+    entities = [Entity("square", rng.uniform(0, 640 * screens), rng.uniform(0, 480), 16, 16)
+                for _ in range(ENTITIES_PER_SCREEN * screens)]
+    return cam, tiles, entities
+
+
+def culled(screens: int, folder: str) -> float:
+    rng = random.Random(screens)
+    cam, tiles, entities = make_level(screens, rng)
+    tmap = tilemap.TileMap.from_array(folder, tiles, TILE)
+    world = collision.CollisionWorld(64, entities)
+    renderer = turtle_renderer.TurtleRenderer(CountingTurtle(), camera=cam, world=world)
+    for e in entities:
+        renderer.add(e)
+    tmap.stream(cam)
+    tmap.wait()
+    renderer.flush()
+
+    start = perf_counter()
+    for _ in range(FRAMES):
+        cam.x += SPEED
+        for e in cam.active(world):
+            e.x += rng.uniform(-1, 1)
+            world.update(e)
+        tmap.stream(cam)
+        tmap.window(*cam.view())
+        renderer.flush()
+    elapsed = (perf_counter() - start) / FRAMES
+    tmap.close()
+    return elapsed
+
+
+def everything(screens: int) -> float:
+    rng = random.Random(screens)
+    cam, tiles, entities = make_level(screens, rng)
+    renderer = turtle_renderer.TurtleRenderer(CountingTurtle(), camera=cam)
+    for e in entities:
+        renderer.add(e)
+
+    start = perf_counter()
+    for _ in range(FRAMES):
+        cam.x += SPEED
+        for e in entities:
+            e.x += rng.uniform(-1, 1)
+        renderer.flush()
+    return (perf_counter() - start) / FRAMES
+
+
+def main() -> None:
+    print(f"{'screens':>8}{'entities':>10}{'everything ms/frame':>21}{'culled ms/frame':>17}")
+    for screens in (2, 10, 50, 200):
+        with tempfile.TemporaryDirectory() as folder:
+            print(f"{screens:>8}{ENTITIES_PER_SCREEN * screens:>10}{everything(screens) * 1000:>21.2f}"
+                  f"{culled(screens, folder) * 1000:>17.2f}")
+
+
+if __name__ == '__main__':
+    main()
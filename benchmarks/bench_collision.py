@@ -0,0 +1,89 @@
+"""
+Compares the spatial hash broadphase with brute-force pairwise checks for moving entities
+
+Run from the repository root with: python -m benchmarks.bench_collision
+"""
+import random
+from typing import Optional
+from time import perf_counter
+
+import entity
+import collision
+
+
+# Keep density constant so the number of real overlaps grows linearly with the entity count
+DENSITY = 1 / 2000
+HITBOX = 16
+BRUTE_FORCE_LIMIT = 4000
+
+
+def make_entities(n: int, rng: random.Random) -> tuple[list[entity.Entity], float]:
+    size = (n / DENSITY) ** 0.5
+    return [entity.Entity(rng.uniform(0, size), rng.uniform(0, size), HITBOX, HITBOX) for _ in range(n)], size
+
+
+def move(entities: list[entity.Entity], rng: random.Random) -> None:
+    for e in entities:
+        e.x += rng.uniform(-2, 2)
+        e.y += rng.uniform(-2, 2)
+
+
+def brute_force(entities: list[entity.Entity]) -> int:
+    count = 0
+    for i, a in enumerate(entities):
+        for b in entities[i + 1:]:
+            if a.overlaps(b):
+                count += 1
+    return count
+
+
+def bench(n: int, ticks: int = 3) -> tuple[float, Optional[float], float]:
+    """Returns milliseconds per tick for the hash (update + pairs), brute force, and a batch of queries"""
+    rng = random.Random(n)
+    entities, size = make_entities(n, rng)
+    world = collision.CollisionWorld(HITBOX * 2, entities)
+
+    start = perf_counter()
+    for _ in range(ticks):
+        move(entities, rng)
+        world.update_all()
+        hashed = sum(1 for _ in world.pairs())
+    hash_ms = (perf_counter() - start) / ticks * 1000
+
+    brute_ms = None
+    if n <= BRUTE_FORCE_LIMIT:
+        start = perf_counter()
+        move(entities, rng)
+        brute = brute_force(entities)
+        brute_ms = (perf_counter() - start) * 1000
+        world.update_all()
+        assert brute == sum(1 for _ in world.pairs())
+
+    start = perf_counter()
+    for _ in range(1000):
+        x, y = rng.uniform(0, size), rng.uniform(0, size)
+        world.at_point(x, y)
+        world.in_rect(x, y, x + 50, y + 50)
+        world.nearest(x, y)
+    query_ms = perf_counter() - start
+
+    return hash_ms, brute_ms, query_ms
+
+
+def main() -> None:
+    print(f"{'entities':>9}{'hash ms/tick':>14}{'brute ms/tick':>20}{'1k of each query ms':>21}")
+    largest_brute = None
+    for n in (1000, 2000, 4000, 10_000, 30_000, 100_000):
+        hash_ms, brute_ms, query_ms = bench(n)
+        if brute_ms is not None:
+            largest_brute = n, brute_ms
+            brute = f"{brute_ms:.0f}"
+        else:
+            # Brute force is quadratic, so scale the largest size that was measured
+            measured_n, measured_ms = largest_brute
+            brute = f"~{measured_ms * (n / measured_n) ** 2:.0f} (est.)"
+        print(f"{n:>9}{hash_ms:>14.1f}{brute:>20}{query_ms * 1000:>21.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Compares a scene that polls 50 rare transition conditions every tick with one that has the same 50 transitions
+triggered by events, for ticks where nothing happens and ticks where one event fires
+
+Run from the repository root with: python -m benchmarks.bench_events
+"""
+from time import perf_counter
+
+import game
+import scene
+
+
+CONDITIONS = 50
+TICKS = 20000
+
+
+class Rare:
+    def __init__(self, kind: int):
+        self.kind = kind
+
+
+class BenchEvDone(scene.Scene):
+    pass
+
+
+def make_scenes() -> tuple[type[scene.Scene], type[scene.Scene]]:
+    polling = {}
+    evented = {}
+    for i in range(CONDITIONS):
+        polling[f"cond{i}"] = scene.transition_condition(BenchEvDone)(lambda cls, g, i=i: g.flags[i])
+        evented[f"cond{i}"] = scene.event_transition(Rare, BenchEvDone)(lambda cls, g, e, i=i: e.kind == i)
+    return type("BenchEvPolling", (scene.Scene,), polling), type("BenchEvEvented", (scene.Scene,), evented)
+
+
+class BenchGame(game.Game):
+    def __init__(self, start_scene):
+        self.flags = [False] * CONDITIONS
+        super().__init__(type("BenchEvData", (), {}), start_scene)
+
+    def run(self) -> None:
+        pass
+
+
+def per_tick(g: BenchGame, post: bool) -> float:
+    start = perf_counter()
+    for _ in range(TICKS):
+        if post:
+            g.events.post(Rare(-1))
+        g.update()
+    return (perf_counter() - start) / TICKS * 1e6
+
+
+def main() -> None:
+    polling, evented = make_scenes()
+    print(f"{CONDITIONS} transitions, microseconds per tick")
+    for name, start_scene in (("polling", polling), ("events", evented)):
+        idle = per_tick(BenchGame(start_scene), post=False)
+        busy = per_tick(BenchGame(start_scene), post=True)
+        print(f"{name:>8}: {idle:8.2f} idle {busy:8.2f} with an event every tick")
+
+
+if __name__ == "__main__":
+    main()
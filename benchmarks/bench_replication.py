@@ -0,0 +1,104 @@
+"""
+Measures replication traffic and latency over loopback for a game where a few entities out of many move each tick,
+compared with sending a pickle of every replicated field each tick
+
+Run from the repository root with: python -m benchmarks.bench_replication
+"""
+import asyncio
+import pickle
+import random
+from time import perf_counter
+
+import data_store
+import game
+import replication
+import scene
+
+ENTITIES = 2000
+MOVING = 20
+TICKS = 300
+CLIENTS = 4
+
+
+class ReplBench(scene.Scene):
+    rng = random.Random(0)
+
+    @classmethod
+    def update(cls, game) -> None:
+        d = game.data[cls]
+        xs, ys = d.xs, d.ys
+        for i in cls.rng.sample(range(ENTITIES), MOVING):
+            xs[i] += cls.rng.randint(-3, 3)
+            ys[i] += cls.rng.randint(-3, 3)
+        d.tick += 1
+
+
+class ReplBenchData:
+    tick: int = 0,                                  data_store.Access.game()
+    xs: list[int] = list(range(ENTITIES)),          data_store.Access.game()
+    ys: list[int] = [1000] * ENTITIES,              data_store.Access.game()
+    names: list[str] = [f"e{i}" for i in range(ENTITIES)], data_store.Access.transient(ReplBench)
+
+
+class ReplBenchGame(game.Game):
+    replicated = True
+
+    def run(self) -> None:
+        pass
+
+
+class Mirror(game.Game):
+    def run(self) -> None:
+        pass
+
+
+async def bench() -> None:
+    g = ReplBenchGame(ReplBenchData, ReplBench)
+    server = replication.Server(g)
+    await server.start()
+    clients = []
+    for _ in range(CLIENTS):
+        client = replication.Client(Mirror(ReplBenchData, ReplBench))
+        await client.connect("127.0.0.1", server.port)
+        await client.receive()
+        clients.append(client)
+    initial = [conn.stats.wire_bytes for conn in server.connections]
+
+    pickled = 0
+    start = perf_counter()
+    for _ in range(TICKS):
+        g.update()
+        fields = {name: getattr(g.data.storage_inst, name) for name in server.scope}
+        pickled += len(pickle.dumps(fields, protocol=pickle.HIGHEST_PROTOCOL))
+        for client in clients:
+            await client.receive()
+    elapsed = perf_counter() - start
+
+    # Let the last acks arrive
+    while any(conn.stats.acked < TICKS + 1 for conn in server.connections):
+        await asyncio.sleep(0.001)
+    for client in clients:
+        assert client.game.data.storage_inst.xs == g.data.storage_inst.xs
+
+    print(f"{ENTITIES} entities, {MOVING} moving per tick, {CLIENTS} clients, {TICKS} ticks over loopback\n")
+    print(f"full state, pickled:  {pickled / TICKS:>9.0f} bytes/tick per client")
+    conn = server.connections[0]
+    per_tick = (conn.stats.wire_bytes - initial[0]) / TICKS
+    print(f"replication:          {per_tick:>9.0f} bytes/tick per client (initial state {initial[0]} bytes)")
+    print(f"  of which deltas:     {conn.stats.deltas / TICKS:>9.1f} fields/tick")
+    print(f"ticks per second:     {TICKS / elapsed:>9.0f} (serving {CLIENTS} clients and applying on all of them)")
+    for peer, stats in server.stats().items():
+        latency = stats["latency"]
+        print(f"  {peer:<22} round trip p50 {latency['p50'] * 1000:.2f} ms, p99 {latency['p99'] * 1000:.2f} ms")
+
+    for client in clients:
+        await client.close()
+    await server.close()
+
+
+def main() -> None:
+    asyncio.run(bench())
+
+
+if __name__ == '__main__':
+    main()
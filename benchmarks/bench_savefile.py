@@ -0,0 +1,74 @@
+"""
+Compares savefile with pickle and JSON for a data store with large persistent fields: save time, load time, file size,
+and the time to load just one small field
+
+Run from the repository root with: python -m benchmarks.bench_savefile
+"""
+import io
+import json
+import pickle
+import random
+from time import perf_counter
+
+import data_store
+import savefile
+import scene
+
+
+N = 200_000
+
+
+class SaveBench(scene.Scene): pass
+
+
+class SaveBenchData:
+    name: str = "",                                 data_store.Access.game()
+    topscores: list[tuple[str, int]] = [],          data_store.Access.static(SaveBench)
+    heights: list[float] = [],                      data_store.Access.static(SaveBench)
+    lookup: dict[str, int] = {},                    data_store.Access.game()
+    grid: list[list[int]] = [],                     data_store.Access.game()
+
+
+def make_store() -> data_store.DataStore:
+    rng = random.Random(0)
+    store = data_store.DataStore(SaveBenchData)
+    s = store.storage_inst
+    s.name = "player"
+    s.topscores = [(f"player{i}", rng.randrange(10 ** 6)) for i in range(N)]
+    s.heights = [rng.random() for _ in range(5 * N)]
+    s.lookup = {f"key{i}": i for i in range(N)}
+    s.grid = [[rng.randrange(256) for _ in range(500)] for _ in range(500)]
+    return store
+
+
+def timed(fn) -> tuple[float, object]:
+    start = perf_counter()
+    result = fn()
+    return (perf_counter() - start) * 1000, result
+
+
+def main() -> None:
+    store = make_store()
+    fields = list(savefile.Schema.of(store).codecs)
+    values = lambda: {field: getattr(store.storage_inst, field) for field in fields}
+
+    save_ms, _ = timed(lambda: savefile.save(store, io.BytesIO()))
+    buf = io.BytesIO()
+    savefile.save(store, buf)
+    data = buf.getvalue()
+    load_ms, _ = timed(lambda: savefile.load(data_store.DataStore(SaveBenchData), io.BytesIO(data)))
+    one_ms, _ = timed(lambda: savefile.load(data_store.DataStore(SaveBenchData), io.BytesIO(data), fields=["name"]))
+
+    pickle_save_ms, pickled = timed(lambda: pickle.dumps(values(), protocol=pickle.HIGHEST_PROTOCOL))
+    pickle_load_ms, _ = timed(lambda: pickle.loads(pickled))
+    json_save_ms, dumped = timed(lambda: json.dumps(values()).encode())
+    json_load_ms, _ = timed(lambda: json.loads(dumped))
+
+    print(f"{'':>10}{'save ms':>10}{'load ms':>10}{'one field ms':>14}{'size MiB':>10}")
+    print(f"{'savefile':>10}{save_ms:10.1f}{load_ms:10.1f}{one_ms:14.2f}{len(data) / 2 ** 20:10.2f}")
+    print(f"{'pickle':>10}{pickle_save_ms:10.1f}{pickle_load_ms:10.1f}{'-':>14}{len(pickled) / 2 ** 20:10.2f}")
+    print(f"{'json':>10}{json_save_ms:10.1f}{json_load_ms:10.1f}{'-':>14}{len(dumped) / 2 ** 20:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Benchmark suite for large synthetic scene graphs. Generates modules with many Scene subclasses, transition conditions
+and transition actions, then measures:
+    - import time of the generated module (class creation and registration)
+    - Scene._detect_transition cost per tick, with full and incremental evaluation
+    - DataStore accessor throughput
+    - DataStore.transition (transient reset) and full scene transition cost
+
+Results are written as JSON, keyed by the current commit, so runs from different commits can be compared.
+
+Run from the repository root with:
+    python -m benchmarks.bench_scene_graph [--sizes 100 500 2000] [--output FILE]
+    python -m benchmarks.bench_scene_graph --compare OLD.json NEW.json
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+from itertools import count
+from time import perf_counter, time
+from timeit import repeat
+
+import data_store
+
+_module_ids = count()
+
+
+def generate_source(n_scenes: int, conditions: int = 4, actions: int = 2, fields_per_scene: int = 2,
+                    seed: int = 0) -> tuple[str, str]:
+    """
+    Write the source of a module with a random scene graph. Conditions refer to their destination by name, so most
+    are forward references that have to be resolved while the module is imported
+
+    :return: Module source and the prefix of its class names
+    """
+    rng = random.Random(seed)
+    prefix = f"G{next(_module_ids)}_"
+    n_fields = n_scenes * fields_per_scene
+    lines = ["import scene", "import game", "import data_store", ""]
+
+    for i in range(n_scenes):
+        lines.append(f"class {prefix}S{i}(scene.Scene):")
+        for c in range(conditions):
+            dest = rng.randrange(n_scenes)
+            field = i * fields_per_scene
+            lines += [
+                f"    @scene.transition_condition('{prefix}S{dest}')",
+                f"    def cond{c}(cls, game):",
+                f"        return game.data[cls].f{field} > 1_000_000",
+                "",
+            ]
+            for a in range(actions):
+                lines += [
+                    f"    @cond{c}.transition_action",
+                    f"    def act{c}_{a}(src, dest, game):",
+                    f"        game.data[src].transitions += 1",
+                    "",
+                ]
+        src = rng.randrange(n_scenes)
+        lines += [
+            f"    @scene.transition_action(src='{prefix}S{src}')",
+            f"    def on_enter(src, dest, game):",
+            f"        pass",
+            "",
+        ]
+
+    lines.append("class Data:")
+    for f in range(n_fields):
+        owners = {f // fields_per_scene} | {rng.randrange(n_scenes) for _ in range(2)}
+        args = ", ".join(f"{prefix}S{o}" for o in sorted(owners))
+        # Conditions read the first field of each scene, so only the others hold containers
+        kind = "transient" if f % 4 < 2 else "static"
+        default = "[0] * 16" if f % fields_per_scene and kind == "transient" else "0"
+        lines.append(f"    f{f}: int = {default}, data_store.Access.{kind}({args})")
+    lines.append(f"    transitions: int = 0, data_store.Access.game()")
+    lines += ["", "class BenchGame(game.Game):", "    def run(self):", "        pass", ""]
+    return "\n".join(lines), prefix
+
+
+def import_generated(source: str, directory: str):
+    name = f"bench_graph_{next(_module_ids)}"
+    with open(os.path.join(directory, f"{name}.py"), "w") as f:
+        f.write(source)
+    importlib.invalidate_caches()
+    start = perf_counter()
+    module = importlib.import_module(name)
+    return module, perf_counter() - start
+
+
+def scenes_of(module, prefix: str, n_scenes: int) -> list:
+    return [getattr(module, f"{prefix}S{i}") for i in range(n_scenes)]
+
+
+def best_of(fn, number: int, repeats: int = 5) -> float:
+    """Best time per call in seconds"""
+    return min(repeat(fn, number=number, repeat=repeats)) / number
+
+
+def bench_size(n_scenes: int, directory: str) -> dict:
+    source, prefix = generate_source(n_scenes)
+    module, import_time = import_generated(source, directory)
+    scenes = scenes_of(module, prefix, n_scenes)
+    results = {
+        "import_s": import_time,
+        "import_us_per_scene": import_time / n_scenes * 1e6,
+    }
+
+    for incremental in (False, True):
+        module.BenchGame.incremental_transitions = incremental
+        g = module.BenchGame(module.Data, scenes[0])
+        sample = scenes[:50]
+
+        def detect():
+            for sc in sample:
+                sc._detect_transition(g)
+
+        key = "detect_incremental_us" if incremental else "detect_full_us"
+        results[key] = best_of(detect, 20) / len(sample) * 1e6
+    module.BenchGame.incremental_transitions = False
+
+    for compiled in (True, False):
+        data_store.DataStore.compile_accessors = compiled
+        try:
+            g = module.BenchGame(module.Data, scenes[0])
+        finally:
+            data_store.DataStore.compile_accessors = True
+        acc = g.data[scenes[0]]
+
+        def access():
+            acc.f0
+            acc.f1 = 1
+            acc.transitions += 1
+
+        key = "accessor_mops_compiled" if compiled else "accessor_mops_generic"
+        results[key] = 4 / best_of(access, 20_000) / 1e6
+
+    g = module.BenchGame(module.Data, scenes[0])
+    pairs = [(scenes[i], scenes[(i * 7 + 1) % n_scenes]) for i in range(min(n_scenes, 100))]
+
+    def reset():
+        for src, dest in pairs:
+            g.data.transition(g, src, dest)
+
+    def full_transition():
+        for src, dest in pairs:
+            g.scene = src
+            src._transition_game(g, dest)
+
+    results["data_transition_us"] = best_of(reset, 20) / len(pairs) * 1e6
+    results["scene_transition_us"] = best_of(full_transition, 20) / len(pairs) * 1e6
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old['commit']} -> {new['commit']}")
+    for size, metrics in new["results"].items():
+        if size not in old["results"]:
+            continue
+        print(f"scenes={size}")
+        for metric, value in metrics.items():
+            before = old["results"][size].get(metric)
+            if before:
+                print(f"    {metric:<26}{before:>12.3f}{value:>12.3f}{value / before:>8.2f}x")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--output", help="JSON file to write, defaults to bench_results/<commit>.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    commit = git_commit()
+    record = {
+        "commit": commit,
+        "timestamp": time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        sys.path.insert(0, directory)
+        try:
+            for size in args.sizes:
+                record["results"][str(size)] = bench_size(size, directory)
+                print(f"scenes={size}")
+                for metric, value in record["results"][str(size)].items():
+                    print(f"    {metric:<26}{value:>12.3f}")
+        finally:
+            sys.path.remove(directory)
+
+    output = args.output or os.path.join("bench_results", f"{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(record, f, indent=2)
+    print(f"Wrote {output}")
+
+
+if __name__ == '__main__':
+    main()
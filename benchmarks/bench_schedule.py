@@ -0,0 +1,54 @@
+"""
+Compares tick times when 40 background systems that run every 10 ticks all share one phase, against letting the
+scheduler pick their phases. Both do the same work in total; spreading it should flatten the worst tick
+
+Run from the repository root with: python -m benchmarks.bench_schedule
+"""
+from time import perf_counter
+
+import game
+import scene
+import util
+
+
+SYSTEMS = 40
+EVERY = 10
+TICKS = 2000
+
+
+def busy(_cls, _game) -> None:
+    # About a tenth of a millisecond of work, like a small AI planning step
+    total = 0
+    for i in range(2000):
+        total += i * i
+
+
+def make_scene(phase):
+    systems = {f"system{i}": scene.system(every=EVERY, phase=phase)(busy) for i in range(SYSTEMS)}
+    return type(f"BenchSched{'Auto' if phase is None else 'Fixed'}", (scene.Scene,), systems)
+
+
+class BenchGame(game.Game):
+    def run(self) -> None:
+        pass
+
+
+def measure(start_scene) -> util.TimingStats:
+    g = BenchGame(type("BenchSchedData", (), {}), start_scene)
+    stats = util.TimingStats(window=TICKS)
+    for _ in range(TICKS):
+        start = perf_counter()
+        g.update()
+        stats.add(perf_counter() - start)
+    return stats
+
+
+def main() -> None:
+    print(f"{SYSTEMS} systems every {EVERY} ticks, milliseconds per tick")
+    for name, phase in (("one phase", 0), ("scheduled", None)):
+        stats = measure(make_scene(phase))
+        print(f"{name:>10}: mean {stats.mean * 1000:6.3f}  p99 {stats.percentile(99) * 1000:6.3f}  max {stats.percentile(100) * 1000:6.3f}")
+
+
+if __name__ == "__main__":
+    main()
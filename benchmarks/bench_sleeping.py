@@ -0,0 +1,83 @@
+"""
+Measures how per-tick collision and integration work scales when most entities are static or asleep, compared with
+treating every entity as mobile and awake
+
+Run from the repository root with: python -m benchmarks.bench_sleeping
+"""
+import random
+from time import perf_counter
+
+import numpy as np
+
+import collision
+import entity
+import entity_store
+
+DENSITY = 1 / 2000
+HITBOX = 16
+MOVERS = 500
+TICKS = 5
+
+
+class Wall(entity.Entity):
+    mobile = False
+
+
+def make_world(n: int, baked: bool) -> tuple[collision.CollisionWorld, list[entity.Entity], random.Random]:
+    """Half the entities are walls, the rest are mobile but only MOVERS of them keep moving"""
+    rng = random.Random(n)
+    size = (n / DENSITY) ** 0.5
+    wall_cls = Wall if baked else entity.Entity
+    walls = [wall_cls(rng.uniform(0, size), rng.uniform(0, size), HITBOX, HITBOX) for _ in range(n // 2)]
+    mobile = [entity.Entity(rng.uniform(0, size), rng.uniform(0, size), HITBOX, HITBOX) for _ in range(n - n // 2)]
+    world = collision.CollisionWorld(HITBOX * 2, walls + mobile)
+    if baked:
+        # Let everything that isn't moving fall asleep
+        world.sleep_ticks = 60
+        for _ in range(world.sleep_ticks):
+            world.update_all()
+    return world, mobile[:MOVERS], rng
+
+
+def bench_world(n: int, baked: bool) -> float:
+    world, movers, rng = make_world(n, baked)
+    start = perf_counter()
+    for _ in range(TICKS):
+        for e in movers:
+            e.x += rng.uniform(-2, 2)
+            e.y += rng.uniform(-2, 2)
+            if baked:
+                world.update(e)
+        world.update_all()
+        sum(1 for _ in (world.active_pairs() if baked else world.pairs()))
+    return (perf_counter() - start) / TICKS * 1000
+
+
+def bench_store(n: int, sleeping: bool) -> float:
+    store = entity_store.EntityStore(capacity=n)
+    for _ in range(n):
+        store.spawn()
+    store.vel[:n] = 1
+    if sleeping:
+        # Scatter the awake entities through the store so integrate can't use slices
+        for slot in range(n):
+            if slot % (n // MOVERS):
+                store.sleep(slot)
+    else:
+        store.sleep_ticks = None
+    start = perf_counter()
+    for _ in range(100):
+        store.integrate(0.01)
+    return (perf_counter() - start) / 100 * 1000
+
+
+def main() -> None:
+    print(f"{MOVERS} entities keep moving, half the rest are static and half are mobile\n")
+    print(f"{'entities':>9}{'all awake ms/tick':>19}{'baked + sleeping':>18}{'integrate all':>15}{'awake only':>12}")
+    for n in (2000, 10_000, 50_000):
+        print(f"{n:>9}{bench_world(n, False):>19.2f}{bench_world(n, True):>18.2f}"
+              f"{bench_store(n, False):>15.3f}{bench_store(n, True):>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
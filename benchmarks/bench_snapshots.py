@@ -0,0 +1,81 @@
+"""
+Measures taking and restoring snapshots of a large data store where a few fields change each tick, against deep
+copying the storage instance, and the memory a full history of snapshots takes
+
+Run from the repository root with: python -m benchmarks.bench_snapshots
+"""
+import tracemalloc
+from copy import deepcopy
+from time import perf_counter
+
+import data_store
+import game
+import scene
+
+
+FIELDS = 1000
+CHANGED = 10
+HISTORY = 300
+
+
+class SnapBench(scene.Scene): pass
+
+
+# Half the fields are small lists, so deep copies have real work to do
+SnapBenchData = type("SnapBenchData", (), {
+    "__annotations__": {f"f{i}": object for i in range(FIELDS)},
+    **{f"f{i}": (list(range(8)) if i % 2 else i, data_store.Access.game()) for i in range(FIELDS)},
+})
+
+
+class SnapBenchGame(game.Game):
+    snapshot_history = HISTORY
+
+    def run(self) -> None:
+        pass
+
+
+def change(g: SnapBenchGame, tick: int) -> None:
+    d = g.data[SnapBench]
+    for i in range(CHANGED):
+        field = f"f{(tick * CHANGED + i) % FIELDS}"
+        setattr(d, field, tick)
+
+
+def main() -> None:
+    g = SnapBenchGame(SnapBenchData, SnapBench)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for tick in range(HISTORY):
+        change(g, tick)
+        g.snapshot()
+    history_kb = (tracemalloc.get_traced_memory()[0] - before) / 1024
+    tracemalloc.stop()
+
+    start = perf_counter()
+    for tick in range(HISTORY):
+        change(g, tick)
+        g.snapshot()
+    snap_us = (perf_counter() - start) / HISTORY * 1e6
+
+    start = perf_counter()
+    for tick in range(HISTORY):
+        change(g, tick)
+        deepcopy(vars(g.data.storage_inst))
+    deepcopy_us = (perf_counter() - start) / HISTORY * 1e6
+
+    start = perf_counter()
+    for snap in g.snapshots:
+        g.restore(snap)
+    restore_us = (perf_counter() - start) / HISTORY * 1e6
+
+    print(f"{FIELDS} fields, {CHANGED} changed per tick, {HISTORY} snapshots kept")
+    print(f"snapshot:        {snap_us:9.2f} us")
+    print(f"deepcopy:        {deepcopy_us:9.2f} us")
+    print(f"restore:         {restore_us:9.2f} us")
+    print(f"history memory:  {history_kb:9.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
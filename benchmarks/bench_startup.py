@@ -0,0 +1,56 @@
+"""
+Measures how long it takes a fresh interpreter to import a module with thousands of scenes.
+The module is imported once beforehand so its bytecode is cached and only class creation and registration are timed
+
+Run from the repository root with: python -m benchmarks.bench_startup [--sizes 500 1000 2000]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_scene_graph import generate_source
+
+
+IMPORT_SCRIPT = """
+from time import perf_counter
+import scene
+start = perf_counter()
+import {module}
+elapsed = perf_counter() - start
+scene.Scene.assert_no_classnames()
+print(elapsed)
+"""
+
+
+def time_import(n_scenes: int, directory: str) -> float:
+    source, _ = generate_source(n_scenes)
+    module = f"startup_{n_scenes}"
+    with open(os.path.join(directory, f"{module}.py"), "w") as f:
+        f.write(source)
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.getcwd(), directory]))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    times = []
+    for _ in range(2):
+        result = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT.format(module=module)], env=env,
+                                capture_output=True, text=True, check=True)
+        times.append(float(result.stdout))
+    return times[-1]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000])
+    args = parser.parse_args(argv)
+
+    print(f"{'scenes':>7}{'import s':>10}{'us/scene':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n in args.sizes:
+            elapsed = time_import(n, directory)
+            print(f"{n:>7}{elapsed:>10.3f}{elapsed / n * 1e6:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
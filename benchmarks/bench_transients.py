@@ -0,0 +1,80 @@
+"""
+Measures the time and allocations of DataStore.transition when flipping between two scenes with large transient defaults
+
+Run from the repository root with: python -m benchmarks.bench_transients
+"""
+import tracemalloc
+from time import perf_counter
+
+import scene
+import game
+import data_store
+
+
+class FlipA(scene.Scene): pass
+
+
+class FlipB(scene.Scene): pass
+
+
+class FlipData:
+    grid: list = [[0] * 100 for _ in range(100)],   data_store.Access.transient(FlipA)
+    lookup: dict = {i: str(i) for i in range(1000)}, data_store.Access.transient(FlipA, FlipB)
+    spawned: list = [],                             data_store.Access.transient(FlipB, factory=lambda _: list(range(1000)))
+    score: int = 0,                                 data_store.Access.transient(FlipA, FlipB)
+    label: tuple = ("a", 1, (2.0, "b")),            data_store.Access.transient(FlipB)
+
+
+class FlipGame(game.Game):
+    def run(self) -> None:
+        pass
+
+
+def flip(g: FlipGame, n: int, touch: bool, kept: list = None) -> None:
+    data = g.data
+    for _ in range(n):
+        if kept is not None:
+            kept.extend(vars(data.storage_inst).values())
+        data.transition(g, FlipA, FlipB)
+        if touch:
+            data[FlipB].lookup
+        if kept is not None:
+            kept.extend(vars(data.storage_inst).values())
+        data.transition(g, FlipB, FlipA)
+        if touch:
+            data[FlipA].grid
+
+
+def measure(touch: bool, n: int = 500) -> tuple[float, float, float]:
+    """Returns microseconds, allocated blocks, and allocated KiB per transition"""
+    g = FlipGame(FlipData, FlipA)
+    flip(g, 10, touch)
+
+    start = perf_counter()
+    flip(g, n, touch)
+    elapsed = perf_counter() - start
+
+    # Keep the replaced values alive so the snapshots count every allocation instead of the net change
+    kept = []
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    flip(g, n // 10, touch, kept)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    size = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+
+    transitions = 2 * n
+    return elapsed / transitions * 1e6, blocks / (transitions // 10), size / 1024 / (transitions // 10)
+
+
+def main() -> None:
+    print(f"{'scenario':<28}{'us/transition':>15}{'blocks/transition':>19}{'KiB/transition':>16}")
+    for touch, name in ((False, "transients untouched"), (True, "one transient read per flip")):
+        micros, blocks, kib = measure(touch)
+        print(f"{name:<28}{micros:>15.1f}{blocks:>19.1f}{kib:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Compares redrawing every TurtleEntity each frame with the dirty-tracking TurtleRenderer, for a scene of mostly static
+entities where a few move each frame. Timing needs a display; without one the turtles are replaced by fakes that only
+count the calls each approach makes
+
+Run from the repository root with: python -m benchmarks.bench_turtle_render
+"""
+import random
+import tkinter
+import turtle
+from time import perf_counter
+
+import turtle_entity
+import turtle_renderer
+
+
+ENTITIES = 1000
+MOVING = 10
+FRAMES = 200
+
+
+class CountingTurtle:
+    calls = 0
+
+    def __getattr__(self, name):
+        def call(*args):
+            CountingTurtle.calls += 1
+        return call
+
+
+class CountingScreen(CountingTurtle):
+    pass
+
+
+def make_entities(rng: random.Random) -> list[turtle_entity.TurtleEntity]:
+    return [turtle_entity.TurtleEntity("square", rng.uniform(-300, 300), rng.uniform(-300, 300)) for _ in range(ENTITIES)]
+
+
+def move_some(entities: list[turtle_entity.TurtleEntity], rng: random.Random) -> None:
+    for e in rng.sample(entities, MOVING):
+        e.x += rng.uniform(-2, 2)
+        e.y += rng.uniform(-2, 2)
+
+
+def full_redraw(screen, rng: random.Random) -> float:
+    entities = make_entities(rng)
+    CountingTurtle.calls = 0
+    start = perf_counter()
+    for _ in range(FRAMES):
+        move_some(entities, rng)
+        for e in entities:
+            e.turtle.shape(e.shape)
+            e.turtle.goto(e.x, e.y)
+        screen.update()
+    return (perf_counter() - start) / FRAMES
+
+
+def retained(screen, rng: random.Random) -> float:
+    renderer = turtle_renderer.TurtleRenderer(screen)
+    entities = make_entities(rng)
+    for e in entities:
+        renderer.add(e)
+    renderer.flush()
+    CountingTurtle.calls = 0
+    start = perf_counter()
+    for _ in range(FRAMES):
+        move_some(entities, rng)
+        renderer.flush()
+    return (perf_counter() - start) / FRAMES
+
+
+def main() -> None:
+    try:
+        screen = turtle.getscreen()
+        screen.tracer(0, 0)
+        counting = False
+    except tkinter.TclError:
+        print("No display, counting turtle calls instead of timing frames")
+        turtle_entity.TurtleEntity.create_default_turtle = staticmethod(CountingTurtle)
+        screen = CountingScreen()
+        counting = True
+
+    print(f"{ENTITIES} entities, {MOVING} moving per frame")
+    for name, fn in (("full redraw", full_redraw), ("retained", retained)):
+        per_frame = fn(screen, random.Random(0))
+        if counting:
+            print(f"{name:>12}: {CountingTurtle.calls / FRAMES:9.1f} turtle calls/frame")
+        else:
+            print(f"{name:>12}: {per_frame * 1000:9.3f} ms/frame")
+
+
+if __name__ == "__main__":
+    main()
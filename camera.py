@@ -0,0 +1,116 @@
+from __future__ import annotations
+from typing import Any, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import collision
+    import entity
+
+rect_type = tuple[float, float, float, float]
+
+
+class Camera:
+    """
+    A width by height view of the world centred on x, y. With a target, update keeps the target inside the deadzone,
+    a box around the centre it can move around in without the camera following, and bounds keep the view inside the
+    level. Anything outside the view plus margin on every side can be skipped, see cull_rect
+    """
+    # Turn these off to lock the camera on an axis, e.g. a sidescroller that only scrolls sideways
+    follow_x = True
+    follow_y = True
+
+    def __init__(self, width: float, height: float, x: float = 0, y: float = 0, margin: float = 0,
+                 target: Optional[entity.Entity] = None, deadzone: tuple[float, float] = (0, 0),
+                 bounds: Optional[rect_type] = None, catch_up: float = 1):
+        """
+        :param width: Width of the view in world units
+        :param height: Height of the view in world units
+        :param margin: Extra distance around the view that still counts as on screen for culling
+        :param target: Entity to follow
+        :param deadzone: Width and height of the box the target can move in without the camera following
+        :param bounds: Left, bottom, right and top edges the view isn't allowed to go past
+        :param catch_up: Fraction of the way to the target covered each update, 1 to snap to it
+        """
+        self.width = width
+        self.height = height
+        self.x = x
+        self.y = y
+        self.margin = margin
+        self.target = target
+        self.deadzone = deadzone
+        self.bounds = bounds
+        self.catch_up = catch_up
+        self._clamp()
+
+    @classmethod
+    def for_screen(cls, screen: Any, **kwargs) -> Camera:
+        """Camera the size of a turtle screen's window"""
+        return cls(screen.window_width(), screen.window_height(), **kwargs)
+
+    def follow(self, target: Optional[entity.Entity]) -> None:
+        self.target = target
+
+    def update(self) -> None:
+        """Move towards the target, if there is one"""
+        target = self.target
+        if target is None:
+            return
+        half_w, half_h = self.deadzone[0] / 2, self.deadzone[1] / 2
+        if self.follow_x:
+            self.x += self._chase(target.x - self.x, half_w)
+        if self.follow_y:
+            self.y += self._chase(target.y - self.y, half_h)
+        self._clamp()
+
+    def _chase(self, offset: float, slack: float) -> float:
+        # How far to move on one axis to bring the target back into the deadzone
+        if offset > slack:
+            return (offset - slack) * self.catch_up
+        if offset < -slack:
+            return (offset + slack) * self.catch_up
+        return 0
+
+    def _clamp(self) -> None:
+        if self.bounds is None:
+            return
+        left, bottom, right, top = self.bounds
+        self.x = self._clamp_axis(self.x, self.width / 2, left, right)
+        self.y = self._clamp_axis(self.y, self.height / 2, bottom, top)
+
+    @staticmethod
+    def _clamp_axis(centre: float, half: float, low: float, high: float) -> float:
+        if high - low <= half * 2:
+            # The level is smaller than the view, so centre it
+            return (low + high) / 2
+        return min(max(centre, low + half), high - half)
+
+    def view(self) -> rect_type:
+        """Left, bottom, right and top of what's on screen"""
+        half_w, half_h = self.width / 2, self.height / 2
+        return self.x - half_w, self.y - half_h, self.x + half_w, self.y + half_h
+
+    def cull_rect(self) -> rect_type:
+        """The view grown by the margin. Anything outside it doesn't need to be drawn or updated"""
+        left, bottom, right, top = self.view()
+        m = self.margin
+        return left - m, bottom - m, right + m, top + m
+
+    def overlaps(self, left: float, bottom: float, right: float, top: float) -> bool:
+        """Whether a rectangle is at least partly inside the cull rect"""
+        cleft, cbottom, cright, ctop = self.cull_rect()
+        return left <= cright and cleft <= right and bottom <= ctop and cbottom <= top
+
+    def to_screen(self, x: float, y: float) -> tuple[float, float]:
+        """Turn world coordinates into coordinates relative to the centre of the screen"""
+        return x - self.x, y - self.y
+
+    def to_world(self, x: float, y: float) -> tuple[float, float]:
+        return x + self.x, y + self.y
+
+    def active(self, world: collision.CollisionWorld) -> list[entity.Entity]:
+        """Entities in the cull rect, which are the only ones that need updating"""
+        return world.in_rect(*self.cull_rect())
+
+
+class SideScrollCamera(Camera):
+    """Camera that only scrolls sideways to follow its target"""
+    follow_y = False
@@ -0,0 +1,369 @@
+from __future__ import annotations
+from typing import Iterator, Iterable, Mapping, Optional
+from collections import defaultdict
+from itertools import chain
+from math import floor, hypot
+from types import MappingProxyType
+
+import entity
+
+
+cell_range_type = tuple[int, int, int, int]
+
+
+def _cell_range(size: float, left: float, bottom: float, right: float, top: float) -> cell_range_type:
+    return floor(left / size), floor(bottom / size), floor(right / size), floor(top / size)
+
+
+def _cells_in(cell_range: cell_range_type) -> Iterator[tuple[int, int]]:
+    x0, y0, x1, y1 = cell_range
+    for cx in range(x0, x1 + 1):
+        for cy in range(y0, y1 + 1):
+            yield cx, cy
+
+
+class StaticGrid:
+    """
+    Spatial hash for entities that never move, built once in bulk. Buckets are tuples in a read-only mapping, so
+    nothing is ever rehashed, and the bounds of the occupied cells are worked out up front
+    """
+
+    def __init__(self, cell_size: float, entities: Iterable[entity.Entity] = ()):
+        buckets: defaultdict[tuple[int, int], list[entity.Entity]] = defaultdict(list)
+        cell_ranges = {}
+        for e in entities:
+            cell_range = cell_ranges[e] = _cell_range(cell_size, *e.hitbox())
+            for cell in _cells_in(cell_range):
+                buckets[cell].append(e)
+
+        self.cell_size = cell_size
+        self.cells: Mapping[tuple[int, int], tuple[entity.Entity, ...]] = MappingProxyType(
+            {cell: tuple(bucket) for cell, bucket in buckets.items()})
+        self.cell_ranges: Mapping[entity.Entity, cell_range_type] = MappingProxyType(cell_ranges)
+        self.bounds: Optional[cell_range_type] = None
+        if cell_ranges:
+            ranges = cell_ranges.values()
+            self.bounds = (min(r[0] for r in ranges), min(r[1] for r in ranges),
+                           max(r[2] for r in ranges), max(r[3] for r in ranges))
+
+    def __len__(self) -> int:
+        return len(self.cell_ranges)
+
+    def __contains__(self, e: entity.Entity) -> bool:
+        return e in self.cell_ranges
+
+    def __iter__(self) -> Iterator[entity.Entity]:
+        return iter(self.cell_ranges)
+
+
+class CollisionWorld:
+    """
+    Broadphase for entity hitboxes using a uniform spatial hash grid.
+    An entity's x and y are the centre of its hitbox, and it's stored in every cell its hitbox overlaps.
+    Pick a cell size around the size of a typical hitbox so most entities only cover a few cells.
+
+    Entities that aren't mobile are baked into a StaticGrid instead, which is never updated.
+    Sleeping is opt-in: with sleep_ticks set, mobile entities whose hitbox hasn't changed for that many updates fall
+    asleep, and update_all and active_pairs skip them until they're moved with update, woken with wake, touched by
+    an awake entity, or woken in their EntityStore. Moving a sleeping plain Entity by setting its x and y isn't
+    noticed until one of those happens
+    """
+    # None keeps every entity awake
+    sleep_ticks: Optional[int] = None
+
+    def __init__(self, cell_size: float = 32, entities: Iterable[entity.Entity] = ()):
+        if cell_size <= 0:
+            raise ValueError("Cell size must be positive")
+        self.cell_size = cell_size
+        self.cells: defaultdict[tuple[int, int], set[entity.Entity]] = defaultdict(set)
+        self.cell_ranges: dict[entity.Entity, cell_range_type] = {}
+
+        # Awake entities with the hitbox they were last hashed with and how many updates it's stayed the same for
+        self.awake: dict[entity.Entity, list] = {}
+
+        # Entities kept in an EntityStore by store and slot, so waking them in the store wakes them here too
+        self.store_slots: defaultdict[object, dict[int, entity.Entity]] = defaultdict(dict)
+
+        # Bounds of the occupied cells, recomputed lazily once a cell is emptied
+        self._occupied: Optional[cell_range_type] = None
+
+        entities = list(entities)
+        self.static = StaticGrid(cell_size, (e for e in entities if not e.mobile))
+        for e in entities:
+            if e.mobile:
+                self.add(e)
+
+    def __len__(self) -> int:
+        return len(self.cell_ranges)
+
+    def __contains__(self, e: entity.Entity) -> bool:
+        return e in self.cell_ranges
+
+    def __iter__(self) -> Iterator[entity.Entity]:
+        return iter(self.cell_ranges)
+
+    def _cell(self, x: float, y: float) -> tuple[int, int]:
+        return floor(x / self.cell_size), floor(y / self.cell_size)
+
+    def _cell_range(self, left: float, bottom: float, right: float, top: float) -> cell_range_type:
+        return _cell_range(self.cell_size, left, bottom, right, top)
+
+    def _entity_range(self, e: entity.Entity) -> cell_range_type:
+        return self._cell_range(*e.hitbox())
+
+    _cells_in = staticmethod(_cells_in)
+
+    def add(self, e: entity.Entity) -> None:
+        if e in self.cell_ranges:
+            raise ValueError("Entity is already in the collision world")
+        if not e.mobile:
+            raise ValueError("Static entities have to be baked in with bake_static")
+        hitbox = e.hitbox()
+        cell_range = self.cell_ranges[e] = self._cell_range(*hitbox)
+        self.awake[e] = [hitbox, 0]
+        for cell in self._cells_in(cell_range):
+            self.cells[cell].add(e)
+        self._grow_occupied(cell_range)
+
+        store = getattr(e, 'store', None)
+        if store is not None:
+            store.watchers.add(self)
+            self.store_slots[store][e.slot] = e
+
+    def remove(self, e: entity.Entity) -> None:
+        self.awake.pop(e, None)
+        store = getattr(e, 'store', None)
+        if store is not None:
+            self.store_slots[store].pop(e.slot, None)
+        for cell in self._cells_in(self.cell_ranges.pop(e)):
+            self._discard(cell, e)
+
+    def bake_static(self, entities: Iterable[entity.Entity]) -> None:
+        """Replace the static entities. Building the grid costs about as much as adding them all"""
+        self.static = StaticGrid(self.cell_size, entities)
+        self._occupied = None
+
+    def sleeping(self, e: entity.Entity) -> bool:
+        return e in self.cell_ranges and e not in self.awake
+
+    def sleep(self, e: entity.Entity) -> None:
+        self.awake.pop(e, None)
+
+    def wake(self, e: entity.Entity) -> None:
+        """Wake an entity, e.g. after moving it without update. It's rehashed on the next update_all"""
+        if e not in self.awake and e in self.cell_ranges:
+            # The stale hitbox makes update_all notice if it moved while it was asleep
+            self.awake[e] = [None, 0]
+            e.wake()
+
+    def slot_woken(self, store: object, slot: int) -> None:
+        """Called by an EntityStore this world watches when one of its slots wakes up"""
+        e = self.store_slots[store].get(slot)
+        if e is not None:
+            self.wake(e)
+
+    def _discard(self, cell: tuple[int, int], e: entity.Entity) -> None:
+        bucket = self.cells[cell]
+        bucket.discard(e)
+        if not bucket:
+            del self.cells[cell]
+            self._occupied = None
+
+    def _grow_occupied(self, cell_range: cell_range_type) -> None:
+        if self._occupied is not None:
+            x0, y0, x1, y1 = self._occupied
+            self._occupied = min(x0, cell_range[0]), min(y0, cell_range[1]), max(x1, cell_range[2]), max(y1, cell_range[3])
+
+    def occupied_range(self) -> cell_range_type:
+        if self._occupied is None:
+            cxs = [cx for cx, _ in self.cells]
+            cys = [cy for _, cy in self.cells]
+            bounds = self.static.bounds
+            if bounds is not None:
+                cxs += bounds[0], bounds[2]
+                cys += bounds[1], bounds[3]
+            self._occupied = min(cxs), min(cys), max(cxs), max(cys)
+        return self._occupied
+
+    def update(self, e: entity.Entity) -> None:
+        """
+        Rehash an entity after it moved or its hitbox changed. Only touches the grid if it changed cells
+
+        :param e: The entity that moved, which is woken up if it's asleep
+        """
+        self.wake(e)
+        hitbox = e.hitbox()
+        state = self.awake[e]
+        state[0] = hitbox
+        state[1] = 0
+        self._rehash(e, self._cell_range(*hitbox))
+
+    def _rehash(self, e: entity.Entity, new: cell_range_type) -> None:
+        old = self.cell_ranges[e]
+        if new == old:
+            return
+
+        self.cell_ranges[e] = new
+        old_cells = set(self._cells_in(old))
+        new_cells = set(self._cells_in(new))
+        for cell in old_cells - new_cells:
+            self._discard(cell, e)
+        for cell in new_cells - old_cells:
+            self.cells[cell].add(e)
+        self._grow_occupied(new)
+
+    def update_all(self) -> None:
+        """
+        Rehash every awake entity that changed cells since the last update. Entities that haven't moved for
+        sleep_ticks updates fall asleep, so this only costs as much as the awake entities
+        """
+        sleep_ticks = self.sleep_ticks
+        tired = []
+        for e, state in self.awake.items():
+            hitbox = e.hitbox()
+            if hitbox == state[0]:
+                state[1] += 1
+                # Entities in a store only sleep here once the store has put them to sleep too, so it can wake them
+                if sleep_ticks is not None and state[1] >= sleep_ticks and getattr(e, 'sleeping', True):
+                    tired.append(e)
+                continue
+            state[0] = hitbox
+            state[1] = 0
+            self._rehash(e, self._cell_range(*hitbox))
+        for e in tired:
+            del self.awake[e]
+
+    def pairs(self) -> Iterator[tuple[entity.Entity, entity.Entity]]:
+        """
+        Find every pair of mobile entities whose hitboxes overlap, asleep or not, each pair reported once
+
+        :return: Iterator of overlapping pairs
+        """
+        cell_ranges = self.cell_ranges
+        for (cx, cy), bucket in self.cells.items():
+            if len(bucket) < 2:
+                continue
+            members = list(bucket)
+            for i, a in enumerate(members):
+                ax0, ay0, _, _ = cell_ranges[a]
+                for b in members[i + 1:]:
+                    bx0, by0, _, _ = cell_ranges[b]
+                    # Two entities share every cell their ranges have in common, so only report the pair in the
+                    # lowest of those cells
+                    if max(ax0, bx0) == cx and max(ay0, by0) == cy and a.overlaps(b):
+                        yield a, b
+
+    def active_pairs(self) -> Iterator[tuple[entity.Entity, entity.Entity]]:
+        """
+        Find the overlapping pairs with at least one awake entity, including awake entities touching static ones,
+        each pair reported once with an awake entity first. Sleeping entities that are touched are woken up once
+        every pair has been found. Costs as much as the awake entities and their neighbours, however many are
+        asleep or static
+
+        :return: Iterator of overlapping pairs
+        """
+        cells = self.cells
+        cell_ranges = self.cell_ranges
+        awake = self.awake
+        static_cells = self.static.cells
+        static_ranges = self.static.cell_ranges
+        touched = []
+        for a in list(awake):
+            ax0, ay0, ax1, ay1 = cell_ranges[a]
+            for cx in range(ax0, ax1 + 1):
+                for cy in range(ay0, ay1 + 1):
+                    cell = cx, cy
+                    for b in cells.get(cell, ()):
+                        if b is a:
+                            continue
+                        b_awake = b in awake
+                        # Pairs of awake entities are found from both sides, so only take them from one
+                        if b_awake and id(b) < id(a):
+                            continue
+                        bx0, by0, _, _ = cell_ranges[b]
+                        if max(ax0, bx0) == cx and max(ay0, by0) == cy and a.overlaps(b):
+                            if not b_awake:
+                                touched.append(b)
+                            yield a, b
+                    for b in static_cells.get(cell, ()):
+                        bx0, by0, _, _ = static_ranges[b]
+                        if max(ax0, bx0) == cx and max(ay0, by0) == cy and a.overlaps(b):
+                            yield a, b
+        for b in touched:
+            self.wake(b)
+
+    def at_point(self, x: float, y: float) -> list[entity.Entity]:
+        cell = self._cell(x, y)
+        found = [e for e in self.cells.get(cell, ()) if e.contains_point(x, y)]
+        found.extend(e for e in self.static.cells.get(cell, ()) if e.contains_point(x, y))
+        return found
+
+    def in_rect(self, left: float, bottom: float, right: float, top: float) -> list[entity.Entity]:
+        """
+        Find every entity whose hitbox overlaps a rectangle
+
+        :return: List of entities, each at most once
+        """
+        cell_range = self._cell_range(left, bottom, right, top)
+        found = []
+        seen = set()
+        static_cells = self.static.cells
+        for cell in self._cells_in(cell_range):
+            for e in chain(self.cells.get(cell, ()), static_cells.get(cell, ())):
+                if e in seen:
+                    continue
+                seen.add(e)
+                eleft, ebottom, eright, etop = e.hitbox()
+                if eleft < right and left < eright and ebottom < top and bottom < etop:
+                    found.append(e)
+        return found
+
+    def nearest(self, x: float, y: float, max_distance: Optional[float] = None,
+                exclude: Optional[entity.Entity] = None) -> Optional[entity.Entity]:
+        """
+        Find the entity whose centre is closest to a point by searching rings of cells outward from the point
+
+        :param x: X coordinate of the point
+        :param y: Y coordinate of the point
+        :param max_distance: Ignore entities further away than this
+        :param exclude: An entity to skip, e.g. the one asking
+        :return: The closest entity or None if there isn't one
+        """
+        if not self.cells and not self.static.cells:
+            return None
+
+        px, py = self._cell(x, y)
+        if max_distance is None:
+            # Stop once the rings cover every occupied cell
+            x0, y0, x1, y1 = self.occupied_range()
+            max_ring = max(abs(px - x0), abs(px - x1), abs(py - y0), abs(py - y1))
+            max_distance = float("inf")
+        else:
+            max_ring = floor(max_distance / self.cell_size) + 1
+
+        best, best_dist = None, max_distance
+        static_cells = self.static.cells
+        for ring in range(max_ring + 1):
+            for cell in self._ring(px, py, ring):
+                for e in chain(self.cells.get(cell, ()), static_cells.get(cell, ())):
+                    if e is exclude:
+                        continue
+                    dist = hypot(e.x - x, e.y - y)
+                    if dist < best_dist or (dist == best_dist and best is None):
+                        best, best_dist = e, dist
+            # Everything in the next ring is at least this far away
+            if best is not None and best_dist <= ring * self.cell_size:
+                break
+        return best
+
+    @staticmethod
+    def _ring(px: int, py: int, ring: int) -> Iterator[tuple[int, int]]:
+        if ring == 0:
+            yield px, py
+            return
+        for cx in range(px - ring, px + ring + 1):
+            yield cx, py - ring
+            yield cx, py + ring
+        for cy in range(py - ring + 1, py + ring):
+            yield px - ring, cy
+            yield px + ring, cy
@@ -1,9 +1,12 @@
+from __future__ import annotations
 from typing import Type, Optional, Any, Callable
 from collections import defaultdict
 from copy import deepcopy
+from operator import attrgetter
 
 import game
 import scene
+import util
 
 class DataStore:
     class _Accessor:
@@ -14,20 +17,56 @@ class DataStore:
             super().__setattr__('_scene', sc)
 
         def __getattr__(self, field: str):
-            self._store._assert_access_allowed(field, self._scene)
-            return getattr(self._store.storage_inst, field)
+            store = self._store
+            store._assert_access_allowed(field, self._scene)
+            value = getattr(store.storage_inst, field)
+            if store.track_writes:
+                store._record_read(field, value)
+            return value
 
         def __setattr__(self, field, value):
-            self._store._assert_access_allowed(field, self._scene)
-            setattr(self._store.storage_inst, field, value)
+            store = self._store
+            store._assert_access_allowed(field, self._scene)
+            setattr(store.storage_inst, field, value)
+            if store.track_writes:
+                store.mark_written(field)
 
-    def __init__(self, cls: Type):
-        self.storage_inst = cls()
-        self.accessors: dict[Type[scene.Scene], DataStore._Accessor] = {}
+    class _CompiledAccessor:
+        """
+        Base for the accessor classes generated per scene by DataStore._compile_accessor.
+        Every field has a descriptor, so permissions are decided once when the classes are made
+        """
+        __slots__ = ('_store', '_storage', '_scene')
+
+        def __init__(self, store: "DataStore", sc: Type["scene.Scene"]):
+            self._store = store
+            self._storage = store.storage_inst
+            self._scene = sc
+
+    # Generated accessor classes, keyed by storage class, scene, and whether writes are tracked.
+    # The scene None holds the class shared by all the scene classes of a storage class
+    compiled_accessors: dict[tuple[Type, Optional[Type["scene.Scene"]], bool], Type["DataStore._CompiledAccessor"]] = {}
+
+    # Set to False to fall back to the generic accessor that checks permissions on every access
+    compile_accessors = True
+
+    # Values of these types can't be changed in place, so reading them can never hide a write
+    immutable_types: set[type] = {int, float, complex, bool, str, bytes, range, type(None)}
+
+    def __init__(self, cls: Type, track_writes: bool = False, snapshots: bool = False):
+        """
+        :param cls: The storage class declaring the fields
+        :param track_writes: Track which fields are written, for incremental transition evaluation
+        :param snapshots: Allow snapshot and restore. Snapshots find changed fields by tracking writes, so this turns
+            write tracking on too
+        """
+        self.storage_cls = cls
+        self.accessors: dict[Type[scene.Scene], DataStore._Accessor | DataStore._CompiledAccessor] = {}
         self.field_access: dict[str, access_types] = {}
         self.field_defaults: dict[str, Any] = {}
         self.transients: defaultdict[Type[scene.Scene], set] = defaultdict(set)
         self.transient_factories: dict[str, Callable[[game.Game], Any]] = {}
+        self.frozen_defaults: set[str] = set()
         for field in cls.__annotations__:
             try:
                 default, access = getattr(cls, field)
@@ -43,19 +82,248 @@ class DataStore:
                     self.transients[sc].add(field)
                 if access.factory is not None:
                     self.transient_factories[field] = access.factory
+                elif self._is_frozen(default):
+                    self.frozen_defaults.add(field)
 
+        # A subclass of the storage class per store, so lazy fields can find the store without touching the instance
+        self.storage_inst = type(cls.__name__, (self._storage_class(cls),), {'_data_store': self})()
+        for field, default in self.field_defaults.items():
             setattr(self.storage_inst, field, deepcopy(default))
 
+        # Snapshot state (see snapshot). base is the field values as of the last snapshot or restore, which fields
+        # missing from the storage instance are filled in from. Fields written since then are in snapshot_dirty, and
+        # fields reset since then are in reset_fields
+        self.field_index: dict[str, int] = {field: i for i, field in enumerate(self.field_defaults)}
+        self.base: Optional[util.PersistentVector] = None
+        self.snapshot_dirty: set[str] = set()
+        self.reset_fields: set[str] = set()
+        if snapshots:
+            track_writes = True
+            self.base = util.PersistentVector(self.field_defaults.values())
+
+        # Fields written since a replication.Server last collected them, None while nothing is replicating the store
+        self.replication_dirty: Optional[set[str]] = None
+
+        # Game the pending transient factories will be called with
+        self.factory_game: Optional[game.Game] = None
+
+        # Write tracking used for incremental transition evaluation (see evaluate_tracked)
+        self.track_writes = track_writes
+        self.write_clock = 0
+        self.field_written: dict[str, int] = {}
+        self.reads: Optional[set[str]] = None
+        self.condition_cache: dict[tuple[Type[scene.Scene], scene.TransitionCondition], tuple[bool, set[str], int]] = {}
+
+        # Build the accessors of every scene the fields mention up front
+        for access in self.field_access.values():
+            for sc in access.args:
+                self[sc]
+
+    # Subclasses of the storage classes that fill in reset or restored fields on first read, keyed by storage class
+    storage_classes: dict[Type, Type] = {}
+
+    def _storage_class(self, cls: Type) -> Type:
+        try:
+            return self.storage_classes[cls]
+        except KeyError:
+            pass
+
+        fields = list(self.field_defaults)
+
+        def __reduce__(inst):
+            # Pickles and copies are plain instances of the storage class, with every field filled in
+            return _plain_instance, (cls, {field: getattr(inst, field) for field in fields})
+
+        namespace = {field: _LazyField(field, getattr(cls, field)) for field in fields}
+        namespace['__reduce__'] = __reduce__
+        self.storage_classes[cls] = type(cls.__name__, (cls,), namespace)
+        return self.storage_classes[cls]
+
+    @classmethod
+    def _is_frozen(cls, value: Any) -> bool:
+        if type(value) in cls.immutable_types:
+            return True
+        if type(value) in (tuple, frozenset):
+            return all(cls._is_frozen(item) for item in value)
+        return False
+
+    def _compile_accessor(self, sc: Type[scene.Scene]) -> Type[DataStore._CompiledAccessor]:
+        key = (self.storage_cls, sc, self.track_writes)
+        try:
+            return self.compiled_accessors[key]
+        except KeyError:
+            pass
+
+        # Scene classes only override the fields they may use, so their size doesn't grow with the whole store
+        namespace = {'__slots__': ()}
+        for field, access in self.field_access.items():
+            if not isinstance(access, Access.game) and sc in access.args:
+                namespace[field] = self._field_property(field, self.track_writes)
+
+        name = f"{getattr(sc, '__name__', 'Default')}Accessor"
+        self.compiled_accessors[key] = type(name, (self._compile_accessor_base(),), namespace)
+        return self.compiled_accessors[key]
+
+    def _compile_accessor_base(self) -> Type[DataStore._CompiledAccessor]:
+        key = (self.storage_cls, None, self.track_writes)
+        try:
+            return self.compiled_accessors[key]
+        except KeyError:
+            pass
+
+        # Game fields are allowed everywhere, and everything else is forbidden unless a scene class overrides it
+        namespace = {'__slots__': ()}
+        for field, access in self.field_access.items():
+            if isinstance(access, Access.game):
+                namespace[field] = self._field_property(field, self.track_writes)
+            else:
+                namespace[field] = self._forbidden_property(field)
+
+        name = f"{self.storage_cls.__name__}Accessor"
+        self.compiled_accessors[key] = type(name, (DataStore._CompiledAccessor,), namespace)
+        return self.compiled_accessors[key]
+
+    @staticmethod
+    def _field_property(field: str, track_writes: bool) -> property:
+        if not track_writes:
+            # attrgetter runs in C, so an allowed read costs the same as reading the storage object directly
+            def fset(self, value):
+                setattr(self._storage, field, value)
+            return property(attrgetter(f"_storage.{field}"), fset)
+
+        def fget(self):
+            value = getattr(self._storage, field)
+            self._store._record_read(field, value)
+            return value
+
+        def fset(self, value):
+            setattr(self._storage, field, value)
+            self._store.mark_written(field)
+
+        return property(fget, fset)
+
+    @staticmethod
+    def _forbidden_property(field: str) -> property:
+        def forbidden(self, *args):
+            raise TypeError(f"Scene {self._scene.__name__} cannot access field {field}")
+        return property(forbidden, forbidden)
+
     def _assert_access_allowed(self, field: str, sc: Type["scene.Scene"]):
         if not (isinstance(self.field_access[field], Access.game) or sc in self.field_access[field].args):
             raise TypeError(f"Scene {sc.__name__} cannot access field {field}")
 
+    def mark_written(self, field: str) -> None:
+        self.write_clock += 1
+        self.field_written[field] = self.write_clock
+        if self.base is not None:
+            self.snapshot_dirty.add(field)
+        if self.replication_dirty is not None:
+            self.replication_dirty.add(field)
+
+    def _record_read(self, field: str, value: Any) -> None:
+        if self.reads is not None:
+            self.reads.add(field)
+        elif type(value) not in self.immutable_types:
+            # Whoever read a mutable value may change it in place, which we can't see, so treat it as written
+            self.mark_written(field)
+
+    def evaluate_tracked(self, condition: scene.TransitionCondition, sc: Type[scene.Scene], g: game.Game) -> bool:
+        """
+        Evaluate a transition condition, reusing its last result if none of the fields it read have been written since
+
+        :param condition: The condition to evaluate
+        :param sc: The scene the condition is being checked for
+        :param g: The current game
+        :return: Whether the condition holds
+        """
+        if condition.volatile:
+            return condition(sc, g)
+
+        key = (sc, condition)
+        cached = self.condition_cache.get(key)
+        if cached is not None:
+            result, deps, stamp = cached
+            if stamp == self.write_clock or all(self.field_written.get(field, 0) <= stamp for field in deps):
+                return result
+
+        stamp = self.write_clock
+        outer, self.reads = self.reads, set()
+        try:
+            result = condition(sc, g)
+            deps = self.reads
+        finally:
+            self.reads = outer
+        if outer is not None:
+            outer |= deps
+        self.condition_cache[key] = (result, deps, stamp)
+        return result
+
     def reset_transients(self, g: game.Game, sc: Type["scene.Scene"]):
+        # Frozen defaults can be shared as they are. Anything else is dropped and only rebuilt if it's read again
+        self.factory_game = g
+        values = vars(self.storage_inst)
         for field in self.transients[sc]:
-            if field in self.transient_factories:
-                setattr(self.storage_inst, field, self.transient_factories[field](g))
+            if field in self.frozen_defaults:
+                values[field] = self.field_defaults[field]
             else:
-                setattr(self.storage_inst, field, deepcopy(self.field_defaults[field]))
+                values.pop(field, None)
+                if self.base is not None:
+                    self.reset_fields.add(field)
+            if self.track_writes:
+                self.mark_written(field)
+
+    def _materialize(self, field: str) -> Any:
+        if self.base is not None and field not in self.reset_fields:
+            value = self.base[self.field_index[field]]
+            if value is not _RESET:
+                # Snapshots share their values, so only a copy can be handed out to be changed
+                return value if self._is_frozen(value) else deepcopy(value)
+        if field in self.transient_factories:
+            return self.transient_factories[field](self.factory_game)
+        return deepcopy(self.field_defaults[field])
+
+    def snapshot(self) -> util.PersistentVector:
+        """
+        Capture every field's value. Only fields written or reset since the last snapshot or restore are copied,
+        everything else is shared with the previous snapshot. Writes have to go through accessors to be seen
+
+        :return: Immutable field values, to pass to restore
+        """
+        if self.base is None:
+            raise RuntimeError("Snapshots aren't enabled for this data store")
+
+        values = vars(self.storage_inst)
+        changes = {}
+        for field in self.snapshot_dirty:
+            if field in values:
+                value = values[field]
+                changes[self.field_index[field]] = value if self._is_frozen(value) else deepcopy(value)
+            elif field in self.reset_fields:
+                changes[self.field_index[field]] = _RESET
+
+        self.base = self.base.set_many(changes)
+        self.snapshot_dirty = set()
+        self.reset_fields = set()
+        return self.base
+
+    def restore(self, fields: util.PersistentVector) -> None:
+        """
+        Go back to the field values of a snapshot. No values are copied here, each field is copied out of the snapshot
+        the first time it's read afterwards
+        """
+        if self.base is None:
+            raise RuntimeError("Snapshots aren't enabled for this data store")
+
+        self.storage_inst.__dict__ = {}
+        self.base = fields
+        self.snapshot_dirty = set()
+        self.reset_fields = set()
+
+        # Any field may have changed, so nothing cached from before can be trusted
+        self.write_clock += 1
+        self.condition_cache = {}
+        if self.replication_dirty is not None:
+            self.replication_dirty.update(self.field_index)
 
     def transition(self, g: game.Game, leaving: Type["scene.Scene"], entering: Type["scene.Scene"]):
         self.reset_transients(g, leaving)
@@ -66,19 +334,55 @@ class DataStore:
         try:
             return self.accessors[item]
         except KeyError:
-            self.accessors[item] = self._Accessor(self, item)
+            if self.compile_accessors:
+                self.accessors[item] = self._compile_accessor(item)(self, item)
+            else:
+                self.accessors[item] = self._Accessor(self, item)
         return self.accessors[item]
 
 
+# Snapshot value of a transient field that was reset and not read again, so it's rebuilt from its default
+_RESET = object()
+
+
+def _plain_instance(cls: Type, values: dict[str, Any]) -> Any:
+    inst = cls.__new__(cls)
+    vars(inst).update(values)
+    return inst
+
+
+class _LazyField:
+    """
+    Non-data descriptor on the storage class for a field, in the style of functools.cached_property.
+    It's only reached when a transient reset or a snapshot restore has removed the field from the storage instance,
+    and puts the fresh value back
+    """
+    def __init__(self, field: str, declared: Any):
+        self.field = field
+        self.declared = declared
+
+    def __get__(self, inst: Any, owner: Type = None) -> Any:
+        if inst is None:
+            return self.declared
+        value = vars(inst)[self.field] = type(inst)._data_store._materialize(self.field)
+        return value
+
+
 access_types = "Access.static | Access.transient | Access.game"
 class Access:
     class _StoreArgs:
-        def __init__(self, *args):
+        def __init__(self, *args, replicate: bool = True, checksum: bool = True):
             self.args: Optional[set] = set(args)
 
+            # Whether a replication.Server sends the field to clients
+            self.replicate = replicate
+
+            # Whether replay.checksum covers the field, e.g. off for turtles or other objects that can't be saved
+            self.checksum = checksum
+
     class static(_StoreArgs): pass
     class transient(_StoreArgs):
-        def __init__(self, *args, factory=None):
-            super().__init__(*args)
+        def __init__(self, *args, factory=None, replicate: bool = True, checksum: bool = True):
+            super().__init__(*args, replicate=replicate, checksum=checksum)
             self.factory = factory
     class game(_StoreArgs): pass
@@ -1,37 +1,114 @@
 from abc import ABC, abstractmethod
 import re
-import glob
 import os
 
+import util
+
 
 class Entity(ABC):
+    # Static entities never move, so collision worlds bake them into a precomputed structure instead of rehashing them
+    mobile = True
+
     def __init__(self, x=0, y=0, hitwidth=0, hitheight=0):
         self.x = x
         self.y = y
         self.hitheight = hitheight
         self.hitwidth = hitwidth
 
+    def hitbox(self) -> tuple[float, float, float, float]:
+        """
+        Get the edges of the hitbox, which is centred on the entity's position
 
-class AnimatedEntity(ABC, Entity):
-    def __init__(self, folderpath, x=0, y=0, hitwidth=0, hitheight=0, file_ext="gif"):
-        super().__init__(x, y, hitwidth, hitheight)
+        :return: Tuple of left, bottom, right, top
+        """
+        half_w = self.hitwidth / 2
+        half_h = self.hitheight / 2
+        return self.x - half_w, self.y - half_h, self.x + half_w, self.y + half_h
+
+    def overlaps(self, other: "Entity") -> bool:
+        return (abs(self.x - other.x) * 2 < self.hitwidth + other.hitwidth
+                and abs(self.y - other.y) * 2 < self.hitheight + other.hitheight)
+
+    def contains_point(self, x: float, y: float) -> bool:
+        return abs(self.x - x) * 2 < self.hitwidth and abs(self.y - y) * 2 < self.hitheight
+
+    def wake(self) -> None:
+        """Called when something touches the entity while it's asleep in a collision world"""
+
+
+class FrameSet:
+    """
+    Frames of one animation, stored as files <folder>/<folder name><n>.<ext> numbered from 0 without gaps.
+    Frame sets are shared by the whole process, so a folder is only scanned and checked once however many entities
+    use it. Frame data is only read when it's asked for, and kept in an LRU cache with a memory budget
+    """
+    sets: dict[tuple[str, str], "FrameSet"] = {}
+    data_cache = util.BudgetLRU(budget=64 * 2 ** 20)
+
+    # Whether the paths are files on disk, rather than names for frames from somewhere else like an atlas
+    is_file = True
+
+    def __init__(self, folderpath: str, file_ext: str = "gif"):
+        folderpath = os.path.normpath(folderpath)
+        foldername = os.path.basename(folderpath)
+        pattern = re.compile(fr"{re.escape(foldername)}(\d+)\.{re.escape(file_ext)}")
 
         # Find all the frames in the correct folder
-        foldername = os.path.dirname(folderpath)
         frame_dict = {}
-        for f in glob.glob(fr"{folderpath}/*.{file_ext}"):
-            match = re.fullmatch(fr"{folderpath}/{foldername}(\d+)\.gif", f)
-            if match is None:
-                continue
-            frame_dict[int(match[1])] = f
+        for f in os.listdir(folderpath):
+            match = pattern.fullmatch(f)
+            if match is not None:
+                frame_dict[int(match[1])] = os.path.join(folderpath, f)
 
         if not frame_dict:
             raise ValueError(f"No frames provided in folder {foldername}")
 
         # Store frames in list
-        self.frames = []
-        last_frame = max(frame_dict)
-        for i in range(last_frame + 1):
+        self.paths: list[str] = []
+        for i in range(max(frame_dict) + 1):
             if i not in frame_dict:
                 raise ValueError(f"Missing frames for {foldername}")
-            self.frames.append(frame_dict[i])
+            self.paths.append(frame_dict[i])
+
+    @classmethod
+    def get(cls, folderpath: str, file_ext: str = "gif") -> "FrameSet":
+        key = (os.path.normpath(folderpath), file_ext)
+        try:
+            return cls.sets[key]
+        except KeyError:
+            cls.sets[key] = cls(folderpath, file_ext)
+        return cls.sets[key]
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __getitem__(self, index: int) -> str:
+        return self.paths[index]
+
+    def data(self, index: int) -> bytes | memoryview:
+        path = self.paths[index]
+        return self.data_cache.get(path, lambda: self._read(path))
+
+    @staticmethod
+    def _read(path: str) -> tuple[bytes, int]:
+        with open(path, "rb") as f:
+            data = f.read()
+        return data, len(data)
+
+
+class AnimatedEntity(Entity):
+    def __init__(self, folderpath: str | FrameSet, x=0, y=0, hitwidth=0, hitheight=0, file_ext="gif"):
+        # Frames come from a folder, or from any frame set passed in, e.g. one from an atlas
+        super().__init__(x, y, hitwidth, hitheight)
+        if isinstance(folderpath, FrameSet):
+            self.frame_set = folderpath
+        else:
+            self.frame_set = FrameSet.get(folderpath, file_ext)
+        self.frames = self.frame_set.paths
+        self.frame_index = 0
+
+    def set_frame(self, index: int) -> None:
+        self.frame_index = index % len(self.frames)
+
+    def next_frame(self) -> None:
+        self.set_frame(self.frame_index + 1)
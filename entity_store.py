@@ -0,0 +1,254 @@
+from __future__ import annotations
+from typing import Optional
+import weakref
+
+import numpy as np
+
+import entity
+
+
+class EntityStore:
+    """
+    Struct-of-arrays storage for entities. Each entity is a row (slot) in contiguous arrays, so a whole tick of
+    movement is a few vectorized operations instead of a Python loop over objects.
+    Despawned slots are zeroed and reused through a free list, so the arrays only grow to the peak entity count.
+    Entities that have been slower than sleep_speed for sleep_ticks steps fall asleep and are skipped by integrate
+    until they're woken, so a step costs as much as the awake entities need. Writing to an entity's position,
+    velocity or acceleration through an ArrayEntity wakes it, writing to the arrays directly doesn't.
+    Collision worlds holding the store's entities watch it, so waking a slot wakes it in them too
+    """
+    sleep_speed = 1e-3
+
+    # None keeps every entity awake
+    sleep_ticks: Optional[int] = 60
+
+    def __init__(self, capacity: int = 64):
+        capacity = max(capacity, 1)
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.acc = np.zeros((capacity, 2))
+        self.hitsize = np.zeros((capacity, 2))
+
+        # Zero inverse mass makes an entity immovable by forces
+        self.inv_mass = np.zeros(capacity)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+        # Static entities never wake, so they're never integrated
+        self.static = np.zeros(capacity, dtype=bool)
+        self.awake = np.zeros(capacity, dtype=bool)
+
+        # Consecutive steps each entity has been slower than sleep_speed
+        self.still = np.zeros(capacity, dtype=np.int32)
+
+        # Generations change every time a slot is freed so handles to the old occupant can be detected
+        self.generation = np.zeros(capacity, dtype=np.int64)
+
+        # Slots past end have never been used, slots in free have been used and released
+        self.end = 0
+        self.free: list[int] = []
+
+        # Indices of the awake slots, rebuilt after something wakes up or falls asleep
+        self._awake_slots: Optional[np.ndarray] = None
+
+        # Objects with a slot_woken(store, slot) method to call when a slot wakes
+        self.watchers: weakref.WeakSet = weakref.WeakSet()
+
+    @property
+    def capacity(self) -> int:
+        return len(self.alive)
+
+    def __len__(self) -> int:
+        return self.end - len(self.free)
+
+    def _grow(self) -> None:
+        capacity = self.capacity * 2
+        for name in ('pos', 'vel', 'acc', 'hitsize', 'inv_mass', 'alive', 'static', 'awake', 'still', 'generation'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def spawn(self, x: float = 0, y: float = 0, hitwidth: float = 0, hitheight: float = 0, static: bool = False) -> int:
+        """
+        Claim a slot for a new entity, reusing a released one if there is any
+
+        :param static: Make the entity immovable and never integrate it
+        :return: Index of the slot
+        """
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.end == self.capacity:
+                self._grow()
+            slot = self.end
+            self.end += 1
+
+        self.alive[slot] = True
+        self.pos[slot] = x, y
+        self.hitsize[slot] = hitwidth, hitheight
+        self.inv_mass[slot] = 0 if static else 1
+        self.static[slot] = static
+        self.awake[slot] = not static
+        self._awake_slots = None
+        return slot
+
+    def despawn(self, slot: int) -> None:
+        if not self.alive[slot]:
+            raise ValueError(f"Slot {slot} is not in use")
+
+        # Zeroing the row means integrate can run over dead slots without changing anything
+        self.alive[slot] = self.static[slot] = self.awake[slot] = False
+        self.still[slot] = 0
+        self._awake_slots = None
+        self.pos[slot] = self.vel[slot] = self.acc[slot] = self.hitsize[slot] = self.inv_mass[slot] = 0
+        self.generation[slot] += 1
+        self.free.append(slot)
+
+    def alive_slots(self) -> np.ndarray:
+        return np.flatnonzero(self.alive[:self.end])
+
+    def awake_slots(self) -> np.ndarray:
+        if self._awake_slots is None:
+            self._awake_slots = np.flatnonzero(self.awake[:self.end])
+        return self._awake_slots
+
+    def wake(self, slot: int) -> None:
+        if not self.awake[slot] and self.alive[slot] and not self.static[slot]:
+            self.awake[slot] = True
+            self.still[slot] = 0
+            self._awake_slots = None
+            for watcher in self.watchers:
+                watcher.slot_woken(self, slot)
+
+    def wake_all(self) -> None:
+        """Wake every sleeping entity, e.g. after the forces acting on them changed"""
+        end = self.end
+        sleeping = np.flatnonzero(self.alive[:end] & ~self.static[:end] & ~self.awake[:end])
+        if len(sleeping):
+            self.awake[sleeping] = True
+            self.still[sleeping] = 0
+            self._awake_slots = None
+            for watcher in list(self.watchers):
+                for slot in sleeping.tolist():
+                    watcher.slot_woken(self, slot)
+
+    def sleep(self, slot: int) -> None:
+        if self.awake[slot]:
+            self.awake[slot] = False
+            self.vel[slot] = 0
+            self.still[slot] = 0
+            self._awake_slots = None
+
+    def slots_in(self, left: float, bottom: float, right: float, top: float) -> np.ndarray:
+        """Awake slots whose position is inside a rectangle"""
+        slots = self.awake_slots()
+        pos = self.pos[slots]
+        inside = (pos[:, 0] >= left) & (pos[:, 0] <= right) & (pos[:, 1] >= bottom) & (pos[:, 1] <= top)
+        return slots[inside]
+
+    def integrate(self, dt: float, extra_acc: Optional[np.ndarray] = None,
+                  region: Optional[tuple[float, float, float, float]] = None) -> None:
+        """
+        Advance every awake entity by one step with semi-implicit Euler: velocity from acceleration, then position
+        from the new velocity. Entities that have been slow for long enough fall asleep afterwards
+
+        :param dt: Length of the step
+        :param extra_acc: Acceleration to add on top of each entity's own for this step only, e.g. from external forces
+        :param region: Left, bottom, right and top of the area to simulate, e.g. a camera's cull rect. Entities
+            outside it are frozen where they are without falling asleep
+        """
+        slots = self.awake_slots() if region is None else self.slots_in(*region)
+        if not len(slots):
+            return
+        index = slots
+        if len(slots) == slots[-1] + 1:
+            # Every slot up to the last awake one is awake, so plain slices avoid copying rows around
+            slots = slice(0, len(slots))
+
+        vel = self.vel[slots] + self.acc[slots] * dt
+        if extra_acc is not None:
+            vel += extra_acc[slots] * dt
+        self.vel[slots] = vel
+        self.pos[slots] += vel * dt
+
+        if self.sleep_ticks is not None:
+            slow = np.einsum('ij,ij->i', vel, vel) < self.sleep_speed ** 2
+            still = self.still[slots]
+            still = np.where(slow, still + 1, 0)
+            self.still[slots] = still
+            tired = np.flatnonzero(still >= self.sleep_ticks)
+            if len(tired):
+                tired = index[tired]
+                self.awake[tired] = False
+                self.vel[tired] = 0
+                self.still[tired] = 0
+                self._awake_slots = None
+
+    def entity(self, x: float = 0, y: float = 0, hitwidth: float = 0, hitheight: float = 0) -> ArrayEntity:
+        return ArrayEntity(x, y, hitwidth, hitheight, store=self)
+
+
+def _column(array: str, col: Optional[int] = None) -> property:
+    index = (lambda slot: slot) if col is None else (lambda slot: (slot, col))
+    wakes = array in ('pos', 'vel', 'acc')
+
+    def fget(self: ArrayEntity) -> float:
+        self._check()
+        return float(getattr(self.store, array)[index(self.slot)])
+
+    def fset(self: ArrayEntity, value: float) -> None:
+        self._check()
+        getattr(self.store, array)[index(self.slot)] = value
+        if wakes:
+            self.store.wake(self.slot)
+
+    return property(fget, fset)
+
+
+class ArrayEntity(entity.Entity):
+    """
+    Entity whose data lives in a row of an EntityStore. It's only a handle, so any number of views can be made and
+    dropped without copying. Uses the class's store unless one is passed in.
+    Set mobile to False on a subclass for entities that never move
+    """
+    store: Optional[EntityStore] = None
+
+    x = _column('pos', 0)
+    y = _column('pos', 1)
+    vx = _column('vel', 0)
+    vy = _column('vel', 1)
+    ax = _column('acc', 0)
+    ay = _column('acc', 1)
+    hitwidth = _column('hitsize', 0)
+    hitheight = _column('hitsize', 1)
+    inv_mass = _column('inv_mass')
+
+    def __init__(self, x=0, y=0, hitwidth=0, hitheight=0, store: Optional[EntityStore] = None):
+        if store is not None:
+            self.store = store
+        if self.store is None:
+            raise ValueError("No entity store given and the class has no default store")
+        self.slot = self.store.spawn(static=not self.mobile)
+        self.generation = int(self.store.generation[self.slot])
+        super().__init__(x, y, hitwidth, hitheight)
+
+    def _check(self) -> None:
+        if self.store.generation[self.slot] != self.generation:
+            raise RuntimeError("Entity has been despawned")
+
+    @property
+    def alive(self) -> bool:
+        return bool(self.store.generation[self.slot] == self.generation)
+
+    @property
+    def sleeping(self) -> bool:
+        self._check()
+        return not self.store.awake[self.slot]
+
+    def wake(self) -> None:
+        self._check()
+        self.store.wake(self.slot)
+
+    def despawn(self) -> None:
+        self._check()
+        self.store.despawn(self.slot)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+from typing import Any, Callable, TYPE_CHECKING
+from bisect import insort
+from collections import defaultdict
+from itertools import count
+
+if TYPE_CHECKING:
+    from game import Game
+
+
+event_handler_type = Callable[[Any, "Game"], None]
+
+
+class EventBus:
+    """
+    Queues events and hands them to the handlers subscribed to their type in one batch per tick, after the scene's
+    update. Events are any objects, and handlers are looked up by the event's exact type, so nothing runs for an event
+    type nobody is listening to. Handlers with a higher priority run first, and so do events
+
+    Posting an event equal to one already queued only raises the queued one's priority, so a burst of identical events
+    is handled once. Events that aren't hashable are never coalesced. Events posted while a batch is being dispatched
+    go in the next batch
+    """
+
+    def __init__(self):
+        self.handlers: defaultdict[type, list[tuple[int, int, event_handler_type]]] = defaultdict(list)
+
+        # Queued events as [-priority, order posted, event] so sorting puts them in dispatch order
+        self.queue: list[list] = []
+        self.queued: dict[Any, list] = {}
+        self.order = count()
+
+        self.posted = 0
+        self.coalesced = 0
+        self.dispatched = 0
+
+    def subscribe(self, event_type: type, handler: event_handler_type, priority: int = 0) -> event_handler_type:
+        # Negated so higher priorities sort first, with ties in subscription order
+        insort(self.handlers[event_type], (-priority, next(self.order), handler), key=lambda h: h[:2])
+        return handler
+
+    def unsubscribe(self, event_type: type, handler: event_handler_type) -> None:
+        handlers = self.handlers[event_type]
+        for i, (_, _, h) in enumerate(handlers):
+            if h == handler:
+                del handlers[i]
+                return
+        raise ValueError(f"{handler!r} isn't subscribed to {event_type.__name__}")
+
+    def post(self, event: Any, priority: int = 0) -> None:
+        self.posted += 1
+        try:
+            entry = self.queued.get(event)
+        except TypeError:
+            entry = None
+        else:
+            if entry is not None:
+                entry[0] = min(entry[0], -priority)
+                self.coalesced += 1
+                return
+
+        entry = [-priority, next(self.order), event]
+        self.queue.append(entry)
+        try:
+            self.queued[event] = entry
+        except TypeError:
+            pass
+
+    def dispatch(self, game: Game) -> int:
+        """
+        Handle every queued event. Each one goes to the bus's handlers and then to the game's current scene, which
+        may transition on it
+
+        :return: Number of events handled
+        """
+        batch = self.drain()
+        for event in batch:
+            self.deliver(event, game)
+            game.scene.on_event(game, event)
+        return len(batch)
+
+    def drain(self) -> list[Any]:
+        """Take every queued event off the queue, in the order they should be dispatched"""
+        batch = self.queue
+        if not batch:
+            return []
+        self.queue = []
+        self.queued = {}
+        batch.sort(key=lambda entry: entry[:2])
+        self.dispatched += len(batch)
+        return [event for _, _, event in batch]
+
+    def deliver(self, event: Any, game: Game) -> None:
+        """Call the bus's handlers for an event"""
+        for _, _, handler in self.handlers.get(type(event), ()):
+            handler(event, game)
+
+    def clear(self) -> None:
+        self.queue = []
+        self.queued = {}
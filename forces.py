@@ -0,0 +1,202 @@
+from __future__ import annotations
+from typing import Type, Optional, TYPE_CHECKING
+from abc import ABC, abstractmethod
+from collections import defaultdict
+import weakref
+
+import numpy as np
+
+import entity_store
+
+if TYPE_CHECKING:
+    from scene import Scene
+
+
+class ForceField(ABC):
+    """A field of accelerations that can be evaluated for many positions at once"""
+
+    @abstractmethod
+    def evaluate(self, pos: np.ndarray) -> np.ndarray:
+        """
+        Evaluate the field
+
+        :param pos: Array of shape (n, 2) with the positions to evaluate at
+        :return: Array of shape (n, 2) with the acceleration at each position
+        """
+
+
+class UniformField(ForceField):
+    """Same acceleration everywhere, e.g. gravity"""
+
+    def __init__(self, ax: float, ay: float):
+        self.acc = np.array([ax, ay], dtype=float)
+
+    def evaluate(self, pos: np.ndarray) -> np.ndarray:
+        return np.broadcast_to(self.acc, pos.shape)
+
+
+class PointAttractor(ForceField):
+    """
+    Inverse-square pull towards a point. A negative strength pushes away instead.
+    Softening keeps the acceleration finite near the centre
+    """
+
+    def __init__(self, x: float, y: float, strength: float, softening: float = 1):
+        self.centre = np.array([x, y], dtype=float)
+        self.strength = strength
+        self.softening = softening
+
+    def evaluate(self, pos: np.ndarray) -> np.ndarray:
+        delta = self.centre - pos
+        dist_sq = np.einsum('ij,ij->i', delta, delta) + self.softening ** 2
+        return delta * (self.strength / (dist_sq * np.sqrt(dist_sq)))[:, None]
+
+
+class GridField(ForceField):
+    """
+    Acceleration sampled on a regular grid and bilinearly interpolated in between. Positions outside the grid use
+    the nearest edge value.
+    values[row, col] is the acceleration at (x0 + col * cell_size, y0 + row * cell_size)
+    """
+
+    def __init__(self, values: np.ndarray, x0: float = 0, y0: float = 0, cell_size: float = 1):
+        values = np.asarray(values, dtype=float)
+        if values.ndim != 3 or values.shape[2] != 2:
+            raise ValueError("Grid values must have shape (rows, cols, 2)")
+        self.values = values
+        self.origin = np.array([x0, y0], dtype=float)
+        self.cell_size = cell_size
+
+    def evaluate(self, pos: np.ndarray) -> np.ndarray:
+        rows, cols = self.values.shape[:2]
+        grid = (pos - self.origin) / self.cell_size
+        gx = np.clip(grid[:, 0], 0, cols - 1)
+        gy = np.clip(grid[:, 1], 0, rows - 1)
+
+        # Lower corner of each cell, kept one short of the edge so the upper corner is always in the grid
+        c0 = np.minimum(gx.astype(np.intp), max(cols - 2, 0))
+        r0 = np.minimum(gy.astype(np.intp), max(rows - 2, 0))
+        c1 = np.minimum(c0 + 1, cols - 1)
+        r1 = np.minimum(r0 + 1, rows - 1)
+        fx = (gx - c0)[:, None]
+        fy = (gy - r0)[:, None]
+
+        v = self.values
+        bottom = v[r0, c0] * (1 - fx) + v[r0, c1] * fx
+        top = v[r1, c0] * (1 - fx) + v[r1, c1] * fx
+        return bottom * (1 - fy) + top * fy
+
+
+class ForceEngine:
+    """
+    Applies external forces to the entities of an EntityStore.
+    Fields are accelerations attached to a scene (or to every scene), impulses are forces attached to a single entity
+    that decay exponentially. Everything is evaluated for all awake mobile entities in one batched pass per tick.
+    Sleeping entities are woken whenever the fields that apply change, from adding or removing one or from
+    changing scene, so resting entities react to new forces
+    """
+
+    def __init__(self, min_impulse: float = 1e-3):
+        self.global_fields: list[ForceField] = []
+        self.scene_fields: defaultdict[Type[Scene], list[ForceField]] = defaultdict(list)
+
+        # Active impulses as parallel arrays: slot, slot generation, force, decay rate
+        # New ones wait in pending_impulses and are appended in one go, so adding many per tick stays linear
+        self.pending_impulses: list[tuple[int, int, float, float, float]] = []
+        self.impulse_slots = np.zeros(0, dtype=np.intp)
+        self.impulse_generations = np.zeros(0, dtype=np.int64)
+        self.impulse_forces = np.zeros((0, 2))
+        self.impulse_decays = np.zeros(0)
+        self.min_impulse = min_impulse
+
+        # Fields applied to each store last time, to wake its sleepers when they change
+        self.applied_fields: weakref.WeakKeyDictionary[entity_store.EntityStore, tuple] = weakref.WeakKeyDictionary()
+
+    def add_field(self, field: ForceField, scene: Optional[Type[Scene]] = None) -> ForceField:
+        """
+        Register a field. Scene fields only apply while stepping that scene, otherwise the field always applies
+
+        :return: The field, so it can be removed later
+        """
+        (self.global_fields if scene is None else self.scene_fields[scene]).append(field)
+        return field
+
+    def remove_field(self, field: ForceField, scene: Optional[Type[Scene]] = None) -> None:
+        (self.global_fields if scene is None else self.scene_fields[scene]).remove(field)
+
+    def add_impulse(self, e: entity_store.ArrayEntity, fx: float, fy: float, decay: float = 10) -> None:
+        """
+        Attach a force to an entity, e.g. knockback. It shrinks by a factor of e every 1/decay time units and is
+        dropped once it's smaller than min_impulse or the entity despawns. Wakes the entity up if it's asleep
+        """
+        e.wake()
+        self.pending_impulses.append((e.slot, e.generation, fx, fy, decay))
+
+    def _flush_impulses(self) -> None:
+        if not self.pending_impulses:
+            return
+        slots, generations, fx, fy, decays = zip(*self.pending_impulses)
+        self.pending_impulses.clear()
+        self.impulse_slots = np.concatenate([self.impulse_slots, np.array(slots, dtype=np.intp)])
+        self.impulse_generations = np.concatenate([self.impulse_generations, np.array(generations, dtype=np.int64)])
+        self.impulse_forces = np.concatenate([self.impulse_forces, np.column_stack([fx, fy])])
+        self.impulse_decays = np.concatenate([self.impulse_decays, decays])
+
+    def accelerations(self, store: entity_store.EntityStore, scene: Optional[Type[Scene]] = None,
+                      region: Optional[tuple[float, float, float, float]] = None) -> np.ndarray:
+        """
+        Evaluate every active force for every awake mobile entity, or only the ones in region if it's given
+
+        :return: Array of shape (store.end, 2) with the external acceleration of each slot
+        """
+        fields = self.global_fields + self.scene_fields.get(scene, [])
+        if self.applied_fields.get(store) != tuple(fields):
+            self.applied_fields[store] = tuple(fields)
+            store.wake_all()
+
+        end = store.end
+        acc = np.zeros((end, 2))
+        inv_mass = store.inv_mass[:end]
+
+        # Sleeping entities aren't integrated, so there's no need to evaluate fields for them
+        awake = store.awake_slots() if region is None else store.slots_in(*region)
+        mobile = awake[inv_mass[awake] > 0]
+
+        if fields and len(mobile):
+            pos = store.pos[mobile]
+            total = np.zeros_like(pos)
+            for field in fields:
+                total += field.evaluate(pos)
+            acc[mobile] = total
+
+        self._flush_impulses()
+        if len(self.impulse_slots):
+            # Skip impulses whose entity despawned, its slot may already belong to another one
+            live = store.generation[self.impulse_slots] == self.impulse_generations
+            slots = self.impulse_slots[live]
+            np.add.at(acc, slots, self.impulse_forces[live] * inv_mass[slots, None])
+        return acc
+
+    def _decay_impulses(self, store: entity_store.EntityStore, dt: float) -> None:
+        self._flush_impulses()
+        self.impulse_forces *= np.exp(-self.impulse_decays * dt)[:, None]
+        keep = ((store.generation[self.impulse_slots] == self.impulse_generations)
+                & (np.hypot(self.impulse_forces[:, 0], self.impulse_forces[:, 1]) >= self.min_impulse))
+        if not keep.all():
+            self.impulse_slots = self.impulse_slots[keep]
+            self.impulse_generations = self.impulse_generations[keep]
+            self.impulse_forces = self.impulse_forces[keep]
+            self.impulse_decays = self.impulse_decays[keep]
+
+    def step(self, store: entity_store.EntityStore, dt: float, scene: Optional[Type[Scene]] = None,
+             region: Optional[tuple[float, float, float, float]] = None) -> None:
+        """
+        Apply the forces for one tick and integrate the store
+
+        :param store: The entities to move
+        :param dt: Length of the tick
+        :param scene: The current scene, which decides the scene fields that apply
+        :param region: Only move the entities in this rectangle, see EntityStore.integrate
+        """
+        store.integrate(dt, self.accelerations(store, scene, region), region)
+        self._decay_impulses(store, dt)
@@ -1,24 +1,305 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, Type
+from typing import TYPE_CHECKING, Type, Optional
 if TYPE_CHECKING:
     from scene import Scene
+    import replay
+    import replication
 
 from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
+from time import perf_counter
 import data_store
+import events
+import profiling
+import schedule
+import util
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """State of a game at one point, from Game.snapshot. Values are shared between snapshots wherever they're equal"""
+    scene: Type[Scene]
+    fields: util.PersistentVector
+    events: tuple[tuple, ...] = ()
+    layers: tuple[Type[Scene], ...] = ()
+    tick: int = 0
 
 
 class Game(ABC):
+    # Only rerun transition conditions when a data store field they read has been written
+    incremental_transitions = False
+
+    # Fixed timestep settings used by frame(). Leave fixed_dt as None to run one update per frame instead
+    fixed_dt: Optional[float] = None
+    max_catch_up = 5
+    max_frame_skip = 5
+
+    # Source of the current time in seconds, replace it to run the game on a different clock
+    clock = staticmethod(perf_counter)
+
+    # Source of lines typed by the player. Read input through this instead of input() so it can be recorded
+    read_input = staticmethod(input)
+
+    # Set by replay.Recorder, replay.Replayer and replication.Server, which are told when every tick begins and ends
+    session: Optional[replay.Recorder | replay.Replayer | replication.Server] = None
+
+    # Set to a profiling.Profiler to time every part of each tick
+    profiler: Optional[profiling.Profiler] = None
+
+    # Number of recent snapshots kept for rewind. Leave at 0 to turn snapshots off, since they need write tracking
+    snapshot_history = 0
+
+    # Track data store writes so a replication.Server can send clients only the fields that changed
+    replicated = False
+
     def __init__(self, storetype: Type, start_scene: Type[Scene]):
-        self.data = data_store.DataStore(storetype)
+        self.data = data_store.DataStore(
+            storetype, track_writes=self.incremental_transitions or self.replicated,
+            snapshots=self.snapshot_history > 0,
+        )
+        self.snapshots: deque[Snapshot] = deque(maxlen=self.snapshot_history)
+        self.events = events.EventBus()
+
+        # Fixed timestep state
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.last_frame_time: Optional[float] = None
+        self.skipped_frames = 0
+        self.skipped_renders = 0
+        self.dropped_time = 0.0
+        self.tick_stats = util.TimingStats()
+        self.frame_stats = util.TimingStats()
+        self.render_stats = util.TimingStats()
+
+        # Scenes active alongside the game's scene, and the scheduler that decides which of them update each tick
+        self.tick_count = 0
+        self.layers: list[Type[Scene]] = []
+        self.scheduler = schedule.Scheduler()
+        self.scheduled_scenes: tuple[Type[Scene], ...] = ()
+
         self.scene = start_scene
+        self.start()
+
+    def start(self) -> None:
+        """Enter the starting scene. Called at the end of __init__"""
         self.scene.enter(self)
 
     def update(self) -> None:
-        # Update game
-        self.scene.update(self)
+        session = self.session
+        if session is not None:
+            session.begin_tick()
+            self._update()
+            session.end_tick()
+        else:
+            self._update()
+
+    def _update(self) -> None:
+        scene = self.scene
+        if self.layers or scene.systems or scene.update_every != 1:
+            self._scheduled_update()
+            self.tick_count += 1
+            return
+
+        if self.scheduled_scenes:
+            # Back to a single scene that updates every tick, which doesn't need the scheduler
+            self._sync_schedule(())
+
+        if self.profiler is not None:
+            self.profiler.call(f"{type(self).__name__}.update", self._profiled_update, self.profiler)
+        else:
+            # Update game
+            scene.update(self)
+
+            # Handle events posted since the last tick, which may transition
+            if self.events.queue:
+                self.events.dispatch(self)
+
+            # Transition if needed
+            self.scene.transition(self)
+        self.tick_count += 1
+
+    def _scheduled_update(self) -> None:
+        active = (self.scene, *self.layers)
+        if active != self.scheduled_scenes:
+            self._sync_schedule(active)
+
+        if self.profiler is not None:
+            ran = self.profiler.call("Scheduler.run", self.scheduler.run, self.tick_count, self)
+        else:
+            ran = self.scheduler.run(self.tick_count, self)
+
+        if self.events.queue:
+            self.events.dispatch(self)
+
+        # Scenes only check their transitions on the ticks they update
+        for task in ran:
+            sc, name = task.key
+            if name != "update":
+                continue
+            if sc is self.scene:
+                sc.transition(self)
+            elif sc in self.layers:
+                self._transition_layer(sc)
+
+    def _sync_schedule(self, active: tuple[Type[Scene], ...]) -> None:
+        scheduler = self.scheduler
+        for sc in self.scheduled_scenes:
+            if sc not in active:
+                scheduler.remove((sc, "update"))
+                for system in sc.systems:
+                    scheduler.remove((sc, system))
+        for sc in active:
+            if (sc, "update") not in scheduler:
+                scheduler.add((sc, "update"), sc.update, sc.update_every, sc.update_phase, sc.update_cost)
+                for system in sc.systems:
+                    scheduler.add((sc, system), partial(system, sc), system.every, system.phase, system.cost)
+        self.scheduled_scenes = active
+
+    def push_layer(self, layer: Type[Scene]) -> None:
+        """
+        Make a scene active alongside the game's scene, e.g. a HUD or background simulation. Layers update on their
+        own schedules and transition by replacing themselves in the layers. Events only go to the game's scene
+        """
+        self.layers.append(layer)
+        layer.enter(self)
+
+    def remove_layer(self, layer: Type[Scene]) -> None:
+        layer.leave(self, None)
+        self.layers.remove(layer)
+
+    def _transition_layer(self, layer: Type[Scene]) -> None:
+        dest = layer._detect_transition(self)
+        if dest is layer:
+            return
+        layer.leave(self, dest)
+        self.layers[self.layers.index(layer)] = dest
+        dest.enter(self, layer)
+
+    def _profiled_update(self, profiler: profiling.Profiler) -> None:
+        scene = self.scene
+        profiler.call(f"{scene.__name__}.update", scene.update, self)
+        if self.events.queue:
+            profiler.call("EventBus.dispatch", self.events.dispatch, self)
+        scene = self.scene
+        profiler.call(f"{scene.__name__}.transition", scene.transition, self)
+
+    def frame(self) -> bool:
+        """
+        Run one frame. With a fixed_dt this runs as many fixed ticks as the time since the last frame calls for
+        (at most max_catch_up), then renders with the leftover fraction of a tick as the interpolation alpha.
+        While the simulation is behind, up to max_frame_skip renders in a row are skipped to catch up, after which
+        the backlog is dropped so a slow machine runs slower instead of spiralling
+
+        :return: Whether the frame was rendered
+        """
+        clock = self.clock
+        now = clock()
+        if self.last_frame_time is not None:
+            self.frame_stats.add(now - self.last_frame_time)
+        self.last_frame_time = now
+
+        dt = self.fixed_dt
+        if dt is None:
+            self._timed_update()
+            self.alpha = 0.0
+            self._timed_render()
+            return True
+
+        if self.frame_stats.count:
+            self.accumulator += self.frame_stats.last
+        else:
+            # The first frame runs one tick so there's something to render
+            self.accumulator += dt
+
+        steps = 0
+        while self.accumulator >= dt and steps < self.max_catch_up:
+            self._timed_update()
+            self.accumulator -= dt
+            steps += 1
+
+        if self.accumulator >= dt:
+            if self.skipped_frames < self.max_frame_skip:
+                self.skipped_frames += 1
+                self.skipped_renders += 1
+                return False
+            backlog = self.accumulator - self.accumulator % dt
+            self.dropped_time += backlog
+            self.accumulator -= backlog
+
+        self.skipped_frames = 0
+        self.alpha = self.accumulator / dt
+        self._timed_render()
+        return True
+
+    def _timed_update(self) -> None:
+        start = self.clock()
+        self.update()
+        self.tick_stats.add(self.clock() - start)
+
+    def _timed_render(self) -> None:
+        start = self.clock()
+        self.render(self.alpha)
+        self.render_stats.add(self.clock() - start)
+
+    def render(self, alpha: float) -> None:
+        """
+        Draw the game. Called once per rendered frame
+
+        :param alpha: How far the simulation is between the last tick and the next one, from 0 to 1, for interpolating
+        """
+        pass
+
+    def snapshot(self) -> Snapshot:
+        """
+        Capture the current scene, data store and queued events, and keep the snapshot in the history. Costs time in
+        proportion to the fields written since the last snapshot, not the size of the store
+        """
+        snap = Snapshot(
+            self.scene, self.data.snapshot(), tuple(tuple(entry) for entry in self.events.queue),
+            tuple(self.layers), self.tick_count,
+        )
+        self.snapshots.append(snap)
+        return snap
+
+    def restore(self, snap: Snapshot) -> None:
+        """Put the game back in the state of a snapshot. Scenes aren't entered or left, the current one is replaced"""
+        self.data.restore(snap.fields)
+        self.scene = snap.scene
+        self.layers = list(snap.layers)
+        self.tick_count = snap.tick
+        self.events.clear()
+        for entry in snap.events:
+            entry = list(entry)
+            self.events.queue.append(entry)
+            try:
+                self.events.queued[entry[2]] = entry
+            except TypeError:
+                pass
+
+    def rewind(self, steps: int = 1) -> Snapshot:
+        """
+        Restore the snapshot taken steps snapshots ago, where 1 is the latest, and forget the snapshots after it
+
+        :return: The restored snapshot
+        """
+        if not 1 <= steps <= len(self.snapshots):
+            raise IndexError(f"Only {len(self.snapshots)} snapshots to rewind")
+        for _ in range(steps - 1):
+            self.snapshots.pop()
+        snap = self.snapshots[-1]
+        self.restore(snap)
+        return snap
 
-        # Transition if needed
-        self.scene.transition(self)
+    def timing_stats(self) -> dict[str, dict[str, float]]:
+        return {
+            "tick": self.tick_stats.as_dict(),
+            "frame": self.frame_stats.as_dict(),
+            "render": self.render_stats.as_dict(),
+            "skipped_renders": self.skipped_renders,
+            "dropped_time": self.dropped_time,
+        }
 
     @abstractmethod
     def run(self) -> None:
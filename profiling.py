@@ -0,0 +1,127 @@
+from __future__ import annotations
+from typing import Any, Callable
+from collections import defaultdict
+from math import frexp
+from time import perf_counter
+import json
+
+
+class CallStats:
+    """
+    Count, cumulative and max time, and a histogram of call durations.
+    Histogram buckets are powers of two in microseconds, bucket b holds calls that took less than 2**b microseconds
+    """
+    __slots__ = ('count', 'total', 'max', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram: defaultdict[int, int] = defaultdict(int)
+
+    def add(self, elapsed: float) -> None:
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.histogram[frexp(elapsed * 1e6)[1]] += 1
+
+    def merge(self, other: CallStats) -> None:
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        for bucket, n in other.histogram.items():
+            self.histogram[bucket] += n
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+            "histogram_us": {f"<{2 ** bucket}": n for bucket, n in sorted(self.histogram.items())},
+        }
+
+
+class Profiler:
+    """
+    Opt-in instrumentation for a game. Set game.profiler to an instance and Game.update, scene updates, transition
+    conditions, transition actions, enter/leave and DataStore.transition are all timed.
+    Every call is recorded under its full stack of frame names, e.g. ("tick", "Play.update"), which gives both
+    per-callable totals and flamegraph stacks. Games without a profiler only pay a None check per call site
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.stats: defaultdict[tuple[str, ...], CallStats] = defaultdict(CallStats)
+        self.stack: list[str] = []
+
+    def call(self, frame: str, fn: Callable, *args) -> Any:
+        """
+        Call a function, recording its time under the current stack plus frame
+
+        :param frame: Name for this call, usually "<scene>.<callable>"
+        :param fn: The function to call
+        :return: Whatever the function returns
+        """
+        if not self.enabled:
+            return fn(*args)
+        stack = self.stack
+        stack.append(frame)
+        start = perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.stats[tuple(stack)].add(perf_counter() - start)
+            stack.pop()
+
+    def reset(self) -> None:
+        self.stats.clear()
+
+    def by_frame(self) -> dict[str, CallStats]:
+        """Totals for each frame name wherever it was called from"""
+        totals: defaultdict[str, CallStats] = defaultdict(CallStats)
+        for stack, stats in self.stats.items():
+            totals[stack[-1]].merge(stats)
+        return dict(totals)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "frames": {frame: stats.as_dict() for frame, stats in sorted(self.by_frame().items())},
+            "stacks": [{"stack": list(stack), **stats.as_dict()} for stack, stats in self.stats.items()],
+        }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def to_collapsed(self) -> str:
+        """
+        Export in the collapsed stack format read by flamegraph.pl and speedscope: one "a;b;c <value>" line per stack,
+        where the value is the self time in microseconds (time not spent in recorded children)
+        """
+        child_time: defaultdict[tuple[str, ...], float] = defaultdict(float)
+        for stack, stats in self.stats.items():
+            if len(stack) > 1:
+                child_time[stack[:-1]] += stats.total
+
+        lines = []
+        for stack, stats in sorted(self.stats.items()):
+            self_us = round(max(stats.total - child_time[stack], 0) * 1e6)
+            lines.append(f"{';'.join(stack)} {self_us}")
+        return "\n".join(lines)
+
+
+def frame_name(owner: Any, fn: Any) -> str:
+    """
+    Name a callable for a profile by the scene it ran for and its own name
+
+    >>> class Play:
+    ...     @classmethod
+    ...     def update(cls): pass
+    >>> frame_name(Play, Play.update)
+    'Play.update'
+    >>> frame_name(Play, lambda: None)
+    'Play.<lambda>'
+    """
+    fn = getattr(fn, 'fun', fn)
+    name = getattr(fn, '__name__', None) or type(fn).__name__
+    return f"{getattr(owner, '__name__', owner)}.{name}"
@@ -0,0 +1,421 @@
+"""
+Recording and replaying games. A Recorder logs everything a game's ticks take from outside the game: clock reads,
+lines from read_input and events posted between ticks. The random module is reseeded every tick from a seed in the
+log's header. Replayer feeds a log back into a fresh game as fast as it will go, checking the scene and a checksum of
+the data store after every tick.
+
+Log layout:
+    8 bytes     magic, b"PGEREPL1"
+    varint      length of the JSON header
+    JSON header {"seed": int, "scene": name, "game": name, "checksum_every": int, "checksum_fields": [names]}
+    ticks       one record per tick, appended as the game runs
+
+A tick's record is a list of entries, each one a tag byte and its data, ending with b"T":
+    b"e"    event posted before the tick: zigzag varint priority, varint length, pickled event
+    b"c"    clock read: zigzag varint microseconds since the previous clock read
+    b"i"    input line: varint length, UTF-8 text
+    b"s"    scene the tick ended in, if it changed: varint length, name
+    b"k"    checksum of the data store after the tick: uint32
+
+Replay a log in CI, printing the run's statistics as JSON, with:
+    python -m replay LOG GAME STORETYPE SCENE
+where the classes are given as "module:qualname"
+"""
+from __future__ import annotations
+from typing import Any, BinaryIO, Iterable, Optional, TYPE_CHECKING
+from collections import Counter, defaultdict, deque
+from time import perf_counter
+import argparse
+import json
+import os
+import pickle
+import struct
+import zlib
+
+import batch
+import runner
+import savefile
+import util
+
+if TYPE_CHECKING:
+    import data_store
+    from game import Game
+
+
+MAGIC = b"PGEREPL1"
+_u32 = struct.Struct("<I")
+_MASK = 2 ** 64 - 1
+
+
+def _zigzag(n: int) -> int:
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+
+def _unzigzag(n: int) -> int:
+    return n // 2 if not n & 1 else -(n + 1) // 2
+
+
+def tick_seed(seed: int, tick: int) -> int:
+    # Spread consecutive ticks over the seed space, so each tick's random numbers look unrelated
+    return (seed ^ (tick * 0x9E3779B97F4A7C15)) & _MASK
+
+
+def checksum_fields(store: data_store.DataStore) -> list[str]:
+    """
+    Fields checksum covers by default: every field not declared with checksum=False whose current value the save
+    file codecs can encode. Fields that can't be encoded yet, like ones holding entities or turtles, are left out
+    """
+    values = vars(store.storage_inst)
+    codecs = savefile.field_codecs(store)
+    fields = []
+    for field, access in store.field_access.items():
+        if not access.checksum:
+            continue
+        if field in values:
+            value = values[field]
+        elif field in store.transient_factories:
+            fields.append(field)
+            continue
+        else:
+            value = store.field_defaults[field]
+        if savefile.encodable(codecs[field], value):
+            fields.append(field)
+    return fields
+
+
+def checksum(game: Game, fields: Optional[Iterable[str]] = None) -> int:
+    """
+    CRC of the current values of a game's data store, encoded with the save file codecs so it's the same in every
+    process. Fields that haven't been rebuilt since being reset are left out instead of being rebuilt, so taking the
+    checksum doesn't change when transient factories run. A value that can't be encoded only counts by its type
+
+    :param fields: Fields to cover, defaults to every field not declared with checksum=False
+    """
+    store = game.data
+    if fields is None:
+        fields = [field for field, access in store.field_access.items() if access.checksum]
+    values = vars(store.storage_inst)
+    codecs = savefile.field_codecs(store)
+    crc = 0
+    for field in fields:
+        if field not in values:
+            data = b"-"
+        else:
+            value = values[field]
+            try:
+                data = b"+" + savefile.encode(codecs[field], value)
+            except TypeError:
+                data = b"?" + type(value).__qualname__.encode()
+        crc = zlib.crc32(data, crc)
+    return crc
+
+
+class ReplayDivergence(Exception):
+    """Raised when a replayed game does something different from the recording"""
+
+    def __init__(self, tick: int, what: str, expected: Any, actual: Any):
+        super().__init__(f"Tick {tick}: expected {what} {expected!r} but got {actual!r}")
+        self.tick = tick
+        self.what = what
+        self.expected = expected
+        self.actual = actual
+
+
+class Recorder:
+    """
+    Records a game's ticks to a log. Start recording straight after making the game, so a replay can start from the
+    same state, and close the recorder when done. Events need to be picklable
+
+    :param game: The game to record
+    :param file: Path or binary file to append the log to
+    :param seed: Seed for the random module. Defaults to a random one
+    :param checksum_every: Checksum the data store every this many ticks, or never if 0. The checksum covers the
+        fields from checksum_fields when recording starts
+    """
+
+    def __init__(self, game: Game, file: BinaryIO | str | os.PathLike, seed: Optional[int] = None, checksum_every: int = 1):
+        self.game = game
+        self.own_file = not hasattr(file, "write")
+        self.file = open(file, "ab") if self.own_file else file
+        self.seed = int.from_bytes(os.urandom(8), "little") if seed is None else seed
+        self.checksum_every = checksum_every
+        self.tick = 0
+        self.in_tick = False
+        self.buf = bytearray()
+        self.last_us = 0
+        self.scene = game.scene
+
+        # Decided up front, so a field that can't be encoded is left out rather than failing a tick
+        self.checksum_fields = checksum_fields(game.data) if checksum_every else []
+
+        header = json.dumps({
+            "seed": self.seed,
+            "scene": game.scene.__name__,
+            "game": type(game).__qualname__,
+            "checksum_every": checksum_every,
+            "checksum_fields": self.checksum_fields,
+        }).encode()
+        start = bytearray(MAGIC)
+        util.write_varint(start, len(header))
+        self.file.write(start + header)
+
+        # Everything the game takes from outside goes through these
+        self.clock = game.clock
+        self.read_input = game.read_input
+        self.post = game.events.post
+        game.clock = self._clock
+        game.read_input = self._read_input
+        game.events.post = self._post
+        game.session = self
+
+    def _clock(self) -> float:
+        t = self.clock()
+        if not self.in_tick:
+            return t
+        # Rounded to whole microseconds, so the game sees exactly what the replay will give it
+        us = round(t * 1e6)
+        self.buf += b"c"
+        util.write_varint(self.buf, _zigzag(us - self.last_us))
+        self.last_us = us
+        return us / 1e6
+
+    def _read_input(self, prompt: str = "") -> str:
+        line = self.read_input(prompt)
+        data = line.encode()
+        self.buf += b"i"
+        util.write_varint(self.buf, len(data))
+        self.buf += data
+        return line
+
+    def _post(self, event: Any, priority: int = 0) -> None:
+        if not self.in_tick:
+            data = pickle.dumps(event, protocol=pickle.HIGHEST_PROTOCOL)
+            self.buf += b"e"
+            util.write_varint(self.buf, _zigzag(priority))
+            util.write_varint(self.buf, len(data))
+            self.buf += data
+        self.post(event, priority)
+
+    def begin_tick(self) -> None:
+        batch.seed_all(tick_seed(self.seed, self.tick))
+        self.in_tick = True
+
+    def end_tick(self) -> None:
+        self.in_tick = False
+        buf = self.buf
+        scene = self.game.scene
+        if scene is not self.scene:
+            name = scene.__name__.encode()
+            buf += b"s"
+            util.write_varint(buf, len(name))
+            buf += name
+            self.scene = scene
+        if self.checksum_every and self.tick % self.checksum_every == 0:
+            buf += b"k"
+            buf += _u32.pack(checksum(self.game, self.checksum_fields))
+        buf += b"T"
+        self.file.write(buf)
+        buf.clear()
+        self.tick += 1
+
+    def close(self) -> None:
+        """Stop recording and put the game back how it was"""
+        game = self.game
+        game.clock = self.clock
+        game.read_input = self.read_input
+        del game.events.post
+        game.session = None
+        if self.buf:
+            # Events posted after the last tick
+            self.file.write(self.buf)
+            self.buf.clear()
+        if self.own_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class _Tick:
+    __slots__ = ("events", "clock", "inputs", "scene", "checksum")
+
+    def __init__(self):
+        self.events: list[tuple[Any, int]] = []
+        self.clock: deque[int] = deque()
+        self.inputs: deque[str] = deque()
+        self.scene: Optional[str] = None
+        self.checksum: Optional[int] = None
+
+
+class Replayer:
+    """
+    Replays a log into a game made the same way as the recorded one
+
+    :param game: A fresh game to replay into
+    :param file: Path or binary file of the log
+    :param verify: Check the scene and data store checksum after every tick, raising ReplayDivergence if they differ
+    """
+
+    def __init__(self, game: Game, file: BinaryIO | str | os.PathLike, verify: bool = True):
+        if not hasattr(file, "read"):
+            with open(file, "rb") as f:
+                data = f.read()
+        else:
+            data = file.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a replay log")
+        self.mv = memoryview(data)
+        length, pos = util.read_varint(self.mv, len(MAGIC))
+        self.header = json.loads(bytes(self.mv[pos:pos + length]))
+        self.pos = pos + length
+        if self.header["scene"] != game.scene.__name__:
+            raise ValueError(f"Log starts in scene {self.header['scene']} but the game is in {game.scene.__name__}")
+
+        self.game = game
+        self.verify = verify
+        self.seed = self.header["seed"]
+        self.tick = 0
+        self.in_tick = False
+        self.current: Optional[_Tick] = None
+        self.scene_name = game.scene.__name__
+        self.checksum_fields: Optional[list[str]] = self.header.get("checksum_fields")
+        self.now_us = 0
+        self.first_us: Optional[int] = None
+
+        game.clock = self._clock
+        game.read_input = self._read_input
+        game.session = self
+
+    def _parse_tick(self) -> Optional[_Tick]:
+        mv = self.mv
+        pos = self.pos
+        if pos >= len(mv):
+            return None
+        tick = _Tick()
+        while True:
+            if pos >= len(mv):
+                # A tick cut off by the end of the log, or events posted after the last tick
+                return None
+            tag = mv[pos]
+            pos += 1
+            if tag == 0x54:     # T
+                break
+            if tag == 0x63:     # c
+                n, pos = util.read_varint(mv, pos)
+                tick.clock.append(_unzigzag(n))
+            elif tag == 0x69:   # i
+                n, pos = util.read_varint(mv, pos)
+                tick.inputs.append(bytes(mv[pos:pos + n]).decode())
+                pos += n
+            elif tag == 0x65:   # e
+                priority, pos = util.read_varint(mv, pos)
+                n, pos = util.read_varint(mv, pos)
+                tick.events.append((pickle.loads(mv[pos:pos + n]), _unzigzag(priority)))
+                pos += n
+            elif tag == 0x73:   # s
+                n, pos = util.read_varint(mv, pos)
+                tick.scene = bytes(mv[pos:pos + n]).decode()
+                pos += n
+            elif tag == 0x6B:   # k
+                tick.checksum = _u32.unpack_from(mv, pos)[0]
+                pos += 4
+            else:
+                raise ValueError(f"Corrupt replay log at byte {pos - 1}")
+        self.pos = pos
+        return tick
+
+    def _clock(self) -> float:
+        if self.in_tick:
+            if not self.current.clock:
+                raise ReplayDivergence(self.tick, "clock reads", "no more", "another")
+            self.now_us += self.current.clock.popleft()
+            if self.first_us is None:
+                self.first_us = self.now_us
+        return self.now_us / 1e6
+
+    def _read_input(self, prompt: str = "") -> str:
+        if not self.current.inputs:
+            raise ReplayDivergence(self.tick, "input reads", "no more", "another")
+        return self.current.inputs.popleft()
+
+    def begin_tick(self) -> None:
+        for event, priority in self.current.events:
+            self.game.events.post(event, priority)
+        batch.seed_all(tick_seed(self.seed, self.tick))
+        self.in_tick = True
+
+    def end_tick(self) -> None:
+        self.in_tick = False
+        tick = self.current
+        if tick.scene is not None:
+            self.scene_name = tick.scene
+        if self.verify:
+            if self.game.scene.__name__ != self.scene_name:
+                raise ReplayDivergence(self.tick, "scene", self.scene_name, self.game.scene.__name__)
+            if tick.checksum is not None:
+                actual = checksum(self.game, self.checksum_fields)
+                if actual != tick.checksum:
+                    raise ReplayDivergence(self.tick, "data store checksum", tick.checksum, actual)
+        self.tick += 1
+
+    def run(self, ticks: Optional[int] = None) -> runner.RunStats:
+        """
+        Replay every tick in the log, or the first ticks of them
+
+        :return: Statistics for the replay, which can be compared between builds as a benchmark
+        """
+        game = self.game
+        tick_stats = util.TimingStats()
+        scene_ticks = Counter()
+        scene_time = defaultdict(float)
+        transitions = 0
+        done = 0
+        run_start = perf_counter()
+        while ticks is None or done < ticks:
+            self.current = self._parse_tick()
+            if self.current is None:
+                break
+            scene = game.scene
+            start = perf_counter()
+            game.update()
+            elapsed = perf_counter() - start
+            tick_stats.add(elapsed)
+            scene_ticks[scene.__name__] += 1
+            scene_time[scene.__name__] += elapsed
+            if game.scene is not scene:
+                transitions += 1
+            done += 1
+
+        return runner.RunStats(
+            ticks=done,
+            wall_time=perf_counter() - run_start,
+            sim_time=(self.now_us - self.first_us) / 1e6 if self.first_us is not None else 0.0,
+            stopped_by="ticks" if self.current is not None else "end of log",
+            final_scene=game.scene,
+            transitions=transitions,
+            tick_stats=tick_stats,
+            scene_ticks=scene_ticks,
+            scene_time=scene_time,
+        )
+
+
+def replay(game: Game, file: BinaryIO | str | os.PathLike, verify: bool = True, ticks: Optional[int] = None) -> runner.RunStats:
+    """Replay a log into a fresh game, see Replayer"""
+    return Replayer(game, file, verify).run(ticks)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded game log and print statistics as JSON")
+    parser.add_argument("log")
+    parser.add_argument("game", help="game class as module:qualname")
+    parser.add_argument("storetype", help="data storage class as module:qualname")
+    parser.add_argument("scene", help="starting scene as module:qualname")
+    parser.add_argument("--no-verify", action="store_true")
+    args = parser.parse_args(argv)
+
+    game = batch.resolve_ref(args.game)(batch.resolve_ref(args.storetype), batch.resolve_ref(args.scene))
+    stats = replay(game, args.log, verify=not args.no_verify)
+    print(json.dumps(stats.as_dict(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
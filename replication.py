@@ -0,0 +1,434 @@
+"""
+Replicating a game's state from an authoritative server to thin clients over TCP. A Server is the session of the
+server's game: at the end of every tick it collects the data store fields written during the tick and whether the
+scene or layers changed, and every send_every ticks it sends each client one packet with everything that changed since
+the client's last packet. A Client applies packets to a game of its own, which mirrors the server's scene and fields
+without running any scene code.
+
+Fields are encoded with the save file codecs. A field whose encoding is as long as the one the client has is sent as
+the XOR of the two, which is mostly zero bytes when little changed, and the packet is compressed as a whole with zlib,
+which shrinks both the runs of zeros and repeated structure. Which fields are sent is decided by their Access: game
+fields always, static and transient fields while one of their scenes is active, and never fields declared with
+replicate=False.
+
+Every message is a uint32 length followed by the message:
+    hello   sent by the server on connect, JSON {"fields": [names], "sigs": [codec signatures]}
+    packet  flag byte, 1 if the rest is zlib compressed, then
+                varint      tick
+                float64     time.time() when it was sent
+                varint      number of active scenes, 0 if they haven't changed, then each name as varint length and UTF-8
+                varint      number of fields, then per field: varint id (index into the hello's fields), kind byte
+                            (0 the encoding, 1 XOR with the previous encoding), varint length and the data
+    ack     sent back by the client after applying a packet: varint tick, float64 the packet's send time
+"""
+from __future__ import annotations
+from typing import Optional, Type, TYPE_CHECKING
+from dataclasses import dataclass, field
+import asyncio
+import json
+import struct
+import time
+import zlib
+
+import data_store
+import savefile
+import scene
+import util
+
+if TYPE_CHECKING:
+    from game import Game
+
+
+_u32 = struct.Struct("<I")
+_f64 = struct.Struct("<d")
+
+
+def _xor(a: bytes, b: bytes) -> bytes:
+    return (int.from_bytes(a, "little") ^ int.from_bytes(b, "little")).to_bytes(len(a), "little")
+
+
+def _frame(message: bytes | bytearray) -> bytes:
+    return _u32.pack(len(message)) + message
+
+
+async def _read_message(reader: asyncio.StreamReader) -> bytes:
+    length, = _u32.unpack(await reader.readexactly(_u32.size))
+    return await reader.readexactly(length)
+
+
+@dataclass
+class ReplicationStats:
+    """Traffic of one connection. Wire bytes include framing, raw bytes are packets before compression"""
+    packets: int = 0
+    wire_bytes: int = 0
+    raw_bytes: int = 0
+    fields: int = 0
+    deltas: int = 0
+
+    # Sends held back because the client wasn't reading fast enough, their changes go out with the next send
+    deferred: int = 0
+    acked: int = 0
+
+    # Round trip from sending a packet to its ack on the server, and sender to receiver on the client. Client
+    # latency compares clocks on both ends, so it's only meaningful when they're on the same machine
+    latency: util.TimingStats = field(default_factory=util.TimingStats)
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def bytes_per_second(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.wire_bytes / elapsed if elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "packets": self.packets,
+            "wire_bytes": self.wire_bytes,
+            "raw_bytes": self.raw_bytes,
+            "bytes_per_second": self.bytes_per_second,
+            "fields": self.fields,
+            "deltas": self.deltas,
+            "deferred": self.deferred,
+            "acked": self.acked,
+            "latency": self.latency.as_dict(),
+        }
+
+
+class Connection:
+    """A client as the server sees it: what it's been sent, and what it still needs"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.peer = writer.get_extra_info("peername")
+
+        # Last encoding of each field the client was sent, which deltas are against
+        self.sent: dict[str, bytes] = {}
+        self.pending: set[str] = set()
+        self.scene_changed = True
+        self.acked_tick = -1
+        self.stats = ReplicationStats()
+
+
+class Server:
+    """
+    Serves a game's state to clients. The game needs write tracking, so set replicated = True on its class.
+    Writes are only seen when they go through the data store's accessors, like for snapshots. Every replicated field
+    has to hold values the save file codecs can encode, which is checked for the current values when the server is
+    made. Fields that haven't been rebuilt since a reset are sent once something reads them, so replication never
+    runs transient factories itself
+    """
+    send_every = 1
+
+    # Bytes waiting in a client's socket buffer past which sends to it are held back
+    max_buffer = 1 << 20
+    compress_level = 1
+
+    def __init__(self, game: Game, host: str = "127.0.0.1", port: int = 0):
+        data = game.data
+        if not data.track_writes:
+            raise ValueError(f"{type(game).__name__} doesn't track writes, set replicated = True on it")
+        if game.session is not None:
+            raise RuntimeError("The game already has a session")
+        self.game = game
+        self.host = host
+        self.port = port
+        self.codecs = savefile.field_codecs(data)
+        self._check_encodable()
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.connections: list[Connection] = []
+
+        # Tasks serving each connection, which close waits for
+        self.handlers: set[asyncio.Task] = set()
+
+        self.active = (game.scene, *game.layers)
+        self.scopes: dict[tuple[Type[scene.Scene], ...], frozenset[str]] = {}
+        self.scope = self._scope(self.active)
+
+        data.replication_dirty = set()
+        game.session = self
+
+    def _check_encodable(self) -> None:
+        data = self.game.data
+        values = vars(data.storage_inst)
+        for name, access in data.field_access.items():
+            if not access.replicate:
+                continue
+            if name in values:
+                value = values[name]
+            elif name in data.transient_factories:
+                continue
+            else:
+                value = data.field_defaults[name]
+            try:
+                savefile.encode(self.codecs[name], value)
+            except TypeError as e:
+                raise TypeError(f"Field {name} can't be replicated: {e}. Declare it with replicate=False to keep it on "
+                                f"the server") from e
+
+    def _scope(self, active: tuple[Type[scene.Scene], ...]) -> frozenset[str]:
+        # Fields the active scenes are allowed to see
+        try:
+            return self.scopes[active]
+        except KeyError:
+            pass
+        self.scopes[active] = frozenset(
+            name for name, access in self.game.data.field_access.items()
+            if access.replicate and (isinstance(access, data_store.Access.game) or not access.args.isdisjoint(active))
+        )
+        return self.scopes[active]
+
+    async def start(self) -> None:
+        """Start listening. With port 0 a free port is picked, which is in port afterwards"""
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        """Disconnect every client and stop listening"""
+        if self.server is not None:
+            self.server.close()
+        for conn in self.connections:
+            conn.writer.close()
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+        self.game.session = None
+        self.game.data.replication_dirty = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self.handlers.add(task)
+        conn = Connection(reader, writer)
+        names = list(self.game.data.field_index)
+        hello = {"fields": names, "sigs": [self.codecs[name].sig for name in names]}
+        writer.write(_frame(json.dumps(hello, separators=(",", ":")).encode()))
+
+        # Start with everything, later packets are deltas against it
+        conn.pending = set(self.scope)
+        self.connections.append(conn)
+        self._send(conn, {})
+        try:
+            while True:
+                message = await _read_message(reader)
+                tick, pos = util.read_varint(memoryview(message), 0)
+                sent_at, = _f64.unpack_from(message, pos)
+                conn.acked_tick = tick
+                conn.stats.acked += 1
+                conn.stats.latency.add(time.time() - sent_at)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.connections.remove(conn)
+            self.handlers.discard(task)
+            writer.close()
+
+    def begin_tick(self) -> None:
+        pass
+
+    def end_tick(self) -> None:
+        game = self.game
+        data = game.data
+        dirty = data.replication_dirty
+        data.replication_dirty = set()
+
+        active = (game.scene, *game.layers)
+        if active != self.active:
+            # Fields that just came into scope may never have been sent, or changed while out of scope on a restore
+            old = self.scope
+            self.active = active
+            self.scope = self._scope(active)
+            dirty |= self.scope - old
+            for conn in self.connections:
+                conn.scene_changed = True
+
+        if not self.connections:
+            return
+        dirty &= self.scope
+        for conn in self.connections:
+            conn.pending |= dirty
+        if game.tick_count % self.send_every == 0:
+            self.flush()
+
+    def flush(self) -> None:
+        """Send every client what changed since its last packet"""
+        encodings = {}
+        for conn in list(self.connections):
+            if conn.pending or conn.scene_changed:
+                self._send(conn, encodings)
+
+    def _send(self, conn: Connection, encodings: dict[str, bytes]) -> None:
+        stats = conn.stats
+        if conn.writer.transport.get_write_buffer_size() > self.max_buffer:
+            stats.deferred += 1
+            return
+
+        packet = bytearray()
+        util.write_varint(packet, self.game.tick_count)
+        packet += _f64.pack(time.time())
+        if conn.scene_changed:
+            util.write_varint(packet, len(self.active))
+            for sc in self.active:
+                name = sc.__name__.encode()
+                util.write_varint(packet, len(name))
+                packet += name
+        else:
+            packet.append(0)
+
+        entries = bytearray()
+        count = 0
+        values = vars(self.game.data.storage_inst)
+        field_index = self.game.data.field_index
+        sent = conn.sent
+        unread = set()
+        for name in conn.pending:
+            if name not in self.scope:
+                continue
+            if name not in values:
+                # Reading it would rebuild it, so wait until the game does
+                unread.add(name)
+                continue
+            encoded = encodings.get(name)
+            if encoded is None:
+                encoded = encodings[name] = savefile.encode(self.codecs[name], values[name])
+            old = sent.get(name)
+            if old == encoded:
+                continue
+            if old is not None and len(old) == len(encoded):
+                kind, body = 1, _xor(old, encoded)
+                stats.deltas += 1
+            else:
+                kind, body = 0, encoded
+            util.write_varint(entries, field_index[name])
+            entries.append(kind)
+            util.write_varint(entries, len(body))
+            entries += body
+            sent[name] = encoded
+            count += 1
+        conn.pending = unread
+
+        if not count and not conn.scene_changed:
+            return
+        conn.scene_changed = False
+        util.write_varint(packet, count)
+        packet += entries
+
+        compressed = zlib.compress(packet, self.compress_level)
+        message = b"\x01" + compressed if len(compressed) < len(packet) else b"\x00" + packet
+        conn.writer.write(_frame(message))
+        stats.packets += 1
+        stats.fields += count
+        stats.raw_bytes += len(packet)
+        stats.wire_bytes += _u32.size + len(message)
+
+    def stats(self) -> dict[str, dict]:
+        """Traffic and latency of every connected client, keyed by address"""
+        return {f"{conn.peer[0]}:{conn.peer[1]}": conn.stats.as_dict() for conn in self.connections}
+
+
+class Client:
+    """
+    Mirrors a server's game into a local game of the same storage class. Scenes are switched without entering or
+    leaving them, and fields are set directly, so no scene code runs on the client
+    """
+
+    def __init__(self, game: Game):
+        self.game = game
+        self.codecs = savefile.field_codecs(game.data)
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+        # Field names by the server's ids, and the last encoding received for each
+        self.fields: list[str] = []
+        self.received: dict[str, bytes] = {}
+        self.tick = -1
+        self.stats = ReplicationStats()
+
+    async def connect(self, host: str, port: int) -> None:
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        hello = json.loads(await _read_message(self.reader))
+        for name, sig in zip(hello["fields"], hello["sigs"]):
+            if name not in self.codecs:
+                raise ValueError(f"The server has field {name}, which isn't in this game's store")
+            if self.codecs[name].sig != sig:
+                raise ValueError(f"Field {name} is {sig} on the server but {self.codecs[name].sig} here")
+        self.fields = hello["fields"]
+
+    async def receive(self) -> bool:
+        """
+        Wait for the next packet and apply it
+
+        :return: False if the server has closed the connection
+        """
+        try:
+            message = await _read_message(self.reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return False
+        tick, sent_at = self.apply(message)
+        ack = bytearray()
+        util.write_varint(ack, tick)
+        ack += _f64.pack(sent_at)
+        self.writer.write(_frame(ack))
+        self.stats.latency.add(time.time() - sent_at)
+        self.stats.wire_bytes += _u32.size + len(message)
+        return True
+
+    async def run(self) -> None:
+        """Apply packets until the server disconnects"""
+        while await self.receive():
+            pass
+
+    def apply(self, message: bytes) -> tuple[int, float]:
+        """
+        Apply one packet to the game
+
+        :return: The server's tick and when the packet was sent
+        """
+        packet = zlib.decompress(message[1:]) if message[0] else message[1:]
+        mv = memoryview(packet)
+        tick, pos = util.read_varint(mv, 0)
+        sent_at, = _f64.unpack_from(packet, pos)
+        pos += _f64.size
+
+        count, pos = util.read_varint(mv, pos)
+        if count:
+            active = []
+            for _ in range(count):
+                length, pos = util.read_varint(mv, pos)
+                name = str(mv[pos:pos + length], "utf-8")
+                pos += length
+                try:
+                    active.append(scene.Scene.classes_by_name[name])
+                except KeyError:
+                    raise ValueError(f"The server is in scene {name}, which doesn't exist here") from None
+            self.game.scene = active[0]
+            self.game.layers = active[1:]
+
+        data = self.game.data
+        storage = data.storage_inst
+        count, pos = util.read_varint(mv, pos)
+        for _ in range(count):
+            index, pos = util.read_varint(mv, pos)
+            kind = packet[pos]
+            length, pos = util.read_varint(mv, pos + 1)
+            body = bytes(mv[pos:pos + length])
+            pos += length
+
+            name = self.fields[index]
+            if kind:
+                body = _xor(self.received[name], body)
+                self.stats.deltas += 1
+            self.received[name] = body
+            setattr(storage, name, savefile.decode(self.codecs[name], body))
+            if data.track_writes:
+                data.mark_written(name)
+        self.tick = tick
+
+        stats = self.stats
+        stats.packets += 1
+        stats.fields += count
+        stats.raw_bytes += len(packet)
+        return tick, sent_at
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
@@ -0,0 +1,116 @@
+from __future__ import annotations
+from typing import Callable, Optional, Type, TYPE_CHECKING
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from time import perf_counter
+
+import util
+
+if TYPE_CHECKING:
+    from game import Game
+    from scene import Scene
+
+
+class SimClock:
+    """Clock that only moves when told to. Install it as a game's clock to make timed conditions deterministic"""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, dt: float) -> None:
+        self.now += dt
+
+
+@dataclass
+class RunStats:
+    ticks: int
+    wall_time: float
+    sim_time: float
+    stopped_by: str
+    final_scene: Type[Scene]
+    transitions: int
+    tick_stats: util.TimingStats
+    scene_ticks: Counter = field(default_factory=Counter)
+    scene_time: defaultdict = field(default_factory=lambda: defaultdict(float))
+
+    @property
+    def ticks_per_second(self) -> float:
+        return self.ticks / self.wall_time if self.wall_time else float("inf")
+
+    def as_dict(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "wall_time": self.wall_time,
+            "sim_time": self.sim_time,
+            "ticks_per_second": self.ticks_per_second,
+            "stopped_by": self.stopped_by,
+            "final_scene": self.final_scene.__name__,
+            "transitions": self.transitions,
+            "tick": self.tick_stats.as_dict(),
+            "scene_ticks": dict(self.scene_ticks),
+            "scene_time": dict(self.scene_time),
+        }
+
+
+def run_headless(game: Game, ticks: Optional[int] = None, until: Optional[Callable[[Game], bool]] = None,
+                 dt: Optional[float] = None, clock: Optional[SimClock] = None) -> RunStats:
+    """
+    Step a game as fast as possible without rendering. The game's clock is replaced with a simulated one that moves
+    forward by dt every tick, so anything timed through game.clock behaves as if the game ran in real time
+
+    :param game: The game to run
+    :param ticks: Stop after this many ticks
+    :param until: Stop as soon as this returns True for the game. Checked before every tick
+    :param dt: Simulated seconds per tick. Defaults to the game's fixed_dt, or 1/60
+    :param clock: Simulated clock to use, e.g. to continue from an earlier run
+    :return: Statistics for the run
+    """
+    if ticks is None and until is None:
+        raise ValueError("Have to set ticks or until or both")
+    if dt is None:
+        dt = game.fixed_dt if game.fixed_dt is not None else 1 / 60
+    if clock is None:
+        clock = SimClock()
+    game.clock = clock
+
+    tick_stats = util.TimingStats()
+    scene_ticks = Counter()
+    scene_time = defaultdict(float)
+    transitions = 0
+    stopped_by = "ticks"
+    sim_start = clock()
+
+    done = 0
+    run_start = perf_counter()
+    while ticks is None or done < ticks:
+        if until is not None and until(game):
+            stopped_by = "until"
+            break
+
+        scene = game.scene
+        start = perf_counter()
+        game.update()
+        elapsed = perf_counter() - start
+
+        tick_stats.add(elapsed)
+        scene_ticks[scene.__name__] += 1
+        scene_time[scene.__name__] += elapsed
+        if game.scene is not scene:
+            transitions += 1
+        clock.advance(dt)
+        done += 1
+
+    return RunStats(
+        ticks=done,
+        wall_time=perf_counter() - run_start,
+        sim_time=clock() - sim_start,
+        stopped_by=stopped_by,
+        final_scene=game.scene,
+        transitions=transitions,
+        tick_stats=tick_stats,
+        scene_ticks=scene_ticks,
+        scene_time=scene_time,
+    )
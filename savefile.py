@@ -0,0 +1,596 @@
+"""
+Binary save files for the persistent fields of a DataStore, the game and static ones. Transient fields are rebuilt
+whenever their scene is entered, so they're never saved.
+
+Each field is encoded by a codec built from its type hint, so values carry no type tags. Containers of ints, floats
+and bools are packed as arrays (ints in the narrowest type that fits), strings and bytes as a table of lengths followed by their data, and dicts as columns
+of keys and values. Containers are written in chunks, so saving never holds a second copy of a large value in memory.
+Fields hinted with types that have no codec (or Any) fall back to a self-describing encoding.
+Sets are written in sorted order, so equal values always encode to the same bytes whatever the hash seed.
+
+File layout (little endian):
+    8 bytes     magic, b"PGESAVE1"
+    fields      each field's encoding, one after another
+    JSON index  {field: [type signature, offset, length]}
+    uint64      offset of the JSON index
+    8 bytes     magic again
+
+The index at the end lets load read only the fields it's asked for.
+"""
+from __future__ import annotations
+from typing import Any, BinaryIO, Iterable, Optional, Type, Union, get_args, get_origin, get_type_hints
+from array import array
+from itertools import accumulate
+import dataclasses
+import io
+import json
+import os
+import struct
+import sys
+import types
+
+import data_store
+import scene
+
+
+MAGIC = b"PGESAVE1"
+TRAILER = struct.Struct("<Q8s")
+
+# Items per chunk of a container, and how much is buffered before it's written out
+CHUNK = 4096
+FLUSH_SIZE = 1 << 20
+
+_u32 = struct.Struct("<I")
+_i64 = struct.Struct("<q")
+_f64 = struct.Struct("<d")
+
+
+class _Sink:
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.buf = bytearray()
+        self.written = 0
+
+    def tell(self) -> int:
+        return self.written + len(self.buf)
+
+    def flush_if_full(self) -> None:
+        if len(self.buf) >= FLUSH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        self.stream.write(self.buf)
+        self.written += len(self.buf)
+        self.buf.clear()
+
+
+class _Codec:
+    """Encodes values of one type. Sequences of values go through write_items and read_items, which codecs pack"""
+    sig = "?"
+
+    def write(self, value: Any, sink: _Sink) -> None:
+        raise NotImplementedError
+
+    def read(self, mv: memoryview, pos: int) -> tuple[Any, int]:
+        raise NotImplementedError
+
+    def write_items(self, items: list, sink: _Sink) -> None:
+        for item in items:
+            self.write(item, sink)
+
+    def read_items(self, mv: memoryview, pos: int, n: int) -> tuple[list, int]:
+        items = []
+        read = self.read
+        for _ in range(n):
+            item, pos = read(mv, pos)
+            items.append(item)
+        return items, pos
+
+
+def _canonical_order(items: Any, codec: _Codec) -> list:
+    """Items of a set in an order that doesn't depend on hashing, by value or else by encoding"""
+    try:
+        return sorted(items)
+    except TypeError:
+        return sorted(items, key=lambda item: encode(codec, item))
+
+
+class _Packed(_Codec):
+    def __init__(self, sig: str, fmt: str, cast: type):
+        self.sig = sig
+        self.fmt = fmt
+        self.cast = cast
+        self.struct = struct.Struct(f"<{fmt}")
+
+    def write(self, value: Any, sink: _Sink) -> None:
+        sink.buf += self.struct.pack(value)
+
+    def read(self, mv: memoryview, pos: int) -> tuple[Any, int]:
+        return self.cast(self.struct.unpack_from(mv, pos)[0]), pos + self.struct.size
+
+    def write_items(self, items: list, sink: _Sink) -> None:
+        sink.buf += array(self.fmt, items).tobytes()
+
+    def read_items(self, mv: memoryview, pos: int, n: int) -> tuple[list, int]:
+        end = pos + n * self.struct.size
+        items = array(self.fmt)
+        items.frombytes(mv[pos:end])
+        items = items.tolist()
+        if self.cast is bool:
+            items = [bool(item) for item in items]
+        return items, end
+
+
+class _Ints(_Packed):
+    """Packs each chunk of ints in the narrowest array type that fits them, named by a one byte type code"""
+
+    widths = [("b", 2 ** 7), ("h", 2 ** 15), ("i", 2 ** 31), ("q", 2 ** 63)]
+
+    def __init__(self):
+        super().__init__("int", "q", int)
+
+    def write_items(self, items: list, sink: _Sink) -> None:
+        low, high = (min(items), max(items)) if items else (0, 0)
+        for code, limit in self.widths:
+            if -limit <= low and high < limit:
+                break
+        sink.buf += code.encode()
+        sink.buf += array(code, items).tobytes()
+
+    def read_items(self, mv: memoryview, pos: int, n: int) -> tuple[list, int]:
+        items = array(chr(mv[pos]))
+        end = pos + 1 + n * items.itemsize
+        items.frombytes(mv[pos + 1:end])
+        return items.tolist(), end
+
+
+class _Text(_Codec):
+    def __init__(self, text: bool):
+        self.text = text
+        self.sig = "str" if text else "bytes"
+
+    def write(self, value: Any, sink: _Sink) -> None:
+        data = value.encode() if self.text else value
+        sink.buf += _u32.pack(len(data))
+        sink.buf += data
+
+    def read(self, mv: memoryview, pos: int) -> tuple[Any, int]:
+        n = _u32.unpack_from(mv, pos)[0]
+        pos += 4
+        data = bytes(mv[pos:pos + n])
+        return data.decode() if self.text else data, pos + n
+
+    def write_items(self, items: list, sink: _Sink) -> None:
+        data = [item.encode() for item in items] if self.text else items
+        sink.buf += array("I", map(len, data)).tobytes()
+        sink.buf += b"".join(data)
+
+    def read_items(self, mv: memoryview, pos: int, n: int) -> tuple[list, int]:
+        lengths = array("I")
+        lengths.frombytes(mv[pos:pos + 4 * n])
+        pos += 4 * n
+        ends = list(accumulate(lengths))
+        total = ends[-1] if ends else 0
+        blob = bytes(mv[pos:pos + total])
+        if self.text:
+            # Decoding all at once is much faster, and for ASCII the byte offsets are the character offsets too
+            text = blob.decode()
+            if len(text) == total:
+                blob = text
+        items = [blob[start:end] for start, end in zip([0] + ends, ends)]
+        if self.text and type(blob) is bytes:
+            items = [item.decode() for item in items]
+        return items, pos + total
+
+
+class _Optional(_Codec):
+    def __init__(self, inner: _Codec):
+        self.inner = inner
+        self.sig = f"Optional[{inner.sig}]"
+
+    def write(self, value: Any, sink: _Sink) -> None:
+        if value is None:
+            sink.buf += b"\0"
+        else:
+            sink.buf += b"\1"
+            self.inner.write(value, sink)
+
+    def read(self, mv: memoryview, pos: int) -> tuple[Any, int]:
+        if not mv[pos]:
+            return None, pos + 1
+        return self.inner.read(mv, pos + 1)
+
+
+class _Sequence(_Codec):
+    def __init__(self, container: type, item: _Codec):
+        self.container = container
+        self.item = item
+        self.sig = f"{container.__name__}[{item.sig}]"
+
+    def write(self, value: Any, sink: _Sink) -> None:
+        if isinstance(value, (set, frozenset)):
+            value = _canonical_order(value, self.item)
+        elif not isinstance(value, (list, tuple)):
+            value = list(value)
+        sink.buf += _u32.pack(len(value))
+        for start in range(0, len(value), CHUNK):
+            self.item.write_items(value[start:start + CHUNK], sink)
+            sink.flush_if_full()
+
+    def read(self, mv: memoryview, pos: int) -> tuple[Any, int]:
+        n = _u32.unpack_from(mv, pos)[0]
+        pos += 4
+        items = []
+        for start in range(0, n, CHUNK):
+            chunk, pos = self.item.read_items(mv, pos, min(CHUNK, n - start))
+            items.extend(chunk)
+        return items if self.container is list else self.container(items), pos
+
+
+class _Tuple(_Codec):
+    def __init__(self, items: list[_Codec]):
+        self.items = items
+        self.sig = f"tuple[{', '.join(item.sig for item in items)}]"
+
+    def write(self, value: Any, sink: _Sink) -> None:
+        if len(value) != len(self.items):
+            raise TypeError(f"Expected {len(self.items)} items but got {len(value)}")
+        for codec, item in zip(self.items, value):
+            codec.write(item, sink)
+
+    def read(self, mv: memoryview, pos: int) -> tuple[Any, int]:
+        value = []
+        for codec in self.items:
+            item, pos = codec.read(mv, pos)
+            value.append(item)
+        return tuple(value), pos
+
+    def write_items(self, items: list, sink: _Sink) -> None:
+        # Stored as columns so each position can be packed
+        for i, codec in enumerate(self.items):
+            codec.write_items([item[i] for item in items], sink)
+
+    def read_items(self, mv: memoryview, pos: int, n: int) -> tuple[list, int]:
+        columns = []
+        for codec in self.items:
+            column, pos = codec.read_items(mv, pos, n)
+            columns.append(column)
+        return list(zip(*columns)), pos
+
+
+class _Dict(_Codec):
+    def __init__(self, key: _Codec, value: _Codec):
+        self.key = key
+        self.value = value
+        self.sig = f"dict[{key.sig}, {value.sig}]"
+
+    def write(self, value: Any, sink: _Sink) -> None:
+        if not isinstance(value, dict):
+            raise TypeError(f"Expected a dict but got {type(value).__name__}")
+        sink.buf += _u32.pack(len(value))
+        keys = list(value)
+        for start in range(0, len(keys), CHUNK):
+            chunk = keys[start:start + CHUNK]
+            self.key.write_items(chunk, sink)
+            self.value.write_items([value[key] for key in chunk], sink)
+            sink.flush_if_full()
+
+    def read(self, mv: memoryview, pos: int) -> tuple[Any, int]:
+        n = _u32.unpack_from(mv, pos)[0]
+        pos += 4
+        value = {}
+        for start in range(0, n, CHUNK):
+            count = min(CHUNK, n - start)
+            keys, pos = self.key.read_items(mv, pos, count)
+            values, pos = self.value.read_items(mv, pos, count)
+            value.update(zip(keys, values))
+        return value, pos
+
+
+class _Dataclass(_Codec):
+    def __init__(self, cls: type, fields: dict[str, _Codec]):
+        self.cls = cls
+        self.fields = fields
+        self.sig = f"{cls.__qualname__}({', '.join(f'{name}: {codec.sig}' for name, codec in fields.items())})"
+
+    def write(self, value: Any, sink: _Sink) -> None:
+        for name, codec in self.fields.items():
+            codec.write(getattr(value, name), sink)
+
+    def read(self, mv: memoryview, pos: int) -> tuple[Any, int]:
+        values = {}
+        for name, codec in self.fields.items():
+            values[name], pos = codec.read(mv, pos)
+        return self.cls(**values), pos
+
+
+class _Any(_Codec):
+    """Tags every value with its type, for fields whose hints don't say enough"""
+    sig = "Any"
+
+    def write(self, value: Any, sink: _Sink) -> None:
+        buf = sink.buf
+        t = type(value)
+        if value is None:
+            buf += b"N"
+        elif t is bool:
+            buf += b"T" if value else b"F"
+        elif t is int:
+            if -2 ** 63 <= value < 2 ** 63:
+                buf += b"i"
+                buf += _i64.pack(value)
+            else:
+                buf += b"I"
+                _TEXT.write(str(value), sink)
+        elif t is float:
+            buf += b"d"
+            buf += _f64.pack(value)
+        elif t is str:
+            buf += b"s"
+            _TEXT.write(value, sink)
+        elif t is bytes:
+            buf += b"b"
+            _BYTES.write(value, sink)
+        elif t in _ANY_CONTAINERS:
+            buf += _ANY_CONTAINERS[t]
+            buf += _u32.pack(len(value))
+            if t is set or t is frozenset:
+                value = _canonical_order(value, self)
+            for item in value:
+                self.write(item, sink)
+        elif t is dict:
+            buf += b"D"
+            buf += _u32.pack(len(value))
+            for key, item in value.items():
+                self.write(key, sink)
+                self.write(item, sink)
+        else:
+            raise TypeError(f"Can't save values of type {t.__name__} without a type hint for them")
+
+    def read(self, mv: memoryview, pos: int) -> tuple[Any, int]:
+        tag = bytes(mv[pos:pos + 1])
+        pos += 1
+        if tag == b"N":
+            return None, pos
+        if tag in (b"T", b"F"):
+            return tag == b"T", pos
+        if tag == b"i":
+            return _i64.unpack_from(mv, pos)[0], pos + 8
+        if tag == b"I":
+            digits, pos = _TEXT.read(mv, pos)
+            return int(digits), pos
+        if tag == b"d":
+            return _f64.unpack_from(mv, pos)[0], pos + 8
+        if tag == b"s":
+            return _TEXT.read(mv, pos)
+        if tag == b"b":
+            return _BYTES.read(mv, pos)
+        n = _u32.unpack_from(mv, pos)[0]
+        pos += 4
+        if tag == b"D":
+            value = {}
+            for _ in range(n):
+                key, pos = self.read(mv, pos)
+                value[key], pos = self.read(mv, pos)
+            return value, pos
+        items, pos = _Codec.read_items(self, mv, pos, n)
+        return _ANY_TAGS[tag](items), pos
+
+
+_TEXT = _Text(True)
+_BYTES = _Text(False)
+_ANY = _Any()
+_SCALARS: dict[type, _Codec] = {
+    int: _Ints(),
+    float: _Packed("float", "d", float),
+    bool: _Packed("bool", "b", bool),
+    str: _TEXT,
+    bytes: _BYTES,
+}
+_ANY_CONTAINERS = {list: b"l", tuple: b"t", set: b"S", frozenset: b"f"}
+_ANY_TAGS = {tag: container for container, tag in _ANY_CONTAINERS.items()}
+
+
+def codec_for(hint: Any) -> _Codec:
+    """Build the codec for values of a type hint"""
+    if hint in _SCALARS:
+        return _SCALARS[hint]
+    if hint in _ANY_CONTAINERS:
+        return _Sequence(hint, _ANY)
+    if hint is dict:
+        return _Dict(_ANY, _ANY)
+    if dataclasses.is_dataclass(hint):
+        hints = get_type_hints(hint)
+        return _Dataclass(hint, {f.name: codec_for(hints[f.name]) for f in dataclasses.fields(hint)})
+
+    origin, args = get_origin(hint), get_args(hint)
+    if origin in (Union, types.UnionType):
+        others = [arg for arg in args if arg is not type(None)]
+        if len(others) == 1 and len(args) == 2:
+            return _Optional(codec_for(others[0]))
+    elif origin is tuple:
+        if len(args) == 2 and args[1] is Ellipsis:
+            return _Sequence(tuple, codec_for(args[0]))
+        if args:
+            return _Tuple([codec_for(arg) for arg in args])
+        return _Sequence(tuple, _ANY)
+    elif origin in _ANY_CONTAINERS and len(args) == 1:
+        return _Sequence(origin, codec_for(args[0]))
+    elif origin is dict and len(args) == 2:
+        return _Dict(codec_for(args[0]), codec_for(args[1]))
+    return _ANY
+
+
+def _field_hints(cls: Type) -> dict[str, Any]:
+    try:
+        return get_type_hints(cls)
+    except Exception:
+        pass
+
+    # Resolve what we can one field at a time, anything else gets the fallback encoding
+    module = vars(sys.modules.get(cls.__module__, types.ModuleType("empty")))
+    hints = {}
+    for field, hint in cls.__annotations__.items():
+        if isinstance(hint, str):
+            try:
+                hint = eval(hint, module)
+            except Exception:
+                hint = Any
+        hints[field] = hint
+    return hints
+
+
+# Codecs for every field, keyed by storage class
+_all_field_codecs: dict[Type, dict[str, _Codec]] = {}
+
+
+def field_codecs(store: data_store.DataStore) -> dict[str, _Codec]:
+    """
+    Codecs for every field of a data store, transient ones included. Save files, replay checksums and replication
+    all take their codecs from here, so they always agree on how a field is encoded
+    """
+    codecs = _all_field_codecs.get(store.storage_cls)
+    if codecs is None:
+        hints = _field_hints(store.storage_cls)
+        codecs = _all_field_codecs[store.storage_cls] = {
+            field: codec_for(hints.get(field, Any)) for field in store.field_access
+        }
+    return codecs
+
+
+def encode(codec: _Codec, value: Any) -> bytes:
+    stream = io.BytesIO()
+    sink = _Sink(stream)
+    codec.write(value, sink)
+    sink.flush()
+    return stream.getvalue()
+
+
+def encodable(codec: _Codec, value: Any) -> bool:
+    """Whether a codec can encode a value"""
+    try:
+        encode(codec, value)
+    except TypeError:
+        return False
+    return True
+
+
+def decode(codec: _Codec, data: bytes) -> Any:
+    value, _ = codec.read(memoryview(data), 0)
+    return value
+
+
+class Schema:
+    """Codecs for the persistent fields of a storage class"""
+
+    # Schemas already built, keyed by storage class
+    schemas: dict[Type, "Schema"] = {}
+
+    def __init__(self, store: data_store.DataStore):
+        codecs = field_codecs(store)
+        self.codecs: dict[str, _Codec] = {
+            field: codecs[field]
+            for field, access in store.field_access.items()
+            if isinstance(access, (data_store.Access.game, data_store.Access.static))
+        }
+
+    @classmethod
+    def of(cls, store: data_store.DataStore) -> Schema:
+        try:
+            return cls.schemas[store.storage_cls]
+        except KeyError:
+            cls.schemas[store.storage_cls] = cls(store)
+            return cls.schemas[store.storage_cls]
+
+    def fields_for(self, store: data_store.DataStore, sc: Type[scene.Scene]) -> list[str]:
+        """Persistent fields a scene can access"""
+        return [
+            field for field in self.codecs
+            if isinstance(store.field_access[field], data_store.Access.game) or sc in store.field_access[field].args
+        ]
+
+
+def save(store: data_store.DataStore, file: BinaryIO | str | os.PathLike, fields: Optional[Iterable[str]] = None) -> None:
+    """
+    Write the persistent fields of a data store. The file only has to support write, so it can be a pipe or socket
+
+    :param store: The data store to save
+    :param file: Path or binary file to write to
+    :param fields: Fields to save. Defaults to every game and static field
+    """
+    if not hasattr(file, "write"):
+        with open(file, "wb") as f:
+            return save(store, f, fields)
+
+    schema = Schema.of(store)
+    fields = list(schema.codecs) if fields is None else list(fields)
+    sink = _Sink(file)
+    sink.buf += MAGIC
+    index = {}
+    for field in fields:
+        if field not in schema.codecs:
+            raise ValueError(f"Field {field} isn't a game or static field")
+        codec = schema.codecs[field]
+        start = sink.tell()
+        try:
+            codec.write(getattr(store.storage_inst, field), sink)
+        except (TypeError, ValueError, OverflowError, struct.error) as e:
+            raise TypeError(f"Can't save field {field} as {codec.sig}: {e}") from e
+        index[field] = [codec.sig, start, sink.tell() - start]
+        sink.flush_if_full()
+
+    index_start = sink.tell()
+    sink.buf += json.dumps(index, separators=(",", ":")).encode()
+    sink.buf += TRAILER.pack(index_start, MAGIC)
+    sink.flush()
+
+
+def read_index(file: BinaryIO) -> dict[str, tuple[str, int, int]]:
+    """Read the index of a save file, as each field's type signature, offset and length"""
+    end = file.seek(-TRAILER.size, os.SEEK_END)
+    index_start, magic = TRAILER.unpack(file.read(TRAILER.size))
+    file.seek(0)
+    if magic != MAGIC or file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a save file")
+    file.seek(index_start)
+    return {field: tuple(entry) for field, entry in json.loads(file.read(end - index_start)).items()}
+
+
+def load(store: data_store.DataStore, file: BinaryIO | str | os.PathLike, fields: Optional[Iterable[str]] = None,
+         sc: Optional[Type[scene.Scene]] = None) -> list[str]:
+    """
+    Read saved fields into a data store. Only the requested fields are read from the file, which must be seekable.
+    Fields the file doesn't have keep their current values
+
+    :param store: The data store to load into
+    :param file: Path or binary file to read from
+    :param fields: Fields to load. Defaults to every persistent field
+    :param sc: Only load the persistent fields this scene can access
+    :return: The fields that were loaded
+    """
+    if not hasattr(file, "read"):
+        with open(file, "rb") as f:
+            return load(store, f, fields, sc)
+
+    schema = Schema.of(store)
+    if fields is None:
+        fields = schema.fields_for(store, sc) if sc is not None else list(schema.codecs)
+    index = read_index(file)
+
+    loaded = []
+    for field in fields:
+        if field not in index:
+            continue
+        codec = schema.codecs[field]
+        sig, offset, length = index[field]
+        if sig != codec.sig:
+            raise ValueError(f"Field {field} was saved as {sig} but is declared as {codec.sig}")
+
+        file.seek(offset)
+        data = file.read(length)
+        value, _ = codec.read(memoryview(data), 0)
+        setattr(store.storage_inst, field, value)
+        if store.track_writes:
+            store.mark_written(field)
+        loaded.append(field)
+    return loaded
@@ -1,29 +1,37 @@
 from __future__ import annotations
-from typing import Callable, Type, TYPE_CHECKING, Optional
+from typing import Any, Callable, Type, TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
     from game import Game
 
 from abc import ABC, abstractmethod
-import inspect
 from collections import defaultdict
+from itertools import chain
+import inspect
+
+import profiling
 
 
 transition_condition_type = Callable[[Type["Scene"], "Game"], bool]
 transition_act_type = Callable[[Type["Scene"], Type["Scene"], "Game"], None]
+event_condition_type = Callable[[Type["Scene"], "Game", Any], bool]
+scene_event_handler_type = Callable[[Type["Scene"], "Game", Any], None]
 
 
 class TransitionCondition:
-    def __init__(self, fun: transition_condition_type, dest: Type["Scene"]):
+    def __init__(self, fun: transition_condition_type, dest: Type["Scene"], volatile: bool = False):
         self.fun = fun
         self.dest = dest
         self.act: list[transition_act_type] = []
 
+        # Volatile conditions depend on more than the data store (e.g. the clock), so they can't be cached
+        self.volatile = volatile
+
     @classmethod
-    def add(cls, dest: Type[Scene] | str) -> Callable[[transition_condition_type], TransitionCondition]:
+    def add(cls, dest: Type[Scene] | str, volatile: bool = False) -> Callable[[transition_condition_type], TransitionCondition]:
         dest = Scene.classes_by_name.get(dest, dest)
         def dec(method: transition_condition_type) -> TransitionCondition:
-            return cls(method, dest)
+            return cls(method, dest, volatile)
         return dec
 
     def transition_action(self, act: transition_act_type | TransitionContextStore) -> transition_act_type | TransitionContextStore:
@@ -37,8 +45,75 @@ class TransitionCondition:
         return self.fun(scene, game)
 
 
-def transition_condition(dest: Type["Scene"] | str) -> Callable[[transition_condition_type], TransitionCondition]:
-    return TransitionCondition.add(dest)
+def transition_condition(dest: Type["Scene"] | str, volatile: bool = False) -> Callable[[transition_condition_type], TransitionCondition]:
+    return TransitionCondition.add(dest, volatile)
+
+
+class EventTransitionCondition(TransitionCondition):
+    """
+    Transition condition that's only checked when an event of its type is dispatched, instead of every tick.
+    The condition also gets the event
+    """
+
+    def __init__(self, fun: event_condition_type, dest: Type["Scene"] | str, event_type: type):
+        super().__init__(fun, dest)
+        self.event_type = event_type
+
+    @classmethod
+    def add(cls, event_type: type, dest: Type[Scene] | str) -> Callable[[event_condition_type], EventTransitionCondition]:
+        dest = Scene.classes_by_name.get(dest, dest)
+        def dec(method: event_condition_type) -> EventTransitionCondition:
+            return cls(method, dest, event_type)
+        return dec
+
+    def __call__(self, scene: Type[Scene], game: Game, event: Any) -> bool:
+        return self.fun(scene, game, event)
+
+
+def event_transition(event_type: type, dest: Type["Scene"] | str) -> Callable[[event_condition_type], EventTransitionCondition]:
+    return EventTransitionCondition.add(event_type, dest)
+
+
+class EventHandler:
+    def __init__(self, fun: scene_event_handler_type, event_type: type):
+        self.fun = fun
+        self.event_type = event_type
+
+    def __call__(self, scene: Type[Scene], game: Game, event: Any) -> None:
+        self.fun(scene, game, event)
+
+
+class System:
+    """Scene method run on its own schedule while the scene is active, alongside the scene's update"""
+
+    def __init__(self, fun: Callable[[Type["Scene"], "Game"], None], every: int, phase: Optional[int], cost: float):
+        self.fun = fun
+        self.every = every
+        self.phase = phase
+        self.cost = cost
+
+    def __call__(self, scene: Type[Scene], game: Game) -> Any:
+        return self.fun(scene, game)
+
+
+def system(every: int = 1, phase: Optional[int] = None, cost: float = 1.0) -> Callable[[Callable[[Type["Scene"], "Game"], None]], System]:
+    """
+    Decorator for scene methods that run every `every` ticks while the scene is the game's scene or one of its layers
+
+    :param every: Ticks between runs
+    :param phase: Tick, modulo every, to run on. Defaults to whichever spreads the game's work out best
+    :param cost: Rough cost relative to the other scheduled work, used to pick a phase
+    """
+    def dec(method: Callable[[Type["Scene"], "Game"], None]) -> System:
+        return System(method, every, phase, cost)
+    return dec
+
+
+def event_handler(event_type: type) -> Callable[[scene_event_handler_type], EventHandler]:
+    """Decorator for scene methods that are called with each event of a type dispatched while in the scene"""
+    def dec(method: scene_event_handler_type) -> EventHandler:
+        return EventHandler(method, event_type)
+    return dec
 
 
 class TransitionContextStore:
@@ -59,6 +134,23 @@ class TransitionContextStore:
         self.act(src, dest, game)
 
 
+def _run_action(game: Game, owner: Type["Scene"], act: transition_act_type, src: Type["Scene"], dest: Type["Scene"]) -> Any:
+    # Returns what the action returns, which async_game awaits if it's a coroutine
+    if game.profiler is not None:
+        return game.profiler.call(profiling.frame_name(owner, act), act, src, dest, game)
+    return act(src, dest, game)
+
+
+def _run_sync_action(game: Game, owner: Type["Scene"], act: transition_act_type, src: Type["Scene"], dest: Type["Scene"]) -> None:
+    # Nothing would await a coroutine here, so it would silently never run
+    result = _run_action(game, owner, act, src, dest)
+    if inspect.isawaitable(result):
+        if inspect.iscoroutine(result):
+            result.close()
+        raise TypeError(f"Transition action {getattr(act, '__qualname__', act)} is asynchronous, which only works "
+                        f"in an AsyncScene run by an AsyncGame")
+
+
 def transition_action(src: Type[Scene] | str = None, dest: Type[Scene] | str = None, context: int = TransitionContextStore.LEAVE) -> Callable[[transition_act_type | TransitionContextStore], transition_act_type | TransitionContextStore]:
     if src is None and dest is None:
         raise ValueError("Have to set src or dest or both")
@@ -69,11 +161,11 @@ def transition_action(src: Type[Scene] | str = None, dest: Type[Scene] | str = N
 
         if context == TransitionContextStore.LEAVE:
             def dec(func: transition_act_type) -> transition_act_type:
-                src.leave_trans_acts[dest].append(func)
+                src._add_keyed("leave_trans_acts", dest, func)
                 return func
         elif context == TransitionContextStore.ENTER:
             def dec(func: transition_act_type) -> transition_act_type:
-                dest.enter_trans_acts[src].append(func)
+                dest._add_keyed("enter_trans_acts", src, func)
                 return func
         else:
             raise ValueError("Not a valid transition context")
@@ -102,76 +194,179 @@ class Scene(ABC):
     classes_by_name: dict[str, Type["Scene"]] = {}
     class_keyed_dicts: set[str] = {"transition_conditions", "enter_trans_acts", "leave_trans_acts"}
 
+    # Dictionaries keyed by event type
+    event_keyed_dicts: set[str] = {"event_transitions", "event_handlers"}
+
+    # Scene names used as keys before their class existed, with the scene and dictionary each one is in
+    pending_names: defaultdict[str, list[tuple[Type["Scene"], str]]] = defaultdict(list)
+
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
 
         # Add class to dictionary of scene types
         cls.classes_by_name[cls.__name__] = cls
 
-        # Make a copy of the parent dictionaries
-        cls.transition_conditions = defaultdict(list, {scene: conds.copy() for scene, conds in cls.transition_conditions})
-        cls.enter_trans_acts = defaultdict(list, {scene: acts.copy() for scene, acts in cls.enter_trans_acts})
-        cls.leave_trans_acts = defaultdict(list, {scene: acts.copy() for scene, acts in cls.leave_trans_acts})
-
-        # Add actions to dictionaries if any were created in this class by decoration
-        for name, m in inspect.getmembers(cls):
-            if isinstance(m, TransitionCondition):
-                cls.transition_conditions[m.dest].append(m)
+        # Make a copy of the parent dictionaries, which may have names of scenes that don't exist yet
+        for dictname in cls.class_keyed_dicts:
+            parent = getattr(cls, dictname)
+            setattr(cls, dictname, defaultdict(list))
+            for scene, items in parent.items():
+                cls._add_keyed(dictname, scene, *items)
+        for dictname in cls.event_keyed_dicts:
+            parent = getattr(cls, dictname)
+            setattr(cls, dictname, defaultdict(list, {event_type: list(items) for event_type, items in parent.items()}))
+
+        cls.systems = [*cls.systems, *(m for m in vars(cls).values() if isinstance(m, System))]
+
+        # Add actions to dictionaries if any were created in this class by decoration.
+        # Only this class's own members are needed since inherited ones came with the parent dictionaries.
+        # They're taken in order of name, so when several transitions are met the same one always wins
+        for _, m in sorted(vars(cls).items()):
+            if isinstance(m, EventTransitionCondition):
+                cls.event_transitions[m.event_type].append(m)
+                if isinstance(m.dest, str):
+                    cls.pending_names[m.dest].append((cls, "event_transitions"))
+            elif isinstance(m, EventHandler):
+                cls.event_handlers[m.event_type].append(m)
+            elif isinstance(m, TransitionCondition):
+                cls._add_keyed("transition_conditions", m.dest, m)
             elif isinstance(m, TransitionContextStore):
                 for scene in m.contexts[TransitionContextStore.ENTER]:
-                    cls.enter_trans_acts[scene].append(m.act)
+                    cls._add_keyed("enter_trans_acts", Scene.classes_by_name.get(scene, scene), m.act)
                 for scene in m.contexts[TransitionContextStore.LEAVE]:
-                    cls.leave_trans_acts[scene].append(m.act)
+                    cls._add_keyed("leave_trans_acts", Scene.classes_by_name.get(scene, scene), m.act)
 
-        # Remove any strings in conditions or actions that refer to this class and replace with class
-        cls._correct_strings()
+        # Replace any strings in conditions or actions that refer to this class with the class
+        cls._resolve_pending()
 
+    @classmethod
+    def _add_keyed(cls, dictname: str, scene: Type[Scene] | str, *items) -> None:
+        getattr(cls, dictname)[scene].extend(items)
+        if isinstance(scene, str):
+            cls.pending_names[scene].append((cls, dictname))
 
     @classmethod
-    def _correct_strings(cls) -> None:
-        for scene in cls.classes_by_name.values():
-            for dictname in cls.class_keyed_dicts:
-                d = getattr(scene, dictname)
-                if cls.__name__ in d:
-                    d[cls] = d.pop(cls.__name__)
+    def _resolve_pending(cls) -> None:
+        name = cls.__name__
+        for scene, dictname in cls.pending_names.pop(name, ()):
+            d = getattr(scene, dictname)
+            if dictname == "event_transitions":
+                # Event transitions hold their destination rather than being keyed by it
+                for condition in chain.from_iterable(d.values()):
+                    if condition.dest == name:
+                        condition.dest = cls
+                continue
+            if name not in d:
+                continue
+            if cls in d:
+                d[cls].extend(d.pop(name))
+            else:
+                d[cls] = d.pop(name)
 
     @classmethod
     def assert_no_classnames(cls) -> None:
-        for scene in cls.classes_by_name.values():
-            for dictname in cls.class_keyed_dicts:
+        for name, places in cls.pending_names.items():
+            for scene, dictname in places:
                 d = getattr(scene, dictname)
-                for key in d:
-                    if isinstance(key, str):
-                        raise TypeError(f"Dictionary {dictname} in scene {scene.__name__} has string key {key}")
+                if dictname == "event_transitions":
+                    if any(condition.dest == name for condition in chain.from_iterable(d.values())):
+                        raise TypeError(f"Event transition in scene {scene.__name__} goes to unknown scene {name}")
+                elif name in d:
+                    raise TypeError(f"Dictionary {dictname} in scene {scene.__name__} has string key {name}")
 
     # These class attributes are automatically added when the scene is made, so don't define it for your subclasses
     transition_conditions: defaultdict[Type[Scene], list[TransitionCondition]] = defaultdict(list)
     enter_trans_acts: defaultdict[Type[Scene], list[transition_act_type]] = defaultdict(list)
     leave_trans_acts: defaultdict[Type[Scene], list[transition_act_type]] = defaultdict(list)
+    event_transitions: defaultdict[type, list[EventTransitionCondition]] = defaultdict(list)
+    event_handlers: defaultdict[type, list[EventHandler]] = defaultdict(list)
+    systems: list[System] = []
+
+    # How often the game runs this scene's update and checks its transition conditions, and on which tick modulo
+    # update_every. A phase of None lets the game's scheduler pick one that spreads the work out
+    update_every = 1
+    update_phase: Optional[int] = None
+    update_cost = 1.0
 
     # Since each scene is just convenient way to wrap several functions, it shouldn't have any instances
     def __new__(cls):
         raise RuntimeError(f"Cannot make instances of scenes")
 
     @classmethod
-    def _detect_transition(cls, game: Game) -> Type[Scene]:
+    def _condition_met(cls, condition: TransitionCondition, game: Game) -> bool:
+        if game.incremental_transitions:
+            return game.data.evaluate_tracked(condition, cls, game)
+        return condition(cls, game)
+
+    @classmethod
+    def _find_transition(cls, game: Game) -> Optional[tuple[TransitionCondition, Type[Scene]]]:
+        """Find the first transition condition that's met, without running its actions"""
+        incremental = game.incremental_transitions
+        profiler = game.profiler
         for scene, conditions in cls.transition_conditions.items():
             for condition in conditions:
-                if condition(cls, game):
-                    for act in condition.act:
-                        act(cls, scene, game)
-                    return scene
-        return cls
+                if profiler is not None:
+                    met = profiler.call(profiling.frame_name(cls, condition), cls._condition_met, condition, game)
+                elif incremental:
+                    met = game.data.evaluate_tracked(condition, cls, game)
+                else:
+                    met = condition(cls, game)
+                if met:
+                    return condition, scene
+        return None
+
+    @classmethod
+    def _detect_transition(cls, game: Game) -> Type[Scene]:
+        found = cls._find_transition(game)
+        if found is None:
+            return cls
+        condition, scene = found
+        for act in condition.act:
+            _run_sync_action(game, cls, act, cls, scene)
+        return scene
 
     @classmethod
     def _transition_game(cls, game: Game, scene: Optional[Type[Scene]]) -> None:
         curr_scene = game.scene
         if scene == curr_scene:
             return
+        profiler = game.profiler
+        if profiler is not None:
+            profiler.call(f"{curr_scene.__name__}.leave", curr_scene.leave, game, scene)
+            game.scene = scene
+            profiler.call(f"{scene.__name__}.enter", scene.enter, game, curr_scene)
+            return
         game.scene.leave(game, scene)
         game.scene = scene
         game.scene.enter(game, curr_scene)
 
+    @classmethod
+    def on_event(cls, game: Game, event: Any) -> None:
+        """
+        Called by the game's event bus for each event dispatched while in this scene. Runs the scene's handlers for
+        the event's type, then transitions on the first of its event transitions that's met
+        """
+        for handler in cls.event_handlers.get(type(event), ()):
+            handler(cls, game, event)
+
+        found = cls._find_event_transition(game, event)
+        if found is None:
+            return
+        condition, dest = found
+        for act in condition.act:
+            _run_sync_action(game, cls, act, cls, dest)
+        cls._transition_game(game, dest)
+
+    @classmethod
+    def _find_event_transition(cls, game: Game, event: Any) -> Optional[tuple[EventTransitionCondition, Type[Scene]]]:
+        conditions = cls.event_transitions.get(type(event))
+        if not conditions:
+            return None
+        for condition in conditions:
+            if condition(cls, game, event):
+                return condition, condition.dest
+        return None
+
     @classmethod
     def transition(cls, game: Game) -> None:
         """
@@ -180,13 +375,20 @@ class Scene(ABC):
         :param game: The current game
         :return: The scene _id of the new scene
         """
+        if game.profiler is not None:
+            dest = game.profiler.call(f"{cls.__name__}._detect_transition", cls._detect_transition, game)
+            cls._transition_game(game, dest)
+            return
         cls._transition_game(game, cls._detect_transition(game))
 
     @classmethod
     def enter(cls, game: Game, src: Optional[Type[Scene]] = None) -> None:
         for act in cls.enter_trans_acts[src]:
-            act(src, cls, game)
-        game.data.transition(game, src, cls)
+            _run_sync_action(game, cls, act, src, cls)
+        if game.profiler is not None:
+            game.profiler.call("DataStore.transition", game.data.transition, game, src, cls)
+        else:
+            game.data.transition(game, src, cls)
 
     @classmethod
     def update(cls, game: Game) -> None:
@@ -195,4 +397,4 @@ class Scene(ABC):
     @classmethod
     def leave(cls, game: Game, dest: Type[Scene]) -> None:
         for act in cls.leave_trans_acts[dest]:
-            act(cls, dest, game)
+            _run_sync_action(game, cls, act, cls, dest)
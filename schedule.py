@@ -0,0 +1,136 @@
+from __future__ import annotations
+from typing import Any, Callable, Hashable, Optional
+from collections import defaultdict
+from itertools import count
+from math import gcd
+from time import perf_counter
+
+import util
+
+
+class Task:
+    """Something run every `every` ticks, on the ticks where tick % every == phase"""
+    __slots__ = ('key', 'fn', 'every', 'phase', 'auto_phase', 'cost', 'order', 'stats')
+
+    def __init__(self, key: Hashable, fn: Callable[..., Any], every: int, phase: int, auto_phase: bool, cost: float, order: int):
+        self.key = key
+        self.fn = fn
+        self.every = every
+        self.phase = phase
+        self.auto_phase = auto_phase
+        self.cost = cost
+        self.order = order
+        self.stats = util.TimingStats(window=100)
+
+
+class Scheduler:
+    """
+    Runs tasks at their own rates. Tasks without a phase are given the one that overlaps least with the tasks already
+    scheduled, weighted by their cost, so work that only has to happen every few ticks is spread out instead of
+    piling up on the same tick. Tasks due on the same tick run in the order they were added
+    """
+
+    def __init__(self):
+        self.tasks: dict[Hashable, Task] = {}
+
+        # Tasks by period, then by phase, so finding the due ones only looks at one bucket per period
+        self.buckets: dict[int, defaultdict[int, list[Task]]] = {}
+        self.order = count()
+
+        # Measure how long tasks take, which rebalance uses instead of their declared costs
+        self.timed = False
+
+    def add(self, key: Hashable, fn: Callable[..., Any], every: int = 1, phase: Optional[int] = None, cost: float = 1.0) -> Task:
+        """
+        Schedule fn to run every `every` ticks
+
+        :param key: Name to remove the task by
+        :param fn: Called with the arguments given to run
+        :param every: Ticks between runs
+        :param phase: Tick, modulo every, to run on. Defaults to the least busy one
+        :param cost: Rough relative cost of running, for picking phases
+        """
+        if every < 1:
+            raise ValueError("Tasks have to run at least every tick")
+        if key in self.tasks:
+            raise KeyError(f"Task {key!r} is already scheduled")
+        auto_phase = phase is None
+        if auto_phase:
+            phase = self.quietest_phase(every)
+        task = Task(key, fn, every, phase % every, auto_phase, cost, next(self.order))
+        self.tasks[key] = task
+        self.buckets.setdefault(every, defaultdict(list))[task.phase].append(task)
+        return task
+
+    def remove(self, key: Hashable) -> None:
+        task = self.tasks.pop(key)
+        by_phase = self.buckets[task.every]
+        by_phase[task.phase].remove(task)
+        if not by_phase[task.phase]:
+            del by_phase[task.phase]
+            if not by_phase:
+                del self.buckets[task.every]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.tasks
+
+    def load(self, every: int, phase: int) -> float:
+        """Expected cost of the other tasks on the ticks a task with this period and phase would run on"""
+        total = 0.0
+        for task in self.tasks.values():
+            g = gcd(every, task.every)
+            if phase % g == task.phase % g:
+                # The task runs on g / task.every of those ticks
+                total += self._cost(task) * g / task.every
+        return total
+
+    def quietest_phase(self, every: int) -> int:
+        return min(range(every), key=lambda phase: self.load(every, phase))
+
+    def _cost(self, task: Task) -> float:
+        return task.stats.mean if self.timed and task.stats.count else task.cost
+
+    def due(self, tick: int) -> list[Task]:
+        due = []
+        for every, by_phase in self.buckets.items():
+            tasks = by_phase.get(tick % every)
+            if tasks:
+                due.extend(tasks)
+        if len(due) > 1:
+            due.sort(key=lambda task: task.order)
+        return due
+
+    def run(self, tick: int, *args) -> list[Task]:
+        """
+        Run every task due on a tick with the given arguments
+
+        :return: The tasks that were run
+        """
+        due = self.due(tick)
+        for task in due:
+            if self.timed:
+                start = perf_counter()
+                task.fn(*args)
+                task.stats.add(perf_counter() - start)
+            else:
+                task.fn(*args)
+        return due
+
+    def rebalance(self) -> None:
+        """Pick the phases of the tasks that weren't given one again, most expensive first"""
+        auto = sorted((task for task in self.tasks.values() if task.auto_phase), key=self._cost, reverse=True)
+        for task in auto:
+            self.remove(task.key)
+        for task in auto:
+            stats = task.stats
+            new = self.add(task.key, task.fn, task.every, None, task.cost)
+            new.stats = stats
+            new.order = task.order
+
+    def worst_load(self) -> float:
+        """Highest total cost of the tasks due on any one tick"""
+        periods = list(self.buckets)
+        horizon = 1
+        for every in periods:
+            horizon = horizon * every // gcd(horizon, every)
+        return max((sum(self._cost(task) for task in self.due(tick)) for tick in range(horizon)), default=0.0)
@@ -0,0 +1,46 @@
+import pytest
+
+import scene
+import data_store
+
+
+class AccFirst(scene.Scene): pass
+
+
+class AccSecond(scene.Scene): pass
+
+
+class AccData:
+    shared: int = 1,        data_store.Access.game()
+    first: list = [],       data_store.Access.transient(AccFirst)
+    second: str = "hi",     data_store.Access.static(AccSecond)
+
+
+@pytest.mark.parametrize("compiled", [True, False])
+def test_allowed_fields(compiled, monkeypatch):
+    monkeypatch.setattr(data_store.DataStore, "compile_accessors", compiled)
+    store = data_store.DataStore(AccData)
+    store[AccFirst].shared += 1
+    store[AccFirst].first.append(3)
+    assert store[AccSecond].shared == 2
+    assert store[AccFirst].first == [3]
+    store[AccSecond].second = "bye"
+    assert store.storage_inst.second == "bye"
+
+
+@pytest.mark.parametrize("compiled", [True, False])
+def test_forbidden_fields(compiled, monkeypatch):
+    monkeypatch.setattr(data_store.DataStore, "compile_accessors", compiled)
+    store = data_store.DataStore(AccData)
+    with pytest.raises(TypeError):
+        store[AccFirst].second
+    with pytest.raises(TypeError):
+        store[AccSecond].first = [1]
+
+
+def test_one_class_per_scene():
+    store = data_store.DataStore(AccData)
+    other = data_store.DataStore(AccData)
+    assert type(store[AccFirst]) is type(other[AccFirst])
+    assert type(store[AccFirst]) is not type(store[AccSecond])
+    assert not hasattr(store[AccFirst], "__dict__")
@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+
+import async_game
+import data_store
+import game
+import scene
+
+
+class AsyWait(async_game.AsyncScene):
+    log = []
+
+    @classmethod
+    async def enter(cls, game, src=None):
+        await super().enter(game, src)
+        cls.log.append(("enter", game.name))
+
+    @classmethod
+    async def update(cls, game):
+        line = game.input.poll()
+        if line is not None:
+            game.data[cls].name = line
+
+    @scene.transition_condition("AsyLoad")
+    def named(cls, game):
+        return game.data[cls].name is not None
+
+    @named.transition_action
+    async def greet(src, dest, game):
+        await asyncio.sleep(0)
+        AsyWait.log.append(("greet", game.name, game.data[src].name))
+
+
+class AsyLoad(async_game.AsyncScene):
+    @classmethod
+    async def enter(cls, game, src=None):
+        await super().enter(game, src)
+        game.spawn(cls.load(game))
+
+    @staticmethod
+    async def load(game):
+        await asyncio.sleep(0.02)
+        game.data[AsyLoad].scores = [3, 2, 1]
+
+    @scene.transition_condition("AsyDone")
+    def loaded(cls, game):
+        return game.data[cls].scores is not None
+
+
+class AsyDone(scene.Scene):
+    @classmethod
+    def enter(cls, game, src=None):
+        super().enter(game, src)
+        game.stop()
+
+
+class AsyData:
+    name: str = None,       data_store.Access.transient(AsyWait)
+    scores: list = None,    data_store.Access.static(AsyLoad)
+
+
+class AsyGame(async_game.AsyncGame):
+    tick_interval = 0.001
+
+    def __init__(self, name):
+        self.name = name
+        super().__init__(AsyData, AsyWait)
+
+
+def test_games_share_loop():
+    AsyWait.log = []
+    games = [AsyGame("a"), AsyGame("b")]
+    ticks = []
+
+    async def main():
+        for g in games:
+            g.after(0.01, lambda g: g.input.feed(f"player {g.name}"))
+        runner = asyncio.ensure_future(async_game.run_games(*games, ticks=2000))
+        while not runner.done():
+            ticks.append([g.tick_stats.count for g in games])
+            await asyncio.sleep(0.005)
+        await runner
+
+    asyncio.run(main())
+    assert all(g.scene is AsyDone for g in games)
+    assert sorted(AsyWait.log) == [("enter", "a"), ("enter", "b"), ("greet", "a", "player a"), ("greet", "b", "player b")]
+    assert all(g.data[AsyLoad].scores == [3, 2, 1] for g in games)
+    # Both games kept ticking while waiting on input and loading
+    assert all(count > 2 for count in ticks[-1])
+
+
+def test_failed_task_raised_from_tick():
+    async def fail():
+        raise ValueError("boom")
+
+    async def main():
+        g = AsyGame("c")
+        await g.tick()
+        g.spawn(fail())
+        await asyncio.sleep(0.001)
+        try:
+            await g.tick()
+        except ValueError:
+            return True
+        return False
+
+    assert asyncio.run(main())
+
+
+class AsyHud(async_game.AsyncScene):
+    update_every = 2
+    update_phase = 0
+    log = []
+
+    @classmethod
+    async def enter(cls, game, src=None):
+        await super().enter(game, src)
+        await asyncio.sleep(0)
+        cls.log.append("hud enter")
+
+    @classmethod
+    async def update(cls, game):
+        await asyncio.sleep(0)
+        cls.log.append(("hud", game.tick_count))
+
+
+class AsyWorld(async_game.AsyncScene):
+    @scene.system(every=3, phase=1)
+    async def spawner(cls, game):
+        await asyncio.sleep(0)
+        AsyHud.log.append(("spawn", game.tick_count))
+
+
+def test_layers_and_systems_scheduled():
+    AsyHud.log = []
+
+    async def main():
+        g = async_game.AsyncGame(AsyData, AsyWorld)
+        await g.tick()
+        g.push_layer(AsyHud)
+        for _ in range(4):
+            await g.tick()
+
+    asyncio.run(main())
+    # The world scene was scheduled first, so its system runs before the layer on shared ticks
+    assert AsyHud.log == ["hud enter", ("spawn", 1), ("hud", 2), ("spawn", 4), ("hud", 4)]
+
+
+class AsySyncStart(scene.Scene):
+    @scene.transition_condition("AsySyncEnd")
+    def always(cls, game):
+        return True
+
+    @always.transition_action
+    async def never_awaited(src, dest, game):
+        pass
+
+
+class AsySyncEnd(scene.Scene):
+    pass
+
+
+def test_coroutine_action_outside_async_game_raises():
+    class SyncGame(game.Game):
+        def run(self) -> None:
+            pass
+
+    g = SyncGame(AsyData, AsySyncStart)
+    with pytest.raises(TypeError, match="never_awaited"):
+        g.update()
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+import entity
+import atlas
+
+
+def make_frames(folder, count):
+    folder.mkdir()
+    for i in range(count):
+        (folder / f"{folder.name}{i}.gif").write_bytes(f"{folder.name} frame {i}".encode() * (i + 1))
+    return str(folder)
+
+
+@pytest.fixture
+def packed(tmp_path):
+    folders = [make_frames(tmp_path / "bird", 3), make_frames(tmp_path / "pipe", 1)]
+    path = str(tmp_path / "sprites.atlas")
+    assert atlas.pack(path, folders) == {"bird": 3, "pipe": 1}
+    return path, folders
+
+
+def test_frames_match_files(packed):
+    path, folders = packed
+    loaded = atlas.Atlas(path)
+    assert loaded.names() == ["bird", "pipe"]
+    assert loaded.data_start % atlas.ALIGN == 0
+    for folder in folders:
+        frames = entity.FrameSet(folder)
+        name = os.path.basename(folder)
+        for i, frame_path in enumerate(frames.paths):
+            with open(frame_path, "rb") as f:
+                assert loaded.frame(name, i) == f.read()
+
+
+def test_frames_are_views_of_the_map(packed):
+    loaded = atlas.Atlas(packed[0])
+    frame = loaded.frame("bird", 2)
+    assert isinstance(frame, memoryview)
+    assert frame.obj is loaded.map
+
+
+def test_animated_entity_from_atlas(packed):
+    loaded = atlas.Atlas.open(packed[0])
+    assert atlas.Atlas.open(packed[0]) is loaded
+    sprite = entity.AnimatedEntity(loaded.frame_set("bird"), 1, 2)
+    assert len(sprite.frames) == 3
+    assert not sprite.frame_set.is_file
+    assert bytes(sprite.frame_set.data(1)) == b"bird frame 1" * 2
+    assert loaded.frame_set("bird") is sprite.frame_set
+    with pytest.raises(KeyError):
+        loaded.frame_set("missing")
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not.atlas"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        atlas.Atlas(str(path))
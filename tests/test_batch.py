@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+import scene
+import game
+import data_store
+import batch
+
+
+class Gamble(scene.Scene):
+    @classmethod
+    def update(cls, game) -> None:
+        if random.random() < game.data[cls].win_prob:
+            game.data[cls].wins += 1
+        game.data[cls].rounds += 1
+
+    @scene.transition_condition("GambleOver")
+    def broke(cls, game):
+        return game.data[cls].rounds >= game.data[cls].max_rounds
+
+
+class GambleOver(scene.Scene): pass
+
+
+class GambleData:
+    win_prob: float = 0.5,  data_store.Access.static(Gamble)
+    max_rounds: int = 50,   data_store.Access.static(Gamble)
+    wins: int = 0,          data_store.Access.game()
+    rounds: int = 0,        data_store.Access.transient(Gamble)
+
+
+class GambleGame(game.Game):
+    def run(self):
+        pass
+
+
+def is_over(game):
+    return game.scene is GambleOver
+
+
+def collect_wins(game):
+    return {"wins": game.data[GambleOver].wins}
+
+
+def make_jobs():
+    return batch.sweep(GambleGame, GambleData, Gamble, {"win_prob": [0.1, 0.9], "max_rounds": [20, 40]},
+                       repeats=2, base_seed=7, until=is_over, collect=collect_wins)
+
+
+def test_sweep_jobs():
+    jobs = make_jobs()
+    assert len(jobs) == 8
+    assert [job.seed for job in jobs] == list(range(7, 15))
+    assert jobs[0].game == f"{__name__}:GambleGame"
+
+
+def test_pool_matches_serial():
+    serial = batch.run_batch(make_jobs(), max_workers=0)
+    pooled = batch.run_batch(make_jobs(), max_workers=2, chunksize=3)
+    strip = lambda r: (r.index, r.seed, r.params, r.ticks, r.final_scene, r.transitions, r.metrics)
+    assert list(map(strip, serial)) == list(map(strip, pooled))
+
+    for result in serial:
+        assert result.ticks == result.params["max_rounds"]
+        assert result.final_scene == "GambleOver"
+    low = [r.metrics["wins"] for r in serial if r.params["win_prob"] == 0.1]
+    high = [r.metrics["wins"] for r in serial if r.params["win_prob"] == 0.9]
+    assert max(low) < min(high)
+
+
+def test_with_defaults():
+    overridden = batch.with_defaults(GambleData, {"win_prob": 1.0})
+    assert overridden is batch.with_defaults(GambleData, {"win_prob": 1.0})
+    store = data_store.DataStore(overridden)
+    assert store[Gamble].win_prob == 1.0 and store[Gamble].max_rounds == 50
+    with pytest.raises(KeyError):
+        batch.with_defaults(GambleData, {"missing": 1})
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+import camera
+import collision
+import entity
+import scene
+import turtle_entity
+import turtle_renderer
+import turtle_game
+from test_turtle_renderer import FakeScreen, FakeTurtle
+
+
+def test_follow_with_deadzone_and_bounds():
+    player = entity.Entity(0, 0)
+    cam = camera.Camera(100, 50, target=player, deadzone=(20, 10), bounds=(-100, -100, 300, 100))
+    player.x, player.y = 8, -4
+    cam.update()
+    assert (cam.x, cam.y) == (0, 0)
+
+    player.x, player.y = 30, -20
+    cam.update()
+    assert (cam.x, cam.y) == (20, -15)
+    assert cam.view() == (-30, -40, 70, 10)
+    assert cam.to_screen(30, -20) == (10, -5)
+
+    player.x = 1000
+    cam.update()
+    assert cam.x == 250
+
+
+def test_side_scroll_and_catch_up():
+    player = entity.Entity(0, 0)
+    cam = camera.SideScrollCamera(100, 100, y=5, target=player, catch_up=0.5)
+    player.x, player.y = 40, 40
+    cam.update()
+    assert (cam.x, cam.y) == (20, 5)
+
+
+def test_small_level_is_centred():
+    cam = camera.Camera(100, 100, x=500, bounds=(0, 0, 60, 200))
+    assert (cam.x, cam.y) == (30, 50)
+
+
+def make(monkeypatch, positions, world=None):
+    monkeypatch.setattr(turtle_entity.TurtleEntity, "create_default_turtle", staticmethod(FakeTurtle))
+    cam = camera.Camera(100, 100, margin=10)
+    renderer = turtle_renderer.TurtleRenderer(FakeScreen(), camera=cam, world=world)
+    entities = [turtle_entity.TurtleEntity("square", x, 0) for x in positions]
+    for e in entities:
+        renderer.add(e)
+        e.turtle.calls.clear()
+    return cam, renderer, entities
+
+
+@pytest.mark.parametrize("with_world", [False, True])
+def test_renderer_culls_to_camera(monkeypatch, with_world):
+    world = collision.CollisionWorld(16) if with_world else None
+    cam, renderer, (near, far) = make(monkeypatch, [40, 200], world)
+    if world is not None:
+        world.add(near)
+        world.add(far)
+
+    assert renderer.flush() == 1
+    assert near.turtle.calls == [("shape", "square"), ("goto", 40, 0), ("showturtle",)]
+    assert far.turtle.calls == []
+    near.turtle.calls.clear()
+
+    # Moving something off screen doesn't draw it
+    far.x = 300
+    assert renderer.flush() == 0
+    if world is not None:
+        world.update(far)
+
+    cam.x = 280
+    assert renderer.flush() == 2
+    assert near.turtle.calls == [("hideturtle",)]
+    assert far.turtle.calls == [("shape", "square"), ("goto", 20, 0), ("showturtle",)]
+    assert renderer.shown == {far}
+
+
+class CamScene(scene.Scene):
+    @classmethod
+    def update(cls, game) -> None:
+        game.player.x += 10
+
+
+class CamData:
+    pass
+
+
+class CamGame(turtle_game.TurtleGame):
+    fixed_dt = 0.1
+
+    def __init__(self):
+        self.player = entity.Entity(0, 0)
+        self.camera = camera.Camera(100, 100, target=self.player, catch_up=0.5)
+        super().__init__(CamData, CamScene)
+
+
+def test_camera_moves_with_ticks_not_frames():
+    # Frames that skip rendering to catch up, and headless ticks, move the camera the same as rendered ones
+    g = CamGame()
+    for _ in range(3):
+        g.update()
+    assert g.camera.x == 21.25
+
+
+class AsyncCamGame(turtle_game.AsyncTurtleGame):
+    def __init__(self):
+        self.player = entity.Entity(0, 0)
+        self.camera = camera.Camera(100, 100, target=self.player, catch_up=0.5)
+        super().__init__(CamData, CamScene)
+
+
+def test_async_camera_moves_with_ticks():
+    async def main():
+        g = AsyncCamGame()
+        for _ in range(3):
+            await g.tick()
+        return g.camera.x
+
+    assert asyncio.run(main()) == 21.25
@@ -0,0 +1,64 @@
+import random
+from math import hypot
+
+import entity
+import collision
+
+
+def random_entities(rng, n=300, size=500):
+    return [entity.Entity(rng.uniform(0, size), rng.uniform(0, size), rng.uniform(0, 40), rng.uniform(0, 40))
+            for _ in range(n)]
+
+
+def brute_pairs(entities):
+    return {frozenset((a, b)) for i, a in enumerate(entities) for b in entities[i + 1:] if a.overlaps(b)}
+
+
+def test_pairs_match_brute_force_after_moves():
+    rng = random.Random(1)
+    entities = random_entities(rng)
+    world = collision.CollisionWorld(25, entities)
+    for _ in range(5):
+        found = list(world.pairs())
+        assert len(found) == len(set(map(frozenset, found)))
+        assert set(map(frozenset, found)) == brute_pairs(entities)
+        for e in entities:
+            e.x += rng.uniform(-30, 30)
+            e.y += rng.uniform(-30, 30)
+        world.update_all()
+
+
+def test_point_and_rect_queries():
+    rng = random.Random(2)
+    entities = random_entities(rng)
+    world = collision.CollisionWorld(25, entities)
+    for _ in range(50):
+        x, y = rng.uniform(0, 500), rng.uniform(0, 500)
+        assert set(world.at_point(x, y)) == {e for e in entities if e.contains_point(x, y)}
+
+        rect = entity.Entity(x, y, rng.uniform(0, 100), rng.uniform(0, 100))
+        found = world.in_rect(*rect.hitbox())
+        assert len(found) == len(set(found))
+        assert set(found) == {e for e in entities if e.overlaps(rect)}
+
+
+def test_nearest():
+    rng = random.Random(3)
+    entities = random_entities(rng, n=100)
+    world = collision.CollisionWorld(10, entities)
+    for _ in range(50):
+        x, y = rng.uniform(-100, 600), rng.uniform(-100, 600)
+        best = min(hypot(e.x - x, e.y - y) for e in entities)
+        found = world.nearest(x, y)
+        assert hypot(found.x - x, found.y - y) == best
+    assert world.nearest(-1000, -1000, max_distance=10) is None
+
+
+def test_remove():
+    a, b = entity.Entity(0, 0, 10, 10), entity.Entity(5, 5, 10, 10)
+    world = collision.CollisionWorld(4, [a, b])
+    assert len(list(world.pairs())) == 1
+    world.remove(b)
+    assert list(world.pairs()) == []
+    assert b not in world
+    assert len(world.cells) == len(set(world._cells_in(world.cell_ranges[a])))
@@ -0,0 +1,63 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import entity_store
+
+
+def test_integrate_matches_python_loop():
+    store = entity_store.EntityStore(capacity=2)
+    rng = np.random.default_rng(0)
+    views = [store.entity(*rng.uniform(-10, 10, 2), 4, 4) for _ in range(50)]
+    expected = []
+    for e in views:
+        e.vx, e.vy, e.ax, e.ay = rng.uniform(-1, 1, 4)
+        expected.append([e.x, e.y, e.vx, e.vy, e.ax, e.ay])
+
+    for _ in range(10):
+        store.integrate(0.1)
+        for row in expected:
+            row[2] += row[4] * 0.1
+            row[3] += row[5] * 0.1
+            row[0] += row[2] * 0.1
+            row[1] += row[3] * 0.1
+
+    for e, (x, y, vx, vy, _, _) in zip(views, expected):
+        assert (e.x, e.y, e.vx, e.vy) == pytest.approx((x, y, vx, vy))
+    assert store.capacity >= 50
+
+
+def test_free_list_reuses_slots():
+    store = entity_store.EntityStore(capacity=4)
+    views = [store.entity(i, i, 1, 1) for i in range(4)]
+    views[1].despawn()
+    views[2].despawn()
+    assert len(store) == 2
+
+    again = [store.entity(7, 7), store.entity(8, 8)]
+    assert {e.slot for e in again} == {1, 2}
+    assert store.end == 4 and store.capacity == 4
+    assert again[0].hitwidth == 0
+
+
+def test_stale_handle():
+    store = entity_store.EntityStore()
+    e = store.entity(1, 2)
+    e.vx = 5
+    e.despawn()
+    store.integrate(1)
+    assert not e.alive
+    with pytest.raises(RuntimeError):
+        e.x
+    assert store.pos[e.slot].tolist() == [0, 0]
+
+
+def test_class_store():
+    class Bullet(entity_store.ArrayEntity):
+        store = entity_store.EntityStore()
+
+    b = Bullet(1, 2, 3, 4)
+    assert (b.x, b.y, b.hitwidth, b.hitheight) == (1, 2, 3, 4)
+    assert b.hitbox() == (-0.5, 0, 2.5, 4)
+    with pytest.raises(ValueError):
+        entity_store.ArrayEntity(0, 0)
@@ -0,0 +1,113 @@
+import dataclasses
+
+import pytest
+
+import game
+import scene
+
+
+@dataclasses.dataclass(frozen=True)
+class Hit:
+    damage: int
+
+
+@dataclasses.dataclass
+class Message:
+    text: str
+
+
+class Quit:
+    pass
+
+
+class EvPlay(scene.Scene):
+    seen = []
+
+    @scene.event_handler(Hit)
+    def on_hit(cls, game, event):
+        cls.seen.append(event)
+
+    @scene.event_transition(Hit, "EvDead")
+    def fatal(cls, game, event):
+        return event.damage >= 10
+
+    @fatal.transition_action
+    def die(src, dest, game):
+        EvPlay.seen.append((src, dest))
+
+    @scene.event_transition(Quit, "EvDead")
+    def quit(cls, game, event):
+        return True
+
+
+class EvDead(scene.Scene):
+    pass
+
+
+class EvData:
+    pass
+
+
+class EvGame(game.Game):
+    def run(self) -> None:
+        pass
+
+
+@pytest.fixture
+def g():
+    EvPlay.seen = []
+    return EvGame(EvData, EvPlay)
+
+
+def test_priority_and_coalescing(g):
+    order = []
+    g.events.subscribe(Hit, lambda e, g: order.append(("low", e.damage)), priority=-1)
+    g.events.subscribe(Hit, lambda e, g: order.append(("high", e.damage)), priority=1)
+    g.events.subscribe(Message, lambda e, g: order.append(e.text))
+
+    g.events.post(Hit(1))
+    g.events.post(Message("a"))
+    g.events.post(Message("a"))
+    g.events.post(Hit(2), priority=5)
+    g.events.post(Hit(1), priority=9)
+    assert g.events.coalesced == 1
+
+    assert g.events.dispatch(g) == 4
+    assert order == [("high", 1), ("low", 1), ("high", 2), ("low", 2), "a", "a"]
+    assert EvPlay.seen == [Hit(1), Hit(2)]
+    assert g.events.dispatch(g) == 0
+
+
+def test_event_transition(g):
+    g.update()
+    assert g.scene is EvPlay
+
+    g.events.post(Hit(3))
+    g.update()
+    assert g.scene is EvPlay
+
+    g.events.post(Hit(12))
+    g.events.post(Hit(1))
+    g.update()
+    assert g.scene is EvDead
+    assert EvPlay.seen == [Hit(3), Hit(12), (EvPlay, EvDead)]
+
+
+def test_posted_during_dispatch_waits(g):
+    g.events.subscribe(Message, lambda e, g: g.events.post(Quit()))
+    g.events.post(Message("bye"))
+    g.update()
+    assert g.scene is EvPlay and len(g.events.queue) == 1
+    g.update()
+    assert g.scene is EvDead
+
+
+def test_unsubscribe(g):
+    calls = []
+    handler = g.events.subscribe(Message, lambda e, g: calls.append(e))
+    g.events.unsubscribe(Message, handler)
+    g.events.post(Message("x"))
+    g.events.dispatch(g)
+    assert calls == []
+    with pytest.raises(ValueError):
+        g.events.unsubscribe(Message, handler)
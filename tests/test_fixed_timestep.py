@@ -0,0 +1,84 @@
+import pytest
+
+import scene
+import game
+import data_store
+
+
+class StepScene(scene.Scene):
+    @classmethod
+    def update(cls, game) -> None:
+        game.data[cls].ticks += 1
+
+
+class StepData:
+    ticks: int = 0,     data_store.Access.game()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StepGame(game.Game):
+    fixed_dt = 0.01
+    max_catch_up = 3
+    max_frame_skip = 2
+
+    def __init__(self, *args):
+        self.clock = FakeClock()
+        self.renders = []
+        super().__init__(*args)
+
+    def render(self, alpha):
+        self.renders.append(alpha)
+
+    def run(self):
+        pass
+
+
+def ticks(g):
+    return g.data[StepScene].ticks
+
+
+def test_ticks_follow_elapsed_time():
+    g = StepGame(StepData, StepScene)
+    assert g.frame() and ticks(g) == 1
+    g.clock.now += 0.025
+    assert g.frame() and ticks(g) == 3
+    assert g.alpha == pytest.approx(0.5)
+    g.clock.now += 0.004
+    assert g.frame() and ticks(g) == 3
+    assert g.alpha == pytest.approx(0.9)
+    g.clock.now += 0.001
+    g.frame()
+    assert ticks(g) == 4
+    assert g.tick_stats.count == 4 and g.frame_stats.count == 3
+
+
+def test_skips_renders_then_drops_backlog():
+    g = StepGame(StepData, StepScene)
+    g.frame()
+    g.clock.now += 0.1
+    assert not g.frame()
+    assert ticks(g) == 4
+    assert not g.frame()
+    assert ticks(g) == 7
+    assert g.frame()
+    assert ticks(g) == 10
+    assert g.dropped_time == pytest.approx(0.01)
+    assert g.skipped_renders == 2
+    assert len(g.renders) == 2
+
+
+def test_variable_step_without_fixed_dt():
+    g = StepGame(StepData, StepScene)
+    g.fixed_dt = None
+    for _ in range(3):
+        g.clock.now += 1
+        assert g.frame()
+    assert ticks(g) == 3
+    assert g.renders == [0, 0, 0]
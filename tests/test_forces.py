@@ -0,0 +1,93 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import scene
+import entity_store
+import forces
+
+
+class Falling(scene.Scene): pass
+
+
+class Floating(scene.Scene): pass
+
+
+def test_scene_gravity_skips_static():
+    store = entity_store.EntityStore()
+    ball = store.entity(0, 10)
+    wall = store.entity(5, 5)
+    wall.inv_mass = 0
+    engine = forces.ForceEngine()
+    engine.add_field(forces.UniformField(0, -10), Falling)
+
+    engine.step(store, 0.5, Floating)
+    assert (ball.x, ball.y) == (0, 10)
+    engine.step(store, 0.5, Falling)
+    assert ball.vy == -5 and ball.y == 7.5
+    assert (wall.x, wall.y, wall.vy) == (5, 5, 0)
+
+
+def test_point_attractor():
+    field = forces.PointAttractor(0, 0, strength=2, softening=0)
+    acc = field.evaluate(np.array([[2.0, 0.0], [0.0, -1.0]]))
+    assert acc.ravel().tolist() == pytest.approx([-0.5, 0, 0, 2])
+
+
+def test_grid_bilinear():
+    values = np.zeros((2, 3, 2))
+    values[:, :, 0] = [[0, 1, 2], [10, 11, 12]]
+    field = forces.GridField(values, x0=10, y0=0, cell_size=2)
+    acc = field.evaluate(np.array([[10.0, 0.0], [11.0, 1.0], [14.0, 2.0], [100.0, -5.0], [13.0, 0.5]]))
+    assert acc[:, 0].tolist() == pytest.approx([0, 5.5, 12, 2, 4])
+    assert not acc[:, 1].any()
+
+
+def test_impulse_decays_and_uses_mass():
+    store = entity_store.EntityStore()
+    light, heavy = store.entity(), store.entity()
+    heavy.inv_mass = 0.5
+    engine = forces.ForceEngine(min_impulse=0.5)
+    engine.add_impulse(light, 4, 0, decay=np.log(2))
+    engine.add_impulse(heavy, 4, 0, decay=np.log(2))
+
+    engine.step(store, 1)
+    assert light.vx == pytest.approx(4) and heavy.vx == pytest.approx(2)
+    assert engine.impulse_forces[:, 0].tolist() == pytest.approx([2, 2])
+    engine.step(store, 1)
+    engine.step(store, 1)
+    engine.step(store, 1)
+    assert len(engine.impulse_slots) == 0
+    assert light.vx == pytest.approx(4 + 2 + 1 + 0.5)
+
+
+def test_impulse_dropped_on_despawn():
+    store = entity_store.EntityStore()
+    hit = store.entity()
+    engine = forces.ForceEngine()
+    engine.add_impulse(hit, 100, 100)
+    hit.despawn()
+    other = store.entity()
+    assert other.slot == hit.slot
+    engine.step(store, 1)
+    assert (other.vx, other.vy) == (0, 0)
+
+
+def test_accelerations_skip_impulses_of_despawned():
+    store = entity_store.EntityStore()
+    hit = store.entity()
+    engine = forces.ForceEngine()
+    engine.add_impulse(hit, 100, 100)
+    hit.despawn()
+    other = store.entity()
+    assert not engine.accelerations(store)[other.slot].any()
+
+
+def test_many_impulses_added_at_once():
+    store = entity_store.EntityStore()
+    e = store.entity()
+    engine = forces.ForceEngine()
+    for _ in range(1000):
+        engine.add_impulse(e, 1, 2, decay=0)
+    assert engine.accelerations(store)[e.slot].tolist() == pytest.approx([1000, 2000])
+    assert len(engine.impulse_slots) == 1000 and not engine.pending_impulses
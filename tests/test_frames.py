@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+import entity
+import util
+
+
+def make_frames(folder, count, name=None, ext="gif", skip=()):
+    folder.mkdir()
+    name = name or folder.name
+    for i in range(count):
+        if i not in skip:
+            (folder / f"{name}{i}.{ext}").write_bytes(bytes([i]) * 100)
+    (folder / "notes.txt").write_text("not a frame")
+    return str(folder)
+
+
+class Sprite(entity.AnimatedEntity):
+    pass
+
+
+def test_frames_scanned_once(tmp_path, monkeypatch):
+    folder = make_frames(tmp_path / "bird", 3)
+    scans = []
+    listdir = os.listdir
+    monkeypatch.setattr(os, "listdir", lambda path: scans.append(path) or listdir(path))
+
+    sprites = [Sprite(folder) for _ in range(50)]
+    assert len(scans) == 1
+    assert sprites[0].frames == [os.path.join(folder, f"bird{i}.gif") for i in range(3)]
+    assert all(s.frame_set is sprites[0].frame_set for s in sprites)
+
+    sprites[0].next_frame()
+    sprites[0].next_frame()
+    sprites[0].next_frame()
+    assert sprites[0].frame_index == 0
+
+
+def test_extension_and_gaps(tmp_path):
+    folder = make_frames(tmp_path / "coin", 2, ext="png")
+    assert len(entity.FrameSet.get(folder, "png")) == 2
+    with pytest.raises(ValueError):
+        entity.FrameSet.get(folder, "gif")
+    with pytest.raises(ValueError):
+        entity.FrameSet.get(make_frames(tmp_path / "gappy", 3, skip={1}))
+
+
+def test_frame_data_lazy_with_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(entity.FrameSet, "data_cache", util.BudgetLRU(budget=250))
+    frames = entity.FrameSet.get(make_frames(tmp_path / "walk", 4))
+    assert len(entity.FrameSet.data_cache) == 0
+
+    assert frames.data(1) == bytes([1]) * 100
+    frames.data(2)
+    frames.data(3)
+    cache = entity.FrameSet.data_cache
+    assert list(cache.items) == [frames[2], frames[3]]
+    assert cache.size == 200
+    frames.data(3)
+    assert cache.hits == 1 and cache.misses == 3
@@ -3,7 +3,6 @@ from typing import Optional, Type
 import scene
 import game
 import data_store
-from time import time
 import random
 
 
@@ -38,9 +37,9 @@ class Play(scene.Scene):
         print("Game over")
 
     @staticmethod
-    def choose_attack_defend():
+    def choose_attack_defend(game: game.Game):
         while True:
-            choice = input("Do you attack or defend?: ")
+            choice = game.read_input("Do you attack or defend?: ")
             if not choice:
                 print("You didn't make a choice!")
                 continue
@@ -54,7 +53,7 @@ class Play(scene.Scene):
     @classmethod
     def update(cls, game: game.Game) -> None:
         print(f"There are {game.data[cls].enemies} enemies left")
-        choice = cls.choose_attack_defend()
+        choice = cls.choose_attack_defend(game)
 
         # Attacking
         defending = False
@@ -90,9 +89,9 @@ class Death(scene.Scene):
         super().enter(game, leaving)
         print("Enjoy 5 seconds of afterlife.")
 
-    @scene.transition_condition("Leaderboard")
+    @scene.transition_condition("Leaderboard", volatile=True)
     def timed_out(cls, game):
-        return time() - game.data[cls].start_time >= cls.TIMEOUT
+        return game.clock() - game.data[cls].start_time >= cls.TIMEOUT
 
 # @sm.register
 class Leaderboard(scene.Scene):
@@ -106,7 +105,7 @@ class Leaderboard(scene.Scene):
         for pos, (name, score) in enumerate(game.data[cls].topscores, start=1):
             print(f"{pos}. {name}\t{score}")
         print("Press enter to continue")
-        input()
+        game.read_input()
 
 
 @scene.transition_action(Leaderboard, Death)
@@ -121,7 +120,7 @@ class GameData:
     enemies: int = 5,                       data_store.Access.transient(Play)
     name: str = "",                         data_store.Access.game()
     topscores: dict[str, int] = [],         data_store.Access.static(Play, Leaderboard)
-    start_time: float = -1,                 data_store.Access.transient(Play, Death, Leaderboard, factory=lambda _: time())
+    start_time: float = -1,                 data_store.Access.transient(Play, Death, Leaderboard, factory=lambda g: g.clock())
 
     # You can make config vars for a certain scene by making them static for that scene only
     enemy_dmg_range: tuple[int, int] = (5, 10),     data_store.Access.static(Play)
@@ -0,0 +1,107 @@
+import random
+
+import scene
+import game
+import data_store
+
+
+class IncStart(scene.Scene):
+    calls = {"low": 0, "high": 0, "flag": 0, "tick": 0}
+    ticks = 0
+
+    @classmethod
+    def update(cls, game) -> None:
+        if rand_source.random() < 0.3:
+            game.data[cls].counter += rand_source.choice((-1, 1))
+        if rand_source.random() < 0.1:
+            game.data[cls].items.append(0)
+        IncStart.ticks += 1
+
+    @scene.transition_condition("IncLow")
+    def low(cls, game):
+        cls.calls["low"] += 1
+        return game.data[cls].counter <= -3
+
+    @scene.transition_condition("IncHigh")
+    def high(cls, game):
+        cls.calls["high"] += 1
+        return game.data[cls].counter >= 3 or len(game.data[cls].items) >= 4
+
+    @scene.transition_condition("IncLow")
+    def flag(cls, game):
+        cls.calls["flag"] += 1
+        return game.data[cls].flag
+
+    @scene.transition_condition("IncHigh", volatile=True)
+    def tick(cls, game):
+        cls.calls["tick"] += 1
+        return IncStart.ticks % 97 == 96
+
+
+class IncLow(scene.Scene):
+    @scene.transition_condition(IncStart)
+    def back(cls, game):
+        return True
+
+
+class IncHigh(scene.Scene):
+    @scene.transition_condition(IncStart)
+    def back(cls, game):
+        return True
+
+
+rand_source = random.Random()
+
+
+class IncData:
+    counter: int = 0,       data_store.Access.transient(IncStart)
+    items: list = [],       data_store.Access.transient(IncStart)
+    flag: bool = False,     data_store.Access.game()
+
+
+class FullGame(game.Game):
+    def run(self) -> None:
+        pass
+
+
+class IncGame(FullGame):
+    incremental_transitions = True
+
+
+def simulate(game_type, ticks=2000):
+    rand_source.seed(1234)
+    IncStart.ticks = 0
+    for name in IncStart.calls:
+        IncStart.calls[name] = 0
+    g = game_type(IncData, IncStart)
+    scenes = []
+    for _ in range(ticks):
+        g.update()
+        scenes.append(g.scene)
+    return scenes, dict(IncStart.calls)
+
+
+def test_matches_full_evaluation():
+    full_scenes, full_calls = simulate(FullGame)
+    inc_scenes, inc_calls = simulate(IncGame)
+    assert inc_scenes == full_scenes
+    assert inc_calls["low"] < full_calls["low"]
+    assert inc_calls["flag"] < full_calls["flag"]
+
+
+def test_volatile_runs_every_tick():
+    _, full_calls = simulate(FullGame)
+    _, inc_calls = simulate(IncGame)
+    assert inc_calls["tick"] == full_calls["tick"]
+
+
+def test_write_invalidates_cache():
+    g = IncGame(IncData, IncStart)
+    assert IncStart._detect_transition(g) is IncStart
+    flag_calls = IncStart.calls["flag"]
+    assert IncStart._detect_transition(g) is IncStart
+    assert IncStart.calls["flag"] == flag_calls
+
+    g.data[IncStart].flag = True
+    assert IncStart._detect_transition(g) is IncLow
+    assert IncStart.calls["flag"] == flag_calls + 1
@@ -0,0 +1,191 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import collision
+import entity
+import entity_store
+import forces
+
+
+class Wall(entity.Entity):
+    mobile = False
+
+
+def test_store_entities_fall_asleep_and_wake():
+    store = entity_store.EntityStore()
+    store.sleep_ticks = 3
+    resting = store.entity(0, 0)
+    moving = store.entity(0, 0)
+    moving.vx = 1
+    for _ in range(3):
+        store.integrate(1)
+    assert resting.sleeping and not moving.sleeping
+    assert store.awake_slots().tolist() == [moving.slot]
+
+    # Sleepers aren't integrated even if their arrays say they should move
+    store.acc[resting.slot] = 1, 0
+    store.integrate(1)
+    assert resting.x == 0
+
+    resting.ax = 1
+    assert not resting.sleeping
+    store.integrate(1)
+    assert resting.x == 1 and moving.x == 5
+
+
+def test_integrate_skips_sleeping_slots_in_the_middle():
+    store = entity_store.EntityStore()
+    views = [store.entity(i, 0) for i in range(5)]
+    for e in views:
+        e.vx = 1
+    store.sleep(views[2].slot)
+    store.integrate(0.5)
+    assert [e.x for e in views] == [0.5, 1.5, 2, 3.5, 4.5]
+    assert views[2].vx == 0
+
+
+def test_impulse_wakes_and_static_never_moves():
+    class Crate(entity_store.ArrayEntity):
+        mobile = False
+
+    store = entity_store.EntityStore()
+    store.sleep_ticks = 1
+    ball = store.entity(0, 0)
+    crate = Crate(5, 5, store=store)
+    engine = forces.ForceEngine()
+    engine.step(store, 1)
+    assert ball.sleeping and crate.sleeping and crate.inv_mass == 0
+
+    engine.add_impulse(ball, 2, 0)
+    engine.add_impulse(crate, 2, 0)
+    assert not ball.sleeping and crate.sleeping
+    engine.step(store, 1)
+    assert ball.x > 0 and (crate.x, crate.y) == (5, 5)
+
+
+def test_field_changes_wake_sleepers():
+    class FieldScene:
+        pass
+
+    store = entity_store.EntityStore()
+    store.sleep_ticks = 1
+    ball = store.entity(0, 0)
+    engine = forces.ForceEngine()
+    engine.step(store, 1)
+    assert ball.sleeping
+
+    gravity = engine.add_field(forces.UniformField(0, -10))
+    engine.step(store, 1)
+    assert ball.y < 0
+
+    engine.remove_field(gravity)
+    ball.vy = 0
+    engine.step(store, 1)
+    assert ball.sleeping
+
+    # Changing to a scene with its own fields wakes sleepers too
+    engine.add_field(forces.UniformField(5, 0), FieldScene)
+    engine.step(store, 1)
+    assert ball.sleeping and ball.x == 0
+    engine.step(store, 1, scene=FieldScene)
+    assert ball.x > 0
+
+
+def test_static_entities_are_baked():
+    walls = [Wall(x, 0, 10, 10) for x in range(0, 100, 10)]
+    ball = entity.Entity(15, 5, 4, 4)
+    world = collision.CollisionWorld(16, walls + [ball])
+    assert len(world) == 1 and len(world.static) == 10
+    assert set(world.at_point(14, 4)) == {ball, walls[1]}
+    assert set(world.in_rect(-1, -1, 12, 1)) == {walls[0], walls[1]}
+    assert world.nearest(95, 0) is walls[9]
+    assert sorted(b.x for _, b in world.active_pairs()) == [10, 20]
+    with pytest.raises(ValueError):
+        world.add(Wall())
+
+    world.bake_static(walls[:1])
+    assert list(world.active_pairs()) == []
+
+
+def test_world_sleeping_and_contact_wake():
+    world = collision.CollisionWorld(16)
+    world.sleep_ticks = 2
+    a, b = entity.Entity(0, 0, 4, 4), entity.Entity(50, 0, 4, 4)
+    world.add(a)
+    world.add(b)
+    world.update_all()
+    world.update_all()
+    assert world.sleeping(a) and world.sleeping(b)
+
+    # Moving a sleeper needs update, which wakes it
+    a.x = 49
+    world.update(a)
+    assert not world.sleeping(a)
+    assert list(world.active_pairs()) == [(a, b)]
+    assert not world.sleeping(b)
+
+
+def test_world_notices_moves_by_attribute():
+    # Sleeping is off by default, so update_all keeps seeing entities however long they were idle
+    world = collision.CollisionWorld(16)
+    a, b = entity.Entity(0, 0, 4, 4), entity.Entity(100, 0, 4, 4)
+    world.add(a)
+    world.add(b)
+    for _ in range(100):
+        world.update_all()
+    a.x = 100
+    world.update_all()
+    assert list(world.pairs()) and list(world.active_pairs())
+
+
+def test_store_wake_wakes_world():
+    store = entity_store.EntityStore()
+    store.sleep_ticks = 2
+    p, q = store.entity(0, 0, 4, 4), store.entity(100, 0, 4, 4)
+    world = collision.CollisionWorld(16, [p, q])
+    world.sleep_ticks = 2
+    for _ in range(3):
+        store.integrate(1)
+        world.update_all()
+    assert world.sleeping(p) and p.sleeping
+
+    p.vx = 100
+    assert not world.sleeping(p)
+    store.integrate(1)
+    world.update_all()
+    assert list(world.active_pairs()) == [(p, q)]
+
+
+def test_world_keeps_entities_awake_in_store():
+    # Frozen outside the integrated region, but still awake in the store, so it can move again without a wake
+    store = entity_store.EntityStore()
+    p = store.entity(0, 0, 4, 4)
+    p.vx = 1
+    world = collision.CollisionWorld(16, [p])
+    world.sleep_ticks = 2
+    for _ in range(3):
+        store.integrate(1, region=(50, 50, 60, 60))
+        world.update_all()
+    assert not world.sleeping(p)
+
+
+def test_active_pairs_match_brute_force():
+    rng = random.Random(1)
+    entities = [entity.Entity(rng.uniform(0, 200), rng.uniform(0, 200), 12, 12) for _ in range(150)]
+    walls = [Wall(rng.uniform(0, 200), rng.uniform(0, 200), 20, 20) for _ in range(50)]
+    world = collision.CollisionWorld(16, entities + walls)
+    for e in entities[::2]:
+        world.sleep(e)
+
+    awake = set(entities[1::2])
+    expected = set()
+    for i, a in enumerate(entities):
+        for b in entities[i + 1:] + walls:
+            if (a in awake or b in awake) and a.overlaps(b):
+                expected.add(frozenset((a, b)))
+    found = list(world.active_pairs())
+    assert all(a in awake for a, _ in found)
+    assert len(found) == len(expected) and {frozenset(p) for p in found} == expected
@@ -0,0 +1,76 @@
+import json
+
+import scene
+import game
+import data_store
+import profiling
+
+
+class ProfA(scene.Scene):
+    @classmethod
+    def update(cls, game) -> None:
+        game.data[cls].n += 1
+
+    @scene.transition_condition("ProfB")
+    def second_tick(cls, game):
+        return game.data[cls].n == 2
+
+    @second_tick.transition_action
+    def moving(src, dest, game):
+        pass
+
+
+class ProfB(scene.Scene): pass
+
+
+class ProfData:
+    n: int = 0,     data_store.Access.game()
+
+
+class ProfGame(game.Game):
+    def run(self):
+        pass
+
+
+def test_records_every_part_of_a_tick():
+    g = ProfGame(ProfData, ProfA)
+    g.profiler = profiling.Profiler()
+    g.update()
+    g.update()
+
+    frames = g.profiler.by_frame()
+    assert frames["ProfGame.update"].count == 2
+    assert frames["ProfA.update"].count == 2
+    assert frames["ProfA._detect_transition"].count == 2
+    assert frames["ProfA.second_tick"].count == 2
+    assert frames["ProfA.moving"].count == 1
+    assert frames["ProfA.leave"].count == 1
+    assert frames["ProfB.enter"].count == 1
+    assert frames["DataStore.transition"].count == 1
+    assert sum(frames["ProfA.update"].histogram.values()) == 2
+
+    stack = ("ProfGame.update", "ProfA.transition", "ProfA._detect_transition", "ProfA.second_tick")
+    assert g.profiler.stats[stack].count == 2
+
+
+def test_exports():
+    g = ProfGame(ProfData, ProfA)
+    g.profiler = profiling.Profiler()
+    for _ in range(3):
+        g.update()
+
+    snapshot = json.loads(g.profiler.to_json())
+    assert snapshot["frames"]["ProfB.update"]["count"] == 1
+    assert snapshot["frames"]["ProfB.update"]["max"] >= 0
+
+    lines = g.profiler.to_collapsed().splitlines()
+    assert "ProfGame.update;ProfA.transition;ProfB.enter;DataStore.transition" in [line.rsplit(" ", 1)[0] for line in lines]
+    assert all(int(line.rsplit(" ", 1)[1]) >= 0 for line in lines)
+
+
+def test_disabled_profiler_records_nothing():
+    g = ProfGame(ProfData, ProfA)
+    g.profiler = profiling.Profiler()
+    g.profiler.enabled = False
+    g.update()
+    assert not g.profiler.stats
@@ -0,0 +1,113 @@
+import pytest
+
+import scene
+
+
+class RegParent(scene.Scene):
+    @scene.transition_condition("RegTarget")
+    def go(cls, game):
+        return True
+
+    @scene.transition_action(src="RegTarget")
+    def back(src, dest, game):
+        pass
+
+
+class RegChild(RegParent):
+    @scene.transition_condition("RegOther")
+    def other(cls, game):
+        return False
+
+
+class RegTarget(scene.Scene): pass
+
+
+@scene.transition_action(RegTarget, "RegLate")
+def late(src, dest, game):
+    pass
+
+
+class RegOther(scene.Scene): pass
+
+
+class RegLate(scene.Scene): pass
+
+
+def test_forward_references_resolved():
+    assert list(RegParent.transition_conditions) == [RegTarget]
+    assert RegParent.enter_trans_acts[RegTarget] == [RegParent.back.act]
+    assert "RegTarget" not in RegChild.transition_conditions
+    assert RegChild.transition_conditions[RegTarget] == RegParent.transition_conditions[RegTarget]
+
+
+def test_child_copies_parent_without_sharing():
+    assert RegChild.transition_conditions[RegTarget] is not RegParent.transition_conditions[RegTarget]
+    assert RegOther in RegChild.transition_conditions
+    assert RegOther not in RegParent.transition_conditions
+
+
+def test_late_names_resolved():
+    assert list(RegChild.transition_conditions) == [RegTarget, RegOther]
+    assert RegTarget.leave_trans_acts[RegLate] == [late]
+
+
+def test_unresolved_names_reported():
+    class RegWaiting(scene.Scene):
+        @scene.transition_condition("RegMissing")
+        def never(cls, game):
+            return False
+
+    with pytest.raises(TypeError):
+        scene.Scene.assert_no_classnames()
+
+    class RegMissing(scene.Scene): pass
+
+    scene.Scene.assert_no_classnames()
+    assert list(RegWaiting.transition_conditions) == [RegMissing]
+
+
+class RegFirst(scene.Scene): pass
+
+
+class RegSecond(scene.Scene): pass
+
+
+class RegOrdered(scene.Scene):
+    # Defined first but checked second, since conditions are taken in order of name
+    @scene.transition_condition(RegSecond)
+    def zebra(cls, game):
+        return True
+
+    @scene.transition_condition(RegFirst)
+    def aardvark(cls, game):
+        return True
+
+
+class RegGame:
+    incremental_transitions = False
+    profiler = None
+
+
+def test_conditions_checked_in_name_order():
+    assert list(RegOrdered.transition_conditions) == [RegFirst, RegSecond]
+    condition, dest = RegOrdered._find_transition(RegGame())
+    assert condition is RegOrdered.aardvark and dest is RegFirst
+
+
+def test_unresolved_event_destinations_reported():
+    class RegPoke:
+        pass
+
+    class RegListening(scene.Scene):
+        @scene.event_transition(RegPoke, "RegPoked")
+        def poked(cls, game, event):
+            return True
+
+    with pytest.raises(TypeError, match="RegPoked"):
+        scene.Scene.assert_no_classnames()
+
+    class RegPoked(scene.Scene): pass
+
+    scene.Scene.assert_no_classnames()
+    assert RegListening.poked.dest is RegPoked
+    assert RegListening._find_event_transition(RegGame(), RegPoke()) == (RegListening.poked, RegPoked)
@@ -0,0 +1,170 @@
+import io
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+import data_store
+import entity
+import game
+import replay
+import runner
+import scene
+
+
+class RepFight(scene.Scene):
+    @classmethod
+    def update(cls, game) -> None:
+        d = game.data[cls]
+        if game.read_input("attack? ") == "a" and random.random() < 0.7:
+            d.enemies -= 1
+        d.health -= random.randint(0, 6)
+        d.log.append(round(game.clock() - d.started, 6))
+
+    @scene.event_handler(str)
+    def potion(cls, game, event):
+        game.data[cls].health += 10
+
+    @scene.transition_condition("RepOver")
+    def over(cls, game):
+        return game.data[cls].health <= 0 or game.data[cls].enemies == 0
+
+
+class RepOver(scene.Scene):
+    @scene.transition_condition(RepFight)
+    def again(cls, game):
+        return game.read_input() == "again"
+
+
+class RepData:
+    health: int = 30,       data_store.Access.transient(RepFight)
+    enemies: int = 4,       data_store.Access.transient(RepFight)
+    log: list = [],         data_store.Access.transient(RepFight)
+    started: float = 0,     data_store.Access.transient(RepFight, factory=lambda g: g.clock())
+
+
+class RepGame(game.Game):
+    def run(self) -> None:
+        pass
+
+
+def record(ticks=200, seed=7):
+    g = RepGame(RepData, RepFight)
+    clock = runner.SimClock(100)
+    lines = random.Random(seed)
+    g.clock = clock
+    g.read_input = lambda prompt="": lines.choice(["a", "d", "again"])
+    log = io.BytesIO()
+    recorder = replay.Recorder(g, log, seed=seed)
+    scenes = []
+    for tick in range(ticks):
+        if tick % 17 == 0:
+            g.events.post("potion")
+        g.update()
+        scenes.append(g.scene)
+        clock.advance(lines.random() / 30)
+    recorder.close()
+    return log.getvalue(), scenes
+
+
+def test_replay_matches_recording():
+    data, scenes = record()
+    assert len(data) < 200 * 20
+
+    g = RepGame(RepData, RepFight)
+    stats = replay.replay(g, io.BytesIO(data))
+    assert stats.ticks == 200 and stats.stopped_by == "end of log"
+    assert g.scene is scenes[-1]
+    assert stats.transitions == sum(a is not b for a, b in zip(scenes, scenes[1:])) + (scenes[0] is not RepFight)
+
+
+def test_divergence_detected(monkeypatch):
+    data, _ = record()
+    monkeypatch.setattr(RepData, "enemies", (5, RepData.enemies[1]))
+    with pytest.raises(replay.ReplayDivergence) as e:
+        replay.replay(RepGame(RepData, RepFight), io.BytesIO(data))
+    assert e.value.what == "data store checksum" and e.value.tick == 0
+
+    monkeypatch.undo()
+    stats = replay.replay(RepGame(RepData, RepFight), io.BytesIO(data), verify=False, ticks=50)
+    assert stats.ticks == 50
+
+
+def test_wrong_start_scene():
+    data, _ = record(ticks=1)
+    with pytest.raises(ValueError):
+        replay.Replayer(RepGame(RepData, RepOver), io.BytesIO(data))
+
+
+CHECKSUM_SCRIPT = """
+import data_store, game, replay, scene
+
+class SeedScene(scene.Scene):
+    pass
+
+class SeedData:
+    tags: set = {f"tag{i}" for i in range(50)},     data_store.Access.game()
+    seen: frozenset[str] = frozenset("abcdefgh"),    data_store.Access.game()
+
+class SeedGame(game.Game):
+    def run(self):
+        pass
+
+print(replay.checksum(SeedGame(SeedData, SeedScene)))
+"""
+
+
+def test_checksum_independent_of_hash_seed():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    checksums = set()
+    for seed in ("1", "2", "3"):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        out = subprocess.run([sys.executable, "-c", CHECKSUM_SCRIPT], cwd=root, env=env, capture_output=True,
+                             text=True, check=True)
+        checksums.add(out.stdout)
+    assert len(checksums) == 1
+
+
+class RepWalk(scene.Scene):
+    @classmethod
+    def update(cls, game) -> None:
+        d = game.data[cls]
+        d.player.x += 1
+        d.steps += 1
+
+
+class RepWalkData:
+    player: object = None,  data_store.Access.game()
+    sprite: object = None,  data_store.Access.game(checksum=False)
+    steps: int = 0,         data_store.Access.game()
+
+
+def walk_game():
+    g = RepGame(RepWalkData, RepWalk)
+    g.data[RepWalk].player = entity.Entity(0, 0)
+    g.data[RepWalk].sprite = object()
+    return g
+
+
+def test_fields_that_cant_be_encoded_left_out():
+    g = walk_game()
+    assert replay.checksum_fields(g.data) == ["steps"]
+
+    log = io.BytesIO()
+    recorder = replay.Recorder(g, log, seed=1)
+    for _ in range(5):
+        g.update()
+    recorder.close()
+    assert g.data[RepWalk].steps == 5
+
+    stats = replay.replay(walk_game(), io.BytesIO(log.getvalue()))
+    assert stats.ticks == 5
+
+    # Checked by type only once they're in the checksum
+    before = replay.checksum(g)
+    g.data[RepWalk].player.x = 100
+    assert replay.checksum(g) == before
+    g.data[RepWalk].steps = 0
+    assert replay.checksum(g) != before
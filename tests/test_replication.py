@@ -0,0 +1,209 @@
+import asyncio
+
+import pytest
+
+import async_game
+import data_store
+import game
+import replication
+import scene
+
+
+class RepLobby(scene.Scene):
+    @classmethod
+    def update(cls, game) -> None:
+        game.data[cls].score += 1
+
+    @scene.transition_condition("RepPlay")
+    def ready(cls, game):
+        return game.data[cls].score >= 2
+
+
+class RepPlay(scene.Scene):
+    @classmethod
+    def update(cls, game) -> None:
+        d = game.data[cls]
+        d.hp -= 1
+        d.names.append(f"p{d.hp}")
+
+
+class RepData:
+    score: int = 0,                 data_store.Access.game()
+    names: list[str] = [],          data_store.Access.game()
+    secret: int = 7,                data_store.Access.game(replicate=False)
+    grid: list[int] = [0] * 500,    data_store.Access.static(RepPlay)
+    hp: int = 10,                   data_store.Access.transient(RepPlay)
+
+
+class RepGame(game.Game):
+    replicated = True
+
+    def run(self) -> None:
+        pass
+
+
+class RepMirror(game.Game):
+    def run(self) -> None:
+        pass
+
+
+async def connect(server_game, *mirrors):
+    server = replication.Server(server_game)
+    await server.start()
+    clients = []
+    for mirror in mirrors:
+        client = replication.Client(mirror)
+        await client.connect("127.0.0.1", server.port)
+        assert await client.receive()
+        clients.append(client)
+    return server, clients
+
+
+def test_needs_write_tracking():
+    with pytest.raises(ValueError):
+        replication.Server(RepMirror(RepData, RepLobby))
+
+
+def test_fields_and_scene_replicated():
+    async def main():
+        g = RepGame(RepData, RepLobby)
+        g.data[RepLobby].score = 1
+        mirror = RepMirror(RepData, RepLobby)
+        mirror.data.storage_inst.secret = 0
+        server, (client,) = await connect(g, mirror)
+        assert mirror.data.storage_inst.score == 1
+
+        g.update()
+        assert await client.receive()
+        assert mirror.scene is RepPlay and client.tick == 1
+        d = mirror.data.storage_inst
+        assert (d.score, d.hp, d.grid) == (2, 10, [0] * 500)
+
+        g.update()
+        g.data[RepPlay].grid[3] = 9
+        g.update()
+        await client.receive()
+        await client.receive()
+        assert (d.hp, d.names, d.grid[3]) == (8, ["p9", "p8"], 9)
+
+        # Fields hidden from replication never reach the client
+        assert d.secret == 0
+
+        while not server.connections[0].stats.acked >= 4:
+            await asyncio.sleep(0.001)
+        (stats,) = server.stats().values()
+        assert stats["packets"] == 4 and stats["acked"] == 4
+        assert stats["latency"]["count"] == 4
+        assert client.stats.packets == 4
+        await client.close()
+        await server.close()
+        assert g.session is None
+
+    asyncio.run(main())
+
+
+def test_small_changes_sent_as_deltas():
+    async def main():
+        g = RepGame(RepData, RepPlay)
+        g.data[RepPlay].grid = [i * i % 1000 for i in range(500)]
+        server, (client,) = await connect(g, RepMirror(RepData, RepPlay))
+        conn = server.connections[0]
+        full = conn.stats.wire_bytes
+
+        g.data[RepPlay].grid[100] = 1
+        server.end_tick()
+        await client.receive()
+        assert client.game.data.storage_inst.grid[100] == 1
+        assert conn.stats.deltas == 1
+        assert conn.stats.wire_bytes - full < full / 10
+
+        # Unchanged values aren't sent again even if they were written
+        g.data[RepPlay].grid = list(g.data[RepPlay].grid)
+        server.end_tick()
+        assert conn.stats.packets == 2
+        await client.close()
+        await server.close()
+
+    asyncio.run(main())
+
+
+def test_clients_join_late_and_batch_ticks():
+    class RepAsyncGame(async_game.AsyncGame):
+        replicated = True
+        tick_interval = 0
+
+    async def main():
+        g = RepAsyncGame(RepData, RepLobby)
+        server = replication.Server(g)
+        server.send_every = 2
+        await server.start()
+        await g.run_async(ticks=4)
+
+        clients = []
+        for _ in range(2):
+            client = replication.Client(RepMirror(RepData, RepLobby))
+            await client.connect("127.0.0.1", server.port)
+            await client.receive()
+            clients.append(client)
+        for client in clients:
+            assert client.game.scene is RepPlay and client.game.data.storage_inst.hp == 8
+
+        # Two ticks of changes arrive as one packet
+        await g.run_async(ticks=2)
+        for client in clients:
+            await client.receive()
+            assert client.tick == 6 and client.game.data.storage_inst.names == ["p9", "p8", "p7", "p6"]
+            assert client.stats.packets == 2
+            await client.close()
+        await server.close()
+
+    asyncio.run(main())
+
+
+class RepOdd(scene.Scene):
+    pass
+
+
+def test_unencodable_fields_rejected_up_front():
+    class OddData:
+        handle: object = None,      data_store.Access.game()
+
+    g = RepGame(OddData, RepOdd)
+    g.data[RepOdd].handle = object()
+    with pytest.raises(TypeError, match="handle"):
+        replication.Server(g)
+
+    class HiddenData:
+        handle: object = None,      data_store.Access.game(replicate=False)
+
+    g = RepGame(HiddenData, RepOdd)
+    g.data[RepOdd].handle = object()
+    replication.Server(g)
+
+
+def test_unread_fields_not_rebuilt():
+    built = []
+
+    def build(game):
+        built.append(1)
+        return [1, 2]
+
+    class LazyData:
+        items: list = [],   data_store.Access.transient(RepOdd, factory=build)
+
+    async def main():
+        g = RepGame(LazyData, RepOdd)
+        built.clear()
+        g.data.transition(g, RepOdd, RepOdd)
+        server, (client,) = await connect(g, RepMirror(LazyData, RepOdd))
+        assert not built and server.connections[0].pending == {"items"}
+
+        # Sent once the game reads it
+        assert g.data[RepOdd].items == [1, 2]
+        server.end_tick()
+        await client.receive()
+        assert built == [1] and client.game.data.storage_inst.items == [1, 2]
+        await client.close()
+        await server.close()
+
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+import pytest
+
+import scene
+import game
+import data_store
+import runner
+
+
+class Waiting(scene.Scene):
+    DELAY = 2
+
+    @classmethod
+    def update(cls, game) -> None:
+        game.data[cls].polls += 1
+
+    @scene.transition_condition("Finished", volatile=True)
+    def waited(cls, game):
+        return game.clock() - game.data[cls].entered >= cls.DELAY
+
+
+class Finished(scene.Scene): pass
+
+
+class WaitData:
+    polls: int = 0,         data_store.Access.game()
+    entered: float = 0,     data_store.Access.transient(Waiting, factory=lambda g: g.clock())
+
+
+class WaitGame(game.Game):
+    def run(self):
+        pass
+
+
+def test_sim_clock_drives_timed_conditions():
+    g = WaitGame(WaitData, Waiting)
+    stats = runner.run_headless(g, ticks=1000, dt=0.5)
+    assert stats.ticks == 1000
+    assert stats.transitions == 1
+    assert stats.scene_ticks == {"Waiting": 5, "Finished": 995}
+    assert stats.final_scene is Finished
+    assert stats.sim_time == 500
+    assert stats.tick_stats.count == 1000
+
+
+def test_until_predicate():
+    g = WaitGame(WaitData, Waiting)
+    stats = runner.run_headless(g, until=lambda g: g.scene is Finished, dt=0.25)
+    assert stats.stopped_by == "until"
+    assert stats.ticks == g.data[Waiting].polls == 9
+    assert stats.as_dict()["final_scene"] == "Finished"
+    assert stats.ticks_per_second > 0
+
+
+def test_needs_a_stop():
+    with pytest.raises(ValueError):
+        runner.run_headless(WaitGame(WaitData, Waiting))
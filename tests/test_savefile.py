@@ -0,0 +1,99 @@
+import dataclasses
+import io
+from typing import Any, Optional
+
+import pytest
+
+import data_store
+import savefile
+import scene
+
+
+@dataclasses.dataclass
+class Point:
+    x: float
+    y: float
+    label: Optional[str] = None
+
+
+class SaveMenu(scene.Scene): pass
+
+
+class SavePlay(scene.Scene): pass
+
+
+class SaveData:
+    name: str = "",                                 data_store.Access.game()
+    topscores: list[tuple[str, int]] = [],          data_store.Access.static(SaveMenu)
+    best: dict[str, float] = {},                    data_store.Access.static(SaveMenu, SavePlay)
+    flags: set[bool] = set(),                       data_store.Access.game()
+    path: tuple[Point, ...] = (),                   data_store.Access.static(SavePlay)
+    spare: Optional[bytes] = None,                  data_store.Access.game()
+    extra: Any = None,                              data_store.Access.game()
+    bag: list = [],                                 data_store.Access.static(SavePlay)
+    lives: int = 3,                                 data_store.Access.transient(SavePlay)
+
+
+def filled_store():
+    store = data_store.DataStore(SaveData)
+    s = store.storage_inst
+    s.name = "ünïcode"
+    s.topscores = [(f"p{i}" + "é" * (i % 3 == 0), i * 10 - 5000) for i in range(10000)]
+    s.best = {"a": 1.5, "b": -2.0}
+    s.flags = {True, False}
+    s.path = (Point(1, 2), Point(3.5, 4, "end"))
+    s.spare = b"\0\1"
+    s.extra = {"nested": [1, (2, 3), {4}, None, 2 ** 70, 1.5, b"x", True]}
+    s.bag = ["mixed", 1, [2.0]]
+    s.lives = 1
+    return store
+
+
+def test_round_trip():
+    store = filled_store()
+    f = io.BytesIO()
+    savefile.save(store, f)
+
+    index = savefile.read_index(f)
+    assert "lives" not in index
+    assert index["topscores"][0] == "list[tuple[str, int]]"
+
+    fresh = data_store.DataStore(SaveData)
+    loaded = savefile.load(fresh, io.BytesIO(f.getvalue()))
+    assert set(loaded) == set(index)
+    for field in loaded:
+        assert getattr(fresh.storage_inst, field) == getattr(store.storage_inst, field)
+    assert fresh.storage_inst.lives == 3
+
+
+def test_partial_load_for_scene():
+    f = io.BytesIO()
+    savefile.save(filled_store(), f)
+    fresh = data_store.DataStore(SaveData)
+    loaded = savefile.load(fresh, f, sc=SaveMenu)
+    assert set(loaded) == {"name", "topscores", "best", "flags", "spare", "extra"}
+    assert fresh.storage_inst.path == ()
+
+
+def test_streams_in_chunks(monkeypatch):
+    monkeypatch.setattr(savefile, "CHUNK", 256)
+    monkeypatch.setattr(savefile, "FLUSH_SIZE", 1024)
+    writes = []
+
+    class Stream:
+        def write(self, data):
+            writes.append(len(data))
+
+    savefile.save(filled_store(), Stream(), fields=["topscores"])
+    assert len(writes) > 10 and max(writes) < 8 * 1024
+
+
+def test_type_errors():
+    store = filled_store()
+    store.storage_inst.best = [1, 2]
+    with pytest.raises(TypeError, match="best"):
+        savefile.save(store, io.BytesIO())
+    with pytest.raises(ValueError):
+        savefile.save(store, io.BytesIO(), fields=["lives"])
+    with pytest.raises(ValueError):
+        savefile.load(store, io.BytesIO(b"not a save file at all"))
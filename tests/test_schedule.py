@@ -0,0 +1,106 @@
+import data_store
+import game
+import schedule
+import scene
+
+
+def test_auto_phases_spread_work():
+    s = schedule.Scheduler()
+    for i in range(6):
+        s.add(f"slow{i}", lambda: None, every=6)
+    assert sorted(task.phase for task in s.tasks.values()) == list(range(6))
+    assert s.worst_load() == 1
+
+    # A task every 2 ticks goes on whichever parity has less work, and fixed phases are kept
+    s.add("fixed", lambda: None, every=2, phase=0, cost=5)
+    half = s.add("half", lambda: None, every=2)
+    assert s.tasks["fixed"].phase == 0
+    assert half.phase == 1
+    assert [task.key for task in s.due(0)] == ["slow0", "fixed"]
+
+
+def test_run_order_and_remove():
+    s = schedule.Scheduler()
+    calls = []
+    s.add("a", lambda t: calls.append(("a", t)), every=2, phase=0)
+    s.add("b", lambda t: calls.append(("b", t)), every=1)
+    s.add("c", lambda t: calls.append(("c", t)), every=4, phase=0)
+    for tick in range(4):
+        s.run(tick, tick)
+    assert calls == [("a", 0), ("b", 0), ("c", 0), ("b", 1), ("a", 2), ("b", 2), ("b", 3)]
+    s.remove("c")
+    assert 4 not in s.buckets and "c" not in s
+
+
+class SchedPlay(scene.Scene):
+    updates = 0
+    plans = []
+
+    @classmethod
+    def update(cls, game) -> None:
+        cls.updates += 1
+
+    @scene.system(every=4)
+    def plan(cls, game):
+        cls.plans.append(game.tick_count)
+
+    @scene.transition_condition("SchedOver")
+    def done(cls, game):
+        return cls.updates >= 20
+
+
+class SchedOver(scene.Scene):
+    pass
+
+
+class SchedHud(scene.Scene):
+    update_every = 5
+    update_phase = 2
+    refreshes = []
+
+    @classmethod
+    def update(cls, game) -> None:
+        cls.refreshes.append(game.tick_count)
+
+    @scene.transition_condition("SchedHudHidden")
+    def hide(cls, game):
+        return game.data[cls].hidden
+
+
+class SchedHudHidden(scene.Scene):
+    update_every = 100
+
+
+class SchedData:
+    hidden: bool = False,   data_store.Access.game()
+
+
+class SchedGame(game.Game):
+    def run(self) -> None:
+        pass
+
+
+def test_layers_and_systems():
+    SchedPlay.updates = 0
+    SchedPlay.plans = []
+    SchedHud.refreshes = []
+    g = SchedGame(SchedData, SchedPlay)
+    g.push_layer(SchedHud)
+    for _ in range(12):
+        g.update()
+    assert SchedPlay.updates == 12
+    assert len(SchedPlay.plans) == 3 and len({tick % 4 for tick in SchedPlay.plans}) == 1
+    assert SchedHud.refreshes == [2, 7]
+
+    g.data[SchedPlay].hidden = True
+    for _ in range(8):
+        g.update()
+    assert g.layers == [SchedHudHidden]
+    assert SchedHud.refreshes == [2, 7, 12]
+    assert g.scene is SchedOver
+    g.update()
+    assert (SchedPlay, "update") not in g.scheduler and (SchedOver, "update") in g.scheduler
+
+    g.remove_layer(SchedHudHidden)
+    g.update()
+    assert g.scheduled_scenes == () and not g.scheduler.tasks
@@ -0,0 +1,143 @@
+from copy import deepcopy
+from dataclasses import dataclass
+import pickle
+
+import pytest
+
+import data_store
+import game
+import scene
+
+
+class SnapPlay(scene.Scene):
+    @classmethod
+    def update(cls, game) -> None:
+        d = game.data[cls]
+        d.score += 1
+        d.path.append(d.score)
+
+    @scene.transition_condition("SnapOver")
+    def finished(cls, game):
+        return game.data[cls].score >= 5
+
+
+class SnapOver(scene.Scene):
+    pass
+
+
+class SnapData:
+    score: int = 0,         data_store.Access.game()
+    path: list = [],        data_store.Access.transient(SnapPlay)
+    names: dict = {},       data_store.Access.static(SnapPlay, SnapOver)
+
+
+class SnapGame(game.Game):
+    snapshot_history = 4
+
+    def run(self) -> None:
+        pass
+
+
+def test_rewind_restores_values_and_scene():
+    g = SnapGame(SnapData, SnapPlay)
+    first = g.snapshot()
+    for _ in range(3):
+        g.update()
+    g.snapshot()
+    g.update()
+    g.update()
+    assert g.scene is SnapOver
+
+    g.rewind()
+    assert g.scene is SnapPlay
+    assert g.data[SnapPlay].score == 3 and g.data[SnapPlay].path == [1, 2, 3]
+
+    # Changing restored values doesn't change the snapshot
+    g.data[SnapPlay].path.append(99)
+    g.rewind()
+    assert g.data[SnapPlay].path == [1, 2, 3]
+
+    g.restore(first)
+    assert g.data[SnapPlay].score == 0 and g.data[SnapPlay].path == []
+
+
+def test_unchanged_fields_shared():
+    g = SnapGame(SnapData, SnapPlay)
+    g.data[SnapPlay].names["a"] = 1
+    a = g.snapshot()
+    g.data[SnapPlay].score = 7
+    b = g.snapshot()
+    assert a.fields[2] is b.fields[2] == {"a": 1}
+    assert (a.fields[0], b.fields[0]) == (0, 7)
+
+    # Nothing is copied until it's read
+    g.restore(a)
+    assert vars(g.data.storage_inst) == {}
+    assert g.data[SnapPlay].names == {"a": 1}
+    assert g.data[SnapPlay].names is not a.fields[2]
+
+
+def test_reset_transients_captured():
+    g = SnapGame(SnapData, SnapPlay)
+    g.data[SnapPlay].path.append(5)
+    g.snapshot()
+    g.data.transition(g, SnapPlay, SnapPlay)
+    reset = g.snapshot()
+    assert g.data[SnapPlay].path == []
+    g.rewind(2)
+    assert g.data[SnapPlay].path == [5]
+    g.restore(reset)
+    assert g.data[SnapPlay].path == []
+
+
+def test_history_limit_and_events():
+    g = SnapGame(SnapData, SnapPlay)
+    g.events.post("tick")
+    snaps = [g.snapshot() for _ in range(6)]
+    assert list(g.snapshots) == snaps[2:]
+    with pytest.raises(IndexError):
+        g.rewind(5)
+
+    g.events.clear()
+    g.rewind()
+    assert [entry[2] for entry in g.events.queue] == ["tick"]
+
+
+def test_snapshots_off():
+    class Plain(SnapGame):
+        snapshot_history = 0
+    g = Plain(SnapData, SnapPlay)
+    with pytest.raises(RuntimeError):
+        g.snapshot()
+
+
+def test_storage_instance_pickles_and_copies_alone():
+    g = SnapGame(SnapData, SnapPlay)
+    g.update()
+    g.restore(g.snapshot())
+    for copy in (pickle.loads(pickle.dumps(g.data.storage_inst)), deepcopy(g.data.storage_inst)):
+        assert type(copy) is SnapData
+        assert vars(copy) == {"score": 1, "path": [1], "names": {}}
+
+
+class SnapCount(scene.Scene):
+    @classmethod
+    def update(cls, game) -> None:
+        game.data[cls].score += 1
+
+
+@dataclass
+class SnapDataclass:
+    score: int = 0,         data_store.Access.game()
+    seen: tuple = (),       data_store.Access.transient(SnapCount)
+
+
+def test_dataclass_storage():
+    # Dataclasses aren't hashable, so nothing may key on the storage instance
+    g = SnapGame(SnapDataclass, SnapCount)
+    g.update()
+    g.restore(g.snapshot())
+    assert g.data[SnapCount].score == 1
+    g.data.reset_transients(g, SnapCount)
+    assert g.data[SnapCount].seen == ()
+    assert type(pickle.loads(pickle.dumps(g.data.storage_inst))) is SnapDataclass
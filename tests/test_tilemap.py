@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import camera
+import entity_store
+import tilemap
+
+
+class SmallChunks(tilemap.TileMap):
+    chunk_size = 16
+
+
+@pytest.fixture
+def level(tmp_path):
+    tiles = np.arange(100 * 70, dtype=np.uint16).reshape(70, 100) % 7
+    tiles[40:, :] = 0
+    tmap = SmallChunks.from_array(str(tmp_path), tiles, tile_size=10)
+    yield tmap, tiles
+    tmap.close()
+
+
+def test_from_array_skips_empty_chunks(level):
+    tmap, tiles = level
+    # 7 columns of chunks and 3 rows have something in them, the rows above 40 tiles are empty
+    assert len(os.listdir(tmap.folder)) == 7 * 3
+    tmap.load(0, 0)
+    assert tmap.tile(5, 3) == tiles[3, 5]
+    assert tmap.tile(5, 20) is None
+
+
+def test_stream_loads_around_camera_in_background(level):
+    tmap, tiles = level
+    cam = camera.Camera(100, 100, x=200, y=200, margin=10)
+    tmap.stream(cam)
+    assert tmap.pending and not tmap.chunks
+    tmap.wait()
+    # 90 to 310 in world units is tiles 9 to 31, chunks 0 to 1 on both axes
+    assert set(tmap.chunks) == {(0, 0), (0, 1), (1, 0), (1, 1)}
+    assert tmap.sync_loads == 0
+
+    tx0, ty0, window = tmap.window(*cam.view())
+    assert (tx0, ty0) == (15, 15)
+    assert (window == tiles[15:26, 15:26]).all()
+
+    # Moving one chunk over keeps the old ones, moving far unloads them
+    cam.x += 160
+    tmap.stream(cam)
+    tmap.wait()
+    assert (0, 0) in tmap.chunks and (2, 1) in tmap.chunks
+    cam.x += 2000
+    tmap.stream(cam)
+    tmap.wait()
+    assert all(cx >= 10 for cx, _ in tmap.chunks)
+    assert tmap.unloads == 6
+
+
+def test_changed_tiles_written_on_unload(level):
+    tmap, tiles = level
+    tmap.set_tile(3, 60, 9)
+    assert tmap.sync_loads == 1 and tmap.dirty == {(0, 3)}
+    tmap.unload(0, 3)
+    assert not tmap.dirty
+    assert tmap.load(0, 3)[60 % 16, 3] == 9
+
+
+def test_store_update_culled_to_camera():
+    store = entity_store.EntityStore()
+    near, far = store.entity(0, 0), store.entity(500, 0)
+    near.vx = far.vx = 1
+    cam = camera.Camera(100, 100, margin=20)
+    store.integrate(1, region=cam.cull_rect())
+    assert (near.x, far.x) == (1, 500)
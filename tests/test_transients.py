@@ -0,0 +1,60 @@
+import scene
+import data_store
+
+
+class TrEnter(scene.Scene): pass
+
+
+class TrOther(scene.Scene): pass
+
+
+factory_calls = []
+
+
+def make_items(game):
+    factory_calls.append(game)
+    return [1, 2]
+
+
+class TrData:
+    items: list = [],               data_store.Access.transient(TrEnter)
+    made: list = None,              data_store.Access.transient(TrEnter, factory=make_items)
+    label: tuple = ("a", (1, 2)),   data_store.Access.transient(TrEnter)
+    kept: list = [],                data_store.Access.static(TrEnter)
+
+
+def test_reset_gives_fresh_copy():
+    store = data_store.DataStore(TrData)
+    store[TrEnter].items.append(1)
+    store[TrEnter].kept.append(1)
+    store.transition("game", TrEnter, TrOther)
+    assert store[TrEnter].items == []
+    assert store[TrEnter].kept == [1]
+    assert store[TrEnter].items is not TrData.items[0]
+
+
+def test_frozen_default_is_shared():
+    store = data_store.DataStore(TrData)
+    store.transition("game", TrOther, TrEnter)
+    assert store[TrEnter].label is TrData.label[0]
+
+
+def test_factory_called_lazily():
+    factory_calls.clear()
+    store = data_store.DataStore(TrData)
+    store.transition("game", TrOther, TrEnter)
+    store.transition("game", TrEnter, TrOther)
+    store.transition("game", TrOther, TrEnter)
+    assert factory_calls == []
+    assert store[TrEnter].made == [1, 2]
+    assert store[TrEnter].made == [1, 2]
+    assert factory_calls == ["game"]
+
+
+def test_assignment_skips_default():
+    factory_calls.clear()
+    store = data_store.DataStore(TrData)
+    store.transition("game", TrOther, TrEnter)
+    store[TrEnter].made = [3]
+    assert store[TrEnter].made == [3]
+    assert factory_calls == []
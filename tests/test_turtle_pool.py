@@ -0,0 +1,166 @@
+import turtle
+
+import pytest
+
+import turtle_entity
+import turtle_renderer
+
+
+class FakeScreen:
+    def tracer(self, n, delay):
+        pass
+
+    def update(self):
+        pass
+
+
+class FakeTurtle:
+    screen = FakeScreen()
+
+    def __init__(self):
+        self.shown = True
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+        self.shown = True
+
+    def hideturtle(self):
+        self.shown = False
+
+    def showturtle(self):
+        self.shown = True
+
+    def getscreen(self):
+        return self.screen
+
+    def __getattr__(self, name):
+        return lambda *args: None
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    FakeTurtle.screen = FakeScreen()
+    pool = turtle_entity.TurtlePool(max_size=4, factory=FakeTurtle)
+    monkeypatch.setattr(turtle_entity.TurtleEntity, "pool", pool)
+    return pool
+
+
+def test_released_turtles_reused(pool):
+    entities = [turtle_entity.TurtleEntity("square") for _ in range(3)]
+    turtles = [e.turtle for e in entities]
+    for e in entities:
+        e.destroy()
+    assert all(e.turtle is None for e in entities)
+
+    # Every released turtle is reset, which deletes its drawings, and kept
+    assert pool.free == turtles
+    assert all(not t.shown and t.resets == 1 for t in turtles)
+
+    e = turtle_entity.TurtleEntity("circle")
+    assert e.turtle is turtles[2] and e.turtle.shown
+    text = turtle_entity.TurtleEntity.create_text_turtle("red")
+    assert text is turtles[1] and not text.shown
+    assert pool.stats() == {"in_use": 2, "peak_in_use": 3, "free": 1, "created": 3, "reused": 2}
+
+
+def test_max_size(pool):
+    turtles = [pool.acquire() for _ in range(4)]
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    pool.release(turtles[0])
+    pool.acquire()
+
+
+def test_destroy_leaves_renderer(pool):
+    renderer = turtle_renderer.TurtleRenderer(FakeTurtle.screen)
+    e = turtle_entity.TurtleEntity("square")
+    renderer.add(e)
+    renderer.flush()
+    e.destroy()
+    assert e.renderer is None and e not in renderer.pushed
+
+
+def test_destroy_twice(pool):
+    e = turtle_entity.TurtleEntity("square")
+    e.destroy()
+    e.destroy()
+    assert pool.stats()["in_use"] == 0 and len(pool.free) == 1
+    with pytest.raises(ValueError):
+        pool.release(None)
+    with pytest.raises(ValueError):
+        pool.release(pool.free[0])
+    assert pool.in_use == 0
+
+
+class FakeCanvas:
+    """Just enough of a Tk canvas for real turtles to draw on, counting the items they make"""
+
+    def __init__(self):
+        self.items = set()
+        self.last = 0
+
+    def _create(self, *args, **kwargs):
+        self.last += 1
+        self.items.add(self.last)
+        return self.last
+
+    create_line = create_polygon = create_image = create_text = _create
+
+    def delete(self, item):
+        if item == "all":
+            self.items.clear()
+        else:
+            self.items.discard(item)
+
+    def find_all(self):
+        return tuple(self.items)
+
+    def cget(self, name):
+        return "400"
+
+    def coords(self, *args):
+        return []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+@pytest.fixture(params=["fake", "tk"])
+def canvas(request, monkeypatch):
+    if request.param == "fake":
+        # The blank shape needs a real Tk image, which is the only part of the screen that does
+        monkeypatch.setattr(turtle.TurtleScreenBase, "_blankimage", lambda self: None)
+        yield FakeCanvas()
+        return
+    tkinter = pytest.importorskip("tkinter")
+    try:
+        root = tkinter.Tk()
+    except tkinter.TclError:
+        pytest.skip("No display to make a Tk canvas on")
+    root.withdraw()
+    yield tkinter.Canvas(root)
+    root.destroy()
+
+
+def test_reuse_keeps_canvas_items_bounded(canvas):
+    screen = turtle.TurtleScreen(canvas)
+    pool = turtle_entity.TurtlePool(factory=lambda: turtle.RawTurtle(screen))
+    drawn, released = [], []
+    for _ in range(3):
+        turtles = [pool.acquire() for _ in range(5)]
+        for t in turtles:
+            t.down()
+            t.forward(10)
+            t.left(90)
+            t.forward(10)
+            t.stamp()
+        drawn.append(len(canvas.find_all()))
+        for t in turtles:
+            pool.release(t)
+        released.append(len(canvas.find_all()))
+
+    # Releasing deletes the lines and stamps, and reuse means no more turtles are made
+    assert released[0] < drawn[0]
+    assert len(set(drawn)) == 1 and len(set(released)) == 1
+    assert pool.created == 5
@@ -0,0 +1,143 @@
+import pytest
+
+import entity
+import turtle_entity
+import turtle_renderer
+
+
+class FakeTurtle:
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, *args))
+
+
+class FakeScreen:
+    def __init__(self):
+        self.updates = 0
+        self.traced = None
+        self.shapes = {"square": None}
+
+    def tracer(self, n, delay):
+        self.traced = n
+
+    def update(self):
+        self.updates += 1
+
+    def register_shape(self, name, shape=None):
+        self.shapes[name] = shape
+
+    def getshapes(self):
+        return sorted(self.shapes)
+
+
+def make(monkeypatch, count):
+    monkeypatch.setattr(turtle_entity.TurtleEntity, "create_default_turtle", staticmethod(FakeTurtle))
+    renderer = turtle_renderer.TurtleRenderer(FakeScreen())
+    entities = [turtle_entity.TurtleEntity("square", i, 0) for i in range(count)]
+    for e in entities:
+        renderer.add(e)
+        e.turtle.calls.clear()
+    return renderer, entities
+
+
+def test_only_dirty_entities_pushed(monkeypatch):
+    renderer, entities = make(monkeypatch, 10)
+    assert renderer.screen.traced == 0
+    assert renderer.flush() == 10
+    for e in entities:
+        e.turtle.calls.clear()
+
+    assert renderer.flush() == 0
+    assert renderer.screen.updates == 2
+
+    entities[3].x += 5
+    entities[3].x += 5
+    entities[3].y = 2
+    entities[7].visible = False
+    assert renderer.flush() == 2
+    assert entities[3].turtle.calls == [("goto", 13, 2)]
+    assert entities[7].turtle.calls == [("hideturtle",)]
+    assert all(not e.turtle.calls for i, e in enumerate(entities) if i not in (3, 7))
+
+
+def test_unchanged_value_not_pushed(monkeypatch):
+    renderer, (e,) = make(monkeypatch, 1)
+    renderer.flush()
+    e.turtle.calls.clear()
+
+    e.x += 1
+    e.x -= 1
+    e.shape = "circle"
+    assert renderer.flush() == 1
+    assert e.turtle.calls == [("shape", "circle")]
+
+
+def test_removed_entity_ignored(monkeypatch):
+    renderer, (a, b) = make(monkeypatch, 2)
+    renderer.remove(a)
+    a.x = 50
+    assert renderer.flush() == 1
+    assert a not in renderer.pushed and b in renderer.pushed
+
+
+class FakeImage:
+    def __init__(self, file=None, data=None):
+        self.source = file or data
+
+    def width(self):
+        return 10
+
+    def height(self):
+        return 10
+
+
+class FakeFrames(entity.FrameSet):
+    is_file = False
+
+    def __init__(self, names):
+        self.paths = names
+
+    def data(self, index):
+        return self.paths[index].encode()
+
+
+@pytest.fixture
+def shapes(monkeypatch):
+    monkeypatch.setattr(turtle_entity.TurtleShapeCache, "make_image", FakeImage)
+    # Room for two 10 by 10 images
+    return turtle_entity.TurtleShapeCache(budget=800, screen=FakeScreen())
+
+
+@pytest.mark.parametrize("is_file", [True, False])
+def test_shape_cache_registers_and_evicts(shapes, monkeypatch, is_file):
+    monkeypatch.setattr(FakeFrames, "is_file", is_file)
+    frames = FakeFrames(["a.gif", "b.gif", "c.gif", "square"])
+    screen = shapes.screen
+    for i in range(3):
+        shapes.release(shapes.acquire(frames, i))
+    image = screen.shapes["b.gif"]._data
+    assert image.source == ("b.gif" if is_file else b"b.gif")
+
+    # The least recently shown shape is swapped for a blank one, and registered again when it's shown
+    assert screen.shapes["a.gif"] is shapes.blank
+    assert shapes.registered == {"a.gif", "b.gif", "c.gif"}
+    shapes.acquire(frames, 0)
+    assert screen.shapes["a.gif"] is not shapes.blank and screen.shapes["b.gif"] is shapes.blank
+
+    # Shapes registered elsewhere are left alone
+    assert shapes.acquire(frames, 3) == "square" and screen.shapes["square"] is None
+    assert "square" not in shapes.registered
+
+
+def test_gif_entity_destroy_twice(shapes, monkeypatch, tmp_path):
+    monkeypatch.setattr(turtle_entity.TurtleEntity, "create_default_turtle", staticmethod(FakeTurtle))
+    monkeypatch.setattr(turtle_entity.TurtleEntity, "release_turtle", classmethod(lambda cls, t: None))
+    monkeypatch.setattr(turtle_entity.TurtleGifEntity, "shapes", shapes)
+    (tmp_path / "bat").mkdir()
+    (tmp_path / "bat" / "bat0.gif").write_bytes(b"gif")
+    bat = turtle_entity.TurtleGifEntity(str(tmp_path / "bat"))
+    bat.destroy()
+    bat.destroy()
+    assert shapes.lru.pins[bat.frames[0]] == 0
@@ -0,0 +1,238 @@
+from __future__ import annotations
+from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from math import floor
+import os
+
+import numpy as np
+
+import camera
+
+chunk_key = tuple[int, int]
+
+
+class TileMap:
+    """
+    Grid of tile ids split into square chunks of chunk_size tiles. Each chunk is a small array of dtype stored in its
+    own .npy file in folder, and chunks that were never written are all the empty tile, so they don't need a file.
+    Only chunks near the camera are kept in memory: stream loads the ones the view needs on a background thread and
+    unloads the ones that have gone out of range, writing them back if they changed.
+    Tile (tx, ty) covers tx * tile_size <= x < (tx + 1) * tile_size, and likewise for y. Chunks are indexed
+    [row, col], so tile (tx, ty) is chunk[ty % chunk_size, tx % chunk_size]
+    """
+    chunk_size = 32
+    dtype = np.uint16
+
+    # Chunks are kept loaded until they're more than this many chunks outside the cull rect, so moving back and
+    # forth over a chunk border doesn't keep loading and unloading the same chunks
+    keep = 1
+
+    def __init__(self, folder: str, tile_size: float = 32, empty: int = 0):
+        self.folder = folder
+        self.tile_size = tile_size
+        self.empty = empty
+        self.chunks: dict[chunk_key, np.ndarray] = {}
+        self.pending: dict[chunk_key, Future] = {}
+
+        # Loaded chunks that have been changed since they were read
+        self.dirty: set[chunk_key] = set()
+
+        # Created the first time something is streamed, since plenty of maps are small enough to load up front
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+        # Totals for the lifetime of the map
+        self.loads = 0
+        self.sync_loads = 0
+        self.unloads = 0
+        self.saves = 0
+
+    @classmethod
+    def from_array(cls, folder: str, tiles: np.ndarray, tile_size: float = 32, empty: int = 0) -> TileMap:
+        """
+        Split a whole level into chunk files, with tiles[0, 0] at tile (0, 0). Chunks that are all empty are skipped
+
+        :return: The map, with nothing loaded
+        """
+        tiles = np.asarray(tiles)
+        if tiles.ndim != 2:
+            raise ValueError("Tiles must be a 2D array")
+        tilemap = cls(folder, tile_size, empty)
+        os.makedirs(folder, exist_ok=True)
+        size = cls.chunk_size
+        for row in range(0, tiles.shape[0], size):
+            for col in range(0, tiles.shape[1], size):
+                part = tiles[row:row + size, col:col + size]
+                if (part == empty).all():
+                    continue
+                chunk = tilemap._empty_chunk()
+                chunk[:part.shape[0], :part.shape[1]] = part
+                tilemap._write(col // size, row // size, chunk)
+        return tilemap
+
+    def _empty_chunk(self) -> np.ndarray:
+        return np.full((self.chunk_size, self.chunk_size), self.empty, dtype=self.dtype)
+
+    def _path(self, cx: int, cy: int) -> str:
+        return os.path.join(self.folder, f"{cx}_{cy}.npy")
+
+    def _read(self, cx: int, cy: int) -> np.ndarray:
+        # Runs on the loader thread, so it mustn't touch anything but the file
+        path = self._path(cx, cy)
+        if not os.path.exists(path):
+            return self._empty_chunk()
+        chunk = np.load(path)
+        if chunk.shape != (self.chunk_size, self.chunk_size):
+            raise ValueError(f"Chunk {cx}, {cy} has shape {chunk.shape}, expected chunks of {self.chunk_size}")
+        return chunk.astype(self.dtype, copy=False)
+
+    def _write(self, cx: int, cy: int, chunk: np.ndarray) -> None:
+        # Write then rename, so the loader never reads half a chunk
+        path = self._path(cx, cy)
+        temp = path + ".tmp"
+        with open(temp, 'wb') as f:
+            np.save(f, chunk)
+        os.replace(temp, path)
+        self.saves += 1
+
+    def chunk_of(self, tx: int, ty: int) -> chunk_key:
+        return tx // self.chunk_size, ty // self.chunk_size
+
+    def tile_of(self, x: float, y: float) -> tuple[int, int]:
+        return floor(x / self.tile_size), floor(y / self.tile_size)
+
+    def chunk_range(self, left: float, bottom: float, right: float, top: float) -> tuple[int, int, int, int]:
+        """Chunks overlapping a rectangle in world coordinates, as the lowest and highest chunk on each axis"""
+        tx0, ty0 = self.tile_of(left, bottom)
+        tx1, ty1 = self.tile_of(right, top)
+        return (*self.chunk_of(tx0, ty0), *self.chunk_of(tx1, ty1))
+
+    def request(self, cx: int, cy: int) -> None:
+        """Start loading a chunk in the background if it isn't loaded or loading already"""
+        key = cx, cy
+        if key in self.chunks or key in self.pending:
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chunk-loader")
+        self.pending[key] = self.executor.submit(self._read, cx, cy)
+
+    def poll(self) -> int:
+        """
+        Take in the chunks that finished loading. Errors from loading are raised here
+
+        :return: Number of chunks that were added
+        """
+        done = [key for key, future in self.pending.items() if future.done()]
+        for key in done:
+            self.chunks[key] = self.pending.pop(key).result()
+        self.loads += len(done)
+        return len(done)
+
+    def wait(self) -> int:
+        """Block until every pending chunk has loaded, then take them in"""
+        for future in self.pending.values():
+            future.exception()
+        return self.poll()
+
+    def load(self, cx: int, cy: int) -> np.ndarray:
+        """Get a chunk, reading it on this thread if it isn't loaded yet"""
+        key = cx, cy
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            return chunk
+        future = self.pending.pop(key, None)
+        if future is not None:
+            chunk = future.result()
+            self.loads += 1
+        else:
+            chunk = self._read(cx, cy)
+            self.sync_loads += 1
+        self.chunks[key] = chunk
+        return chunk
+
+    def unload(self, cx: int, cy: int) -> None:
+        key = cx, cy
+        future = self.pending.pop(key, None)
+        if future is not None:
+            future.cancel()
+        chunk = self.chunks.pop(key, None)
+        if chunk is None:
+            return
+        if key in self.dirty:
+            self.dirty.discard(key)
+            self._write(cx, cy, chunk)
+        self.unloads += 1
+
+    def stream(self, cam: camera.Camera) -> None:
+        """
+        Load the chunks under the camera's cull rect in the background, nearest first, and unload the ones more than
+        keep chunks away from it. Call it every frame; it only costs as much as the chunks around the camera
+        """
+        self.poll()
+        cx0, cy0, cx1, cy1 = self.chunk_range(*cam.cull_rect())
+        centre_x, centre_y = self.chunk_of(*self.tile_of(cam.x, cam.y))
+        missing = [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)
+                   if (cx, cy) not in self.chunks and (cx, cy) not in self.pending]
+        missing.sort(key=lambda key: abs(key[0] - centre_x) + abs(key[1] - centre_y))
+        for cx, cy in missing:
+            self.request(cx, cy)
+
+        keep = self.keep
+        for cx, cy in [key for key in (*self.chunks, *self.pending)
+                       if not (cx0 - keep <= key[0] <= cx1 + keep and cy0 - keep <= key[1] <= cy1 + keep)]:
+            self.unload(cx, cy)
+
+    def tile(self, tx: int, ty: int) -> Optional[int]:
+        """The tile at a tile position, or None if its chunk isn't loaded"""
+        size = self.chunk_size
+        chunk = self.chunks.get((tx // size, ty // size))
+        if chunk is None:
+            return None
+        return int(chunk[ty % size, tx % size])
+
+    def tile_at(self, x: float, y: float) -> Optional[int]:
+        return self.tile(*self.tile_of(x, y))
+
+    def set_tile(self, tx: int, ty: int, value: int) -> None:
+        """Change a tile, loading its chunk on this thread if it has to. It's written to disk when it's unloaded"""
+        size = self.chunk_size
+        key = self.chunk_of(tx, ty)
+        self.load(*key)[ty % size, tx % size] = value
+        self.dirty.add(key)
+
+    def window(self, left: float, bottom: float, right: float, top: float) -> tuple[int, int, np.ndarray]:
+        """
+        Copy the tiles overlapping a rectangle into one array, e.g. to draw the ones on screen. Tiles in chunks that
+        aren't loaded are empty
+
+        :return: The tile position of the array's [0, 0] and the array, indexed [row, col] like the chunks
+        """
+        tx0, ty0 = self.tile_of(left, bottom)
+        tx1, ty1 = self.tile_of(right, top)
+        out = np.full((ty1 - ty0 + 1, tx1 - tx0 + 1), self.empty, dtype=self.dtype)
+        size = self.chunk_size
+        cx0, cy0, cx1, cy1 = self.chunk_range(left, bottom, right, top)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                chunk = self.chunks.get((cx, cy))
+                if chunk is None:
+                    continue
+                # Overlap of the chunk and the window in tile coordinates
+                x0, x1 = max(tx0, cx * size), min(tx1, cx * size + size - 1)
+                y0, y1 = max(ty0, cy * size), min(ty1, cy * size + size - 1)
+                out[y0 - ty0:y1 - ty0 + 1, x0 - tx0:x1 - tx0 + 1] = \
+                    chunk[y0 - cy * size:y1 - cy * size + 1, x0 - cx * size:x1 - cx * size + 1]
+        return tx0, ty0, out
+
+    def save(self) -> None:
+        """Write every changed chunk that's loaded"""
+        for key in self.dirty:
+            self._write(*key, self.chunks[key])
+        self.dirty.clear()
+
+    def close(self) -> None:
+        """Save changed chunks and stop the loader thread"""
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+        self.pending.clear()
+        self.save()
@@ -1,19 +1,129 @@
+from __future__ import annotations
+from typing import Callable, Optional, TYPE_CHECKING
 import entity
+import tkinter
 import turtle
 
+import util
+
+if TYPE_CHECKING:
+    from turtle_renderer import TurtleRenderer
+
+
+def _tracked(name: str) -> property:
+    # Attribute that tells the entity's renderer it needs redrawing whenever it's set
+    attr = f"_{name}"
+
+    def fget(self: TurtleEntity):
+        return getattr(self, attr)
+
+    def fset(self: TurtleEntity, value) -> None:
+        setattr(self, attr, value)
+        if self.renderer is not None:
+            self.renderer.dirty.add(self)
+
+    return property(fget, fset)
+
+
+class TurtlePool:
+    """
+    Hands out turtles, reusing released ones instead of making new ones. Tk never frees a turtle's canvas items and
+    turtle has no public way to delete a turtle, so games that keep spawning entities or text would otherwise leak
+    them. Released turtles are reset, which deletes their drawings and stamps, hidden and kept for the next acquire, so
+    the canvas only ever holds the items of peak_in_use turtles. Acquiring more than max_size turtles at once raises
+    RuntimeError
+    """
+
+    def __init__(self, max_size: Optional[int] = None, factory: Callable[[], turtle.Turtle] = turtle.Turtle):
+        self.max_size = max_size
+        self.factory = factory
+        self.free: list[turtle.Turtle] = []
+
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self) -> turtle.Turtle:
+        if self.max_size is not None and self.in_use >= self.max_size:
+            raise RuntimeError(f"Turtle pool is limited to {self.max_size} turtles")
+
+        if self.free:
+            t = self.free.pop()
+            self.reused += 1
+        else:
+            t = self.factory()
+            self.created += 1
+        t.speed(0)
+        t.up()
+        t.showturtle()
+
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        return t
+
+    def release(self, t: turtle.Turtle) -> None:
+        if t is None:
+            raise ValueError("Can't release None to a turtle pool")
+        if any(free is t for free in self.free):
+            raise ValueError("Turtle has already been released")
+        self.in_use -= 1
+
+        # reset() shows the turtle again, so hide it afterwards
+        t.reset()
+        t.hideturtle()
+        self.free.append(t)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "in_use": self.in_use,
+            "peak_in_use": self.peak_in_use,
+            "free": len(self.free),
+            "created": self.created,
+            "reused": self.reused,
+        }
+
 
 class TurtleEntity(entity.Entity):
+    # Turtles for entities and text come from here and go back when they're destroyed
+    pool = TurtlePool()
+
+    # Position, shape and visibility are only pushed to the turtle by a renderer (see turtle_renderer)
+    renderer: Optional[TurtleRenderer] = None
+
+    x = _tracked("x")
+    y = _tracked("y")
+    shape = _tracked("shape")
+    visible = _tracked("visible")
+
     def __init__(self, shape: str, x=0, y=0, hitwidth=0, hitheight=0):
-        super().__init__(x, y, hitwidth, hitheight)
+        # Not super() so subclasses that also inherit another entity type can initialise it themselves
+        entity.Entity.__init__(self, x, y, hitwidth, hitheight)
+        self.shape = shape
+        self.visible = True
         self.turtle = self.create_default_turtle()
         self.turtle.shape(shape)
 
+    def destroy(self) -> None:
+        """
+        Hide the entity and give its turtle back to the pool. The entity can't be drawn afterwards, and destroying it
+        again does nothing
+        """
+        if self.turtle is None:
+            return
+        if self.renderer is not None:
+            self.renderer.remove(self)
+        self.release_turtle(self.turtle)
+        self.turtle = None
+
     @classmethod
     def create_default_turtle(cls):
-        t = turtle.Turtle()
-        t.speed(0)
-        t.up()
-        return t
+        return cls.pool.acquire()
+
+    @classmethod
+    def release_turtle(cls, t) -> None:
+        """Give back a turtle from create_default_turtle or create_text_turtle"""
+        cls.pool.release(t)
 
     @classmethod
     def create_text_turtle(cls, color):
@@ -23,9 +133,84 @@ class TurtleEntity(entity.Entity):
         return t
 
 
+class TurtleShapeCache:
+    """
+    Registers image files as turtle shapes the first time they're shown, and unregisters the least recently shown ones
+    once their decoded size goes over the budget. Shapes a turtle is showing are pinned so they're never unregistered.
+    Only shapes the cache registered itself are ever replaced, anything registered elsewhere is used as it is
+    """
+
+    # Makes the decoded image from file= or data=. turtle has no public way to get at the image behind a shape, so
+    # the cache decodes it itself to know its size
+    make_image = staticmethod(tkinter.PhotoImage)
+
+    # Stands in for evicted shapes, since turtle can't unregister a shape. Dropping the image frees its memory
+    blank = turtle.Shape("polygon", ((0, 0), (0, 0), (0, 0)))
+
+    def __init__(self, budget: int = 64 * 2 ** 20, screen: Optional[turtle.TurtleScreen] = None):
+        self.lru = util.BudgetLRU(budget, on_evict=self._unregister)
+
+        # Defaults to the turtle module's screen once something is shown, so making a cache doesn't open a window
+        self.screen = screen
+
+        # Names of the shapes the cache has registered, evicted or not, which it's allowed to replace
+        self.registered: set[str] = set()
+
+    def _screen(self) -> turtle.TurtleScreen:
+        if self.screen is None:
+            self.screen = turtle.getscreen()
+        return self.screen
+
+    def acquire(self, frames: entity.FrameSet, index: int) -> str:
+        """
+        Make sure a frame is registered as a shape and pin it until it's released
+
+        :return: Name of the shape
+        """
+        name = frames[index]
+        self.lru.get(name, lambda: self._register(frames, index))
+        self.lru.pin(name)
+        return name
+
+    def release(self, name: str) -> None:
+        self.lru.unpin(name)
+
+    def _register(self, frames: entity.FrameSet, index: int) -> tuple[str, int]:
+        name = frames[index]
+        screen = self._screen()
+        if name not in self.registered and name in screen.getshapes():
+            # Someone else's shape, which takes no memory the cache could free
+            return name, 0
+        if frames.is_file:
+            image = self.make_image(file=name)
+        else:
+            image = self.make_image(data=bytes(frames.data(index)))
+        screen.register_shape(name, turtle.Shape("image", image))
+        self.registered.add(name)
+        return name, image.width() * image.height() * 4
+
+    def _unregister(self, name: str, _) -> None:
+        if name in self.registered:
+            self._screen().register_shape(name, self.blank)
+
+
 class TurtleGifEntity(TurtleEntity, entity.AnimatedEntity):
+    shapes = TurtleShapeCache()
+
     def __init__(self, folderpath, x=0, y=0, hitwidth=0, hitheight=0, file_ext="gif"):
-        super(entity.AnimatedEntity).__init__(folderpath, x, y, hitwidth, hitheight, file_ext)
-        for frame in self.frames:
-            turtle.addshape(frame)
-        super().__init__(self.frames[0], x, y, hitwidth, hitheight)
+        entity.AnimatedEntity.__init__(self, folderpath, x, y, hitwidth, hitheight, file_ext)
+        TurtleEntity.__init__(self, self.shapes.acquire(self.frame_set, 0), x, y, hitwidth, hitheight)
+
+    def set_frame(self, index: int) -> None:
+        old = self.frames[self.frame_index]
+        super().set_frame(index)
+        self.shape = self.shapes.acquire(self.frame_set, self.frame_index)
+        if self.renderer is None:
+            self.turtle.shape(self.shape)
+        self.shapes.release(old)
+
+    def destroy(self) -> None:
+        if self.turtle is None:
+            return
+        self.shapes.release(self.frames[self.frame_index])
+        super().destroy()
@@ -1,12 +1,51 @@
+from typing import Optional
 import turtle
 
+import async_game
+import camera as camera_module
 import game
+import turtle_renderer
 
 
-class TurtleGame(game.Game):
+class TurtleDrawing:
+    """Drawing and camera for the turtle games, shared by TurtleGame and AsyncTurtleGame"""
+
+    # Set to a TurtleRenderer to only redraw the entities that changed each frame
+    renderer: Optional[turtle_renderer.TurtleRenderer] = None
+
+    # Moved to follow its target at the end of every tick. Give it to the renderer too so drawing is relative to it
+    camera: Optional[camera_module.Camera] = None
+
+    def _update_camera(self) -> None:
+        if self.camera is not None:
+            self.camera.update()
+
+    def render(self, alpha: float) -> None:
+        if self.renderer is not None:
+            self.renderer.flush()
+        else:
+            turtle.update()
+
+
+class TurtleGame(TurtleDrawing, game.Game):
+    # Milliseconds between frames. Set fixed_dt to decouple the simulation rate from the frame rate
     update_interval = 10
 
+    def _update(self) -> None:
+        super()._update()
+        self._update_camera()
+
     def run(self) -> None:
-        self.update()
-        turtle.update()
+        self.frame()
         turtle.ontimer(lambda: self.run(), self.update_interval)
+
+
+class AsyncTurtleGame(TurtleDrawing, async_game.AsyncGame):
+    """
+    TurtleGame on asyncio instead of ontimer callbacks. Tk's events are handled when the screen is updated each tick,
+    so there's no need for turtle.mainloop
+    """
+
+    async def _tick(self) -> None:
+        await super()._tick()
+        self._update_camera()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+from typing import Any, Optional, TYPE_CHECKING
+import turtle
+
+if TYPE_CHECKING:
+    from camera import Camera
+    from collision import CollisionWorld
+    from turtle_entity import TurtleEntity
+
+
+class TurtleRenderer:
+    """
+    Retained renderer for TurtleEntity. Entities added to it mark themselves dirty when their position, shape or
+    visibility changes, and flush only pushes the dirty ones to their turtles. However many times an entity moves in
+    a frame, it's only redrawn once at its final state. Drawing runs with the screen's tracer off, so the canvas is
+    updated once per flush.
+
+    With a camera, entities are drawn relative to it and the ones outside its cull rect are hidden without touching
+    anything else about their turtles. When the camera moves, only the entities on screen before and after are
+    redrawn, which are found through world if there is one, otherwise every entity is checked
+    """
+
+    def __init__(self, screen: Optional[Any] = None, camera: Optional[Camera] = None,
+                 world: Optional[CollisionWorld] = None):
+        self.screen = screen if screen is not None else turtle.getscreen()
+        self.screen.tracer(0, 0)
+        self.camera = camera
+        self.world = world
+        self.entities: set[TurtleEntity] = set()
+        self.dirty: set[TurtleEntity] = set()
+
+        # The state last pushed to each entity's turtle, as x, y, shape, visible
+        self.pushed: dict[TurtleEntity, tuple[float, float, str, bool]] = {}
+
+        # Entities whose turtles are showing, and where the camera was when they were pushed
+        self.shown: set[TurtleEntity] = set()
+        self._camera_state: Optional[tuple] = None
+
+        # Totals for the lifetime of the renderer
+        self.flushes = 0
+        self.pushes = 0
+
+    def add(self, e: TurtleEntity) -> None:
+        e.renderer = self
+        self.entities.add(e)
+        self.dirty.add(e)
+
+    def remove(self, e: TurtleEntity) -> None:
+        self.entities.discard(e)
+        self.dirty.discard(e)
+        self.shown.discard(e)
+        self.pushed.pop(e, None)
+        e.renderer = None
+
+    def _candidates(self) -> set[TurtleEntity]:
+        # Entities that might need redrawing, which is every one on screen before or after if the camera moved
+        cam = self.camera
+        state = cam.x, cam.y, cam.width, cam.height, cam.margin
+        if state == self._camera_state:
+            return self.dirty
+        self._camera_state = state
+        if self.world is None:
+            return self.entities
+        entities = self.entities
+        in_view = [e for e in self.world.in_rect(*cam.cull_rect()) if e in entities]
+        return self.dirty.union(self.shown, in_view)
+
+    def flush(self) -> int:
+        """
+        Push every change since the last flush to the canvas
+
+        :return: Number of entities that were redrawn
+        """
+        pushed = self.pushed
+        shown = self.shown
+        cam = self.camera
+        candidates = self.dirty if cam is None else self._candidates()
+        count = 0
+        for e in candidates:
+            old = pushed.get(e)
+            if cam is None:
+                state = (e.x, e.y, e.shape, e.visible)
+            elif cam.overlaps(*e.hitbox()):
+                sx, sy = cam.to_screen(e.x, e.y)
+                state = (sx, sy, e.shape, e.visible)
+            elif old is None or not old[3]:
+                # Off screen and already hidden, so it can wait until it comes back
+                continue
+            else:
+                state = (*old[:3], False)
+            if state == old:
+                continue
+
+            t = e.turtle
+            if old is None or old[2] != state[2]:
+                t.shape(state[2])
+            if old is None or old[:2] != state[:2]:
+                t.goto(state[0], state[1])
+            if old is None or old[3] != state[3]:
+                if state[3]:
+                    t.showturtle()
+                else:
+                    t.hideturtle()
+            pushed[e] = state
+            if state[3]:
+                shown.add(e)
+            else:
+                shown.discard(e)
+            count += 1
+
+        self.dirty.clear()
+        self.flushes += 1
+        self.pushes += count
+        self.screen.update()
+        return count
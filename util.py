@@ -1,5 +1,6 @@
 import dataclasses
-from typing import ClassVar, Dict, Protocol, Type
+from collections import Counter, OrderedDict, deque
+from typing import Any, Callable, ClassVar, Dict, Hashable, Optional, Protocol, Type
 
 
 class IsDataclass(Protocol):
@@ -49,6 +50,225 @@ def handover_to_dataclass(old_obj: IsDataclass, new_class: Type[IsDataclass]):
     return new_obj
 
 
+class TimingStats:
+    """
+    Running statistics for a stream of durations. Totals cover every sample, percentiles only the most recent ones
+
+    >>> stats = TimingStats(window=3)
+    >>> for sample in (4, 1, 2, 3):
+    ...     stats.add(sample)
+    >>> stats.count, stats.total, stats.min, stats.max, stats.mean
+    (4, 10, 1, 4, 2.5)
+    >>> stats.percentile(50)
+    2
+    >>> stats.as_dict()["p100"]
+    3
+    """
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.total = 0
+        self.min = float("inf")
+        self.max = 0
+        self.last = 0
+        self.recent: deque = deque(maxlen=window)
+
+    def add(self, sample: float) -> None:
+        self.count += 1
+        self.total += sample
+        self.last = sample
+        if sample < self.min:
+            self.min = sample
+        if sample > self.max:
+            self.max = sample
+        self.recent.append(sample)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, pct: float) -> float:
+        if not self.recent:
+            return 0
+        ordered = sorted(self.recent)
+        return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else 0,
+            "max": self.max,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "p100": self.percentile(100),
+        }
+
+
+class BudgetLRU:
+    """
+    Least recently used cache limited by the total size of its values instead of their number.
+    Pinned keys are in use and are never evicted, so the cache can go over budget if everything is pinned
+
+    >>> evicted = []
+    >>> cache = BudgetLRU(budget=10, on_evict=lambda key, value: evicted.append(key))
+    >>> cache.get("a", lambda: ("A", 4))
+    'A'
+    >>> cache.get("b", lambda: ("B", 4))
+    'B'
+    >>> cache.pin("a")
+    >>> cache.get("c", lambda: ("C", 4))
+    'C'
+    >>> evicted, cache.size
+    (['b'], 8)
+    >>> cache.unpin("a")
+    >>> cache.get("c", lambda: ("C", 4)) and cache.get("d", lambda: ("D", 4))
+    'D'
+    >>> evicted, list(cache.items)
+    (['b', 'a'], ['c', 'd'])
+    """
+
+    def __init__(self, budget: int, on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        self.budget = budget
+        self.on_evict = on_evict
+        self.size = 0
+        self.items: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self.pins: Counter = Counter()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.items
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def get(self, key: Hashable, load: Callable[[], tuple[Any, int]]) -> Any:
+        """
+        Get a value, loading it if it isn't cached
+
+        :param key: Key of the value
+        :param load: Called on a miss, returns the value and its size
+        :return: The value
+        """
+        try:
+            value, _ = self.items[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            self.items.move_to_end(key)
+            return value
+
+        self.misses += 1
+        value, size = load()
+        self.items[key] = value, size
+        self.size += size
+        self._evict(keep=key)
+        return value
+
+    def pin(self, key: Hashable) -> None:
+        self.pins[key] += 1
+
+    def unpin(self, key: Hashable) -> None:
+        self.pins[key] -= 1
+        if self.pins[key] <= 0:
+            del self.pins[key]
+        self._evict()
+
+    def _evict(self, keep: Optional[Hashable] = None) -> None:
+        if self.size <= self.budget:
+            return
+        for key in list(self.items):
+            if self.size <= self.budget:
+                break
+            if key == keep or key in self.pins:
+                continue
+            value, size = self.items.pop(key)
+            self.size -= size
+            if self.on_evict is not None:
+                self.on_evict(key, value)
+
+
+class PersistentVector:
+    """
+    Immutable fixed-length sequence where updating a few items makes a new vector that shares everything else with the
+    old one. Items are kept in chunks of chunk_size, so an update copies only the chunks it touches plus the list of
+    chunks
+
+    >>> a = PersistentVector(range(10), chunk_size=4)
+    >>> b = a.set_many({1: "x", 9: "y"})
+    >>> list(b)
+    [0, 'x', 2, 3, 4, 5, 6, 7, 8, 'y']
+    >>> a[1], b[1], len(b)
+    (1, 'x', 10)
+    >>> a.chunks[1] is b.chunks[1]
+    True
+    """
+
+    __slots__ = ('chunks', 'chunk_size', 'length')
+
+    def __init__(self, items=(), chunk_size: int = 32, _chunks: Optional[tuple[tuple, ...]] = None, _length: int = 0):
+        self.chunk_size = chunk_size
+        if _chunks is not None:
+            self.chunks = _chunks
+            self.length = _length
+            return
+        items = tuple(items)
+        self.chunks = tuple(items[i:i + chunk_size] for i in range(0, len(items), chunk_size))
+        self.length = len(items)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> Any:
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        return self.chunks[index // self.chunk_size][index % self.chunk_size]
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield from chunk
+
+    def set_many(self, items: dict[int, Any]) -> "PersistentVector":
+        if not items:
+            return self
+        size = self.chunk_size
+        touched: dict[int, list] = {}
+        for index, value in items.items():
+            if not 0 <= index < self.length:
+                raise IndexError(index)
+            c = index // size
+            if c not in touched:
+                touched[c] = list(self.chunks[c])
+            touched[c][index % size] = value
+
+        chunks = list(self.chunks)
+        for c, chunk in touched.items():
+            chunks[c] = tuple(chunk)
+        return PersistentVector(chunk_size=size, _chunks=tuple(chunks), _length=self.length)
+
+
+def write_varint(buf: bytearray, n: int) -> None:
+    """Append a non-negative int in LEB128, 7 bits per byte with the high bit set on all but the last"""
+    while n >= 0x80:
+        buf.append(n & 0x7F | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def read_varint(mv: memoryview, pos: int) -> tuple[int, int]:
+    n = shift = 0
+    while True:
+        byte = mv[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()